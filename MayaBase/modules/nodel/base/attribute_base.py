@@ -6,14 +6,113 @@ About: Our Dag Node functionality to deal with
 """
 
 import maya.cmds as cmds
+import maya.OpenMaya as om
 
-from MayaBase.modules.utils import path
+from MayaBase.modules.utils import path, scene_generation
 
 import string
 
 from MayaBase.modules import six
 
 
+# Resolved attribute paths per node {node: (MObjectHandle, callback id, {attr: (path, fullPath)})},
+# only valid for one scene generation. importlib.reload runs this module again in the same
+# namespace, the callbacks registered before are kept here and removed below.
+_PATH_CACHE = globals().get("_PATH_CACHE", {})
+_PATH_CACHE_GENERATION = None
+
+
+def clearPathCache():
+    """ Forget every resolved attribute path and remove the callbacks watching their nodes.
+
+        Example:
+            clearPathCache()
+    """
+    for handle, callbackId, paths in _PATH_CACHE.values():
+        try:
+            om.MMessage.removeCallback(callbackId)
+        except RuntimeError:
+            # the node is gone and its callback with it
+            pass
+    _PATH_CACHE.clear()
+
+
+def _attributeChanged(message, plug, otherPlug, node):
+    """ Forget the paths of a node once one of its attributes is removed or renamed.
+
+        The renamed plug only carries its new name, so every path of the
+        node is dropped, the other nodes keep theirs.
+    """
+    if message & (om.MNodeMessage.kAttributeRemoved | om.MNodeMessage.kAttributeRenamed):
+        entry = _PATH_CACHE.get(node)
+        if entry is not None:
+            entry[2].clear()
+
+
+def _nodePaths(node):
+    """ Get the resolved paths of a node, watching its attributes on first use.
+
+        Args:
+            node (Dep_Node): The node owning the attributes.
+
+        Returns:
+            dict: {attr: (path, fullPath)}, None if the node does not exist.
+    """
+    entry = _PATH_CACHE.get(node.node)
+    if entry is not None:
+        if entry[0].isValid():
+            return entry[2]
+        # deleted without the scene generation noticing, e.g. undo of its creation
+        del _PATH_CACHE[node.node]
+
+    if not node.dep:
+        return None
+
+    mObject = node.dep.object()
+    callbackId = om.MNodeMessage.addAttributeChangedCallback(mObject, _attributeChanged, node.node)
+    entry = _PATH_CACHE[node.node] = (om.MObjectHandle(mObject), callbackId, {})
+    return entry[2]
+
+
+def _resolvePaths(node, attribute):
+    """ Resolve and cache the partial and full path of an existing attribute.
+
+        Args:
+            node (Dep_Node): The node owning the attribute.
+            attribute (str): The attribute name.
+
+        Returns:
+            tuple: (path, fullPath), (None, None) if the attribute does not exist.
+    """
+    global _PATH_CACHE_GENERATION
+
+    generation = scene_generation.current()
+    if generation != _PATH_CACHE_GENERATION:
+        clearPathCache()
+        _PATH_CACHE_GENERATION = generation
+
+    nodePaths = _nodePaths(node)
+    if nodePaths is None:
+        return None, None
+
+    paths = nodePaths.get(attribute)
+    if paths is None:
+        nodeFullPath = node.fullPath
+        fullPath = "{}.{}".format(nodeFullPath, attribute)
+        if not nodeFullPath or not cmds.objExists(fullPath):
+            # Missing attributes are not cached, they may be added at any time
+            return None, None
+
+        paths = ("{}.{}".format(node.path, attribute), fullPath)
+        nodePaths[attribute] = paths
+
+    return paths
+
+
+# drop the callbacks of the module before a reload
+clearPathCache()
+
+
 
 
 class Attributes(object):
@@ -477,27 +576,29 @@ class Attribute(object):
 
     @property
     def path(self):
-        """ Object attribute string path with node name and attr.
+        """ Object attribute string path with node name and attr, None if it does not exist.
+            Resolved once per scene generation, renaming, deleting or
+            reparenting any node invalidates it, removing or renaming an
+            attribute invalidates the paths of its node.
 
             Example:
                 print(sphere.a.rotateX.path)
                 Output:"sphere_Geo.rotateX"
         """
-        nodePath = "{}.{}".format(self.node.path, self.attribute)
-        if self.node.path and cmds.objExists(nodePath):
-            return nodePath
+        return _resolvePaths(self.node, self.attribute)[0]
 
     @property
     def fullPath(self):
-        """ Object attribute string full path with node full path, name and attr.
+        """ Object attribute string full path with node full path, name and attr, None if it does not exist.
+            Resolved once per scene generation, renaming, deleting or
+            reparenting any node invalidates it, removing or renaming an
+            attribute invalidates the paths of its node.
 
             Example:
                 print(sphere.a.rotateX.path)
                 Output:"|BASE_GRP|SUB_GRP|sphere_Geo.rotateX"
         """
-        nodePath = "{}.{}".format(self.node.fullPath, self.attribute)
-        if self.node.fullPath and cmds.objExists(nodePath):
-            return nodePath
+        return _resolvePaths(self.node, self.attribute)[1]
 
     def exists(self):
         """ Checks whether our attribute exists
@@ -9,7 +9,9 @@ from MayaBase.modules.nodel import Dag_Node as Dag
 import maya.cmds as cmds
 
 import unittest
+from unittest import mock
 
+from MayaBase.modules.nodel.base import attribute_base
 from MayaBase.modules.nodel.base.attribute_base import Attribute
 
 
@@ -84,6 +86,59 @@ class Test_Attribute_Base(Test_Attributes_Base):
         expectedResult = "Attribute('{0}.tx')".format(self.sphereName)
         self.assertEqual(expectedResult, self.sphere.a.tx.__repr__())
 
+    def test_attribute_fullPath_cached(self):
+        attribute = self.sphere.a.rx
+        expectedResult = "|{0}_OFF_GRP|{0}.rx".format(self.sphereName)
+        self.assertEqual(attribute.fullPath, expectedResult)
+
+        with mock.patch.object(attribute_base.cmds, "objExists", wraps=cmds.objExists) as objExists:
+            self.assertEqual(attribute.fullPath, expectedResult)
+            self.assertEqual(attribute.path, self.sphereName + ".rx")
+            self.assertEqual(str(attribute), expectedResult)
+            self.assertEqual(objExists.call_count, 0)
+
+    def test_attribute_fullPath_rename(self):
+        attribute = self.sphere.a.rx
+        attribute.fullPath
+        self.sphere.rename("ball_GEO")
+
+        expectedResult = "|{0}_OFF_GRP|ball_GEO.rx".format(self.sphereName)
+        self.assertEqual(attribute.fullPath, expectedResult)
+
+    def test_attribute_fullPath_deleteAttr(self):
+        cmds.addAttr(self.sphere.fullPath, ln="attr_item_1", at="double")
+        attribute = self.sphere.a.attr_item_1
+        self.assertEqual(attribute.path, self.sphereName + ".attr_item_1")
+
+        cmds.deleteAttr(attribute.fullPath)
+        self.assertIsNone(attribute.path)
+        self.assertIsNone(attribute.fullPath)
+        self.assertFalse(attribute.exists())
+
+    def test_attribute_fullPath_renameAttr(self):
+        cmds.addAttr(self.sphere.fullPath, ln="attr_item_1", at="double")
+        attribute = self.sphere.a.attr_item_1
+        attribute.fullPath
+
+        cmds.renameAttr(attribute.fullPath, "attr_item_2")
+        self.assertIsNone(attribute.fullPath)
+        self.assertEqual(self.sphere.a.attr_item_2.path, self.sphereName + ".attr_item_2")
+
+    def test_attribute_fullPath_other_node_changes(self):
+        attribute = self.sphere.a.rx
+        attribute.fullPath
+
+        # new nodes and attributes of other nodes leave the resolved paths alone
+        cmds.addAttr(self.cube.fullPath, ln="attr_item_1", at="double")
+        cmds.deleteAttr(self.cube.fullPath + ".attr_item_1")
+        transform = cmds.createNode("transform")
+        try:
+            with mock.patch.object(attribute_base.cmds, "objExists", wraps=cmds.objExists) as objExists:
+                attribute.fullPath
+            self.assertEqual(objExists.call_count, 0)
+        finally:
+            cmds.delete(transform)
+
     def test_attribute__lshift__(self):
         self.plane.a.tx << self.cube.a.tx
         self.assertEqual(self.plane.a.tx.get(), 2)
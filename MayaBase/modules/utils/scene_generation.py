@@ -0,0 +1,79 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+About: A scene generation counter that increases whenever cached node or
+        attribute paths could have become invalid (rename, delete, reparent,
+        undo/redo, new or opened scene). A new node cannot make an existing
+        path stale, so node creation does not count.
+"""
+
+import maya.OpenMaya as om
+
+
+# importlib.reload runs this module again in the same namespace, the generation and the
+# callbacks registered before are kept, the callbacks are replaced at the end of the module
+_GENERATION = globals().get("_GENERATION", 0)
+_CALLBACK_IDS = globals().get("_CALLBACK_IDS", [])
+
+
+def bump(*args):
+    """Invalidate everything cached against the current generation.
+
+    Used as the callback of every registered Maya message, so it accepts
+    and ignores any callback arguments.
+
+    Example:
+        cmds.deleteAttr("sphere_GEO.attr_item_1")
+        bump()
+    """
+    global _GENERATION
+    _GENERATION += 1
+
+
+def current():
+    """Get the current scene generation, registering the callbacks on first use.
+
+    Returns:
+        int: The scene generation, cached values tagged with an older one are stale.
+
+    Example:
+        generation = current()
+        cmds.rename("sphere_GEO", "ball_GEO")
+        print(current() == generation)
+        # Output: False
+    """
+    if not _CALLBACK_IDS:
+        install()
+    return _GENERATION
+
+
+def install():
+    """Register the Maya messages that invalidate cached paths.
+
+    Called once from userSetup.py, current() installs them on first use
+    in sessions started without it (e.g. mayapy).
+    """
+    if _CALLBACK_IDS:
+        return
+
+    _CALLBACK_IDS.append(om.MDGMessage.addNodeRemovedCallback(bump))
+    _CALLBACK_IDS.append(om.MNodeMessage.addNameChangedCallback(om.MObject(), bump))
+    _CALLBACK_IDS.append(om.MDagMessage.addParentAddedCallback(bump))
+    _CALLBACK_IDS.append(om.MDagMessage.addParentRemovedCallback(bump))
+    _CALLBACK_IDS.append(om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, bump))
+    _CALLBACK_IDS.append(om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, bump))
+    _CALLBACK_IDS.append(om.MEventMessage.addEventCallback("Undo", bump))
+    _CALLBACK_IDS.append(om.MEventMessage.addEventCallback("Redo", bump))
+
+
+def uninstall():
+    """Remove the registered Maya messages, everything cached so far becomes stale."""
+    while _CALLBACK_IDS:
+        om.MMessage.removeCallback(_CALLBACK_IDS.pop())
+    bump()
+
+
+# a reload registers the callbacks again, bound to the reloaded functions
+if _CALLBACK_IDS:
+    uninstall()
+    install()
@@ -0,0 +1,62 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+About: Tests for our scene generation counter
+"""
+
+import importlib
+import unittest
+
+import maya.cmds as cmds
+
+from MayaBase.modules.utils import scene_generation
+
+
+class Test_Scene_Generation(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sphere = cmds.polySphere(n="sphere_GEO")[0]
+        self.group = cmds.group(n="BASE_GRP", em=1)
+
+    def tearDown(self) -> None:
+        for node in ["sphere_GEO", "ball_GEO", "BASE_GRP"]:
+            if cmds.objExists(node):
+                cmds.delete(node)
+
+    def test_current_is_stable(self):
+        self.assertEqual(scene_generation.current(), scene_generation.current())
+
+    def test_bump(self):
+        generation = scene_generation.current()
+        scene_generation.bump()
+        self.assertGreater(scene_generation.current(), generation)
+
+    def test_rename_invalidates(self):
+        generation = scene_generation.current()
+        cmds.rename(self.sphere, "ball_GEO")
+        self.assertNotEqual(scene_generation.current(), generation)
+
+    def test_parent_invalidates(self):
+        generation = scene_generation.current()
+        cmds.parent(self.sphere, self.group)
+        self.assertNotEqual(scene_generation.current(), generation)
+
+    def test_create_keeps_generation(self):
+        generation = scene_generation.current()
+        cmds.createNode("transform", n="BASE_GRP1")
+        cmds.delete("BASE_GRP1")
+        self.assertEqual(scene_generation.current(), generation + 1)
+
+    def test_reload_replaces_callbacks(self):
+        scene_generation.current()
+        callbackCount = len(scene_generation._CALLBACK_IDS)
+        importlib.reload(scene_generation)
+        self.assertEqual(len(scene_generation._CALLBACK_IDS), callbackCount)
+
+    def test_delete_invalidates(self):
+        generation = scene_generation.current()
+        cmds.delete(self.sphere)
+        self.assertNotEqual(scene_generation.current(), generation)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -32,14 +32,21 @@ try:
 except ImportError:
     import xml.etree.ElementTree as ET
 
-import importlib
-from Rfm2Rfk import utils
-importlib.reload(utils)
 
-from Rfm2Rfk import m2k
-importlib.reload(m2k)
+def copy(path=None, cache=None, previous=None):
+    """
+    Copy the selected shading network to the clipboard, see m2k.copy
 
-copy = m2k.copy
-del m2k
+    The maya pipeline is imported on first use, so importing Rfm2Rfk stays
+    cheap and works outside of maya.
+    """
+    from Rfm2Rfk import m2k
+    return m2k.copy(path, cache=cache, previous=previous)
 
 
+def copyAsync(cache=None):
+    """
+    Copy the selected shading network to the clipboard without freezing maya, see m2k.copyAsync
+    """
+    from Rfm2Rfk import m2k
+    return m2k.copyAsync(cache=cache)
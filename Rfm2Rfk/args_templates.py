@@ -0,0 +1,401 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Generate katana node templates from RenderMan .args files
+
+The hand captured templates of templates.TEMPLATE_DIR only cover a few node
+types. Every RenderMan pattern and bxdf describes its parameters, pages and
+outputs in an .args file, the same katana template is built from it:
+
+    python -m Rfm2Rfk.args_templates $RMANTREE/lib/plugins/Args
+
+Templates are written into templates.GENERATED_TEMPLATE_DIR and compiled into
+the template disk cache right away, so maya never parses or generates them. A
+template whose content did not change is not written again, its compiled
+index stays valid.
+"""
+
+import argparse
+import logging
+import re
+import sys
+
+from pathlib import Path
+
+from Rfm2Rfk import ET, templates
+
+log = logging.getLogger("clip")
+
+# shader types of the .args files turned into templates
+SHADER_TYPES = ("pattern", "bxdf")
+
+# values of the parameter types, in components
+_TUPLE_SIZES = {"color": 3, "normal": 3, "vector": 3, "point": 3, "matrix": 16}
+
+# katana attribute type of every numeric parameter type, other types are strings
+_ATTRIBUTE_TYPES = {"float": "FloatAttr", "color": "FloatAttr", "normal": "FloatAttr", "vector": "FloatAttr",
+                    "point": "FloatAttr", "matrix": "FloatAttr", "vstruct": "FloatAttr", "int": "IntAttr"}
+
+# port colors katana uses for each port tag, from the captured templates
+_PORT_COLORS = {
+    "float": "0.2471 0.3686 0.5725",
+    "int": "0.1843 0.4863 0.4824",
+    "normal": "0.5686 0.2980 0.1882",
+    "vector": "0.4157 0.4431 0.5882",
+    "point": "0.4157 0.4431 0.5882",
+}
+_DEFAULT_PORT_COLOR = "0.2627 0.5686 0.3176"
+
+# parameters connectable unless their .args say otherwise
+_CONNECTABLE_TYPES = ("float", "color", "normal", "vector", "point", "matrix", "struct", "vstruct", "bxdf")
+
+# "float[4]" style array types
+_ARRAY_TYPE = re.compile(r"^(\w+)\[(\d*)\]$")
+
+
+def readArgs(path):
+    """
+    Read the parameters and outputs of a RenderMan .args file
+
+    Args:
+        path (str/Path): .args file, named after its node type
+
+    Returns:
+        dict: {
+        "nodeType" : node type, from the file name,
+        "shaderType" : "pattern", "bxdf", ... None if not declared,
+        "parameters" : [{"name", "type", "default", "label", "page", "connectable", "tags",
+                         "arraySize", "isDynamicArray"}, ...] in .args order,
+        "outputs" : [{"name", "tags"}, ...]
+        }
+
+    Example:
+        args = readArgs("PxrChecker.args")
+        print([param["name"] for param in args["parameters"]])
+        Output: ["colorA", "colorB", "dimensions", "manifold"]
+    """
+    root = ET.parse(path).getroot()
+    if root.tag != "args":
+        raise ValueError(f"{path} is not a RenderMan .args file")
+
+    shader_type = None
+    shader_element = root.find("shaderType")
+    if shader_element is not None:
+        shader_type = shader_element.get("name")
+        tag = shader_element.find("tag")
+        if shader_type is None and tag is not None:
+            shader_type = tag.get("value")
+
+    parameters = []
+    outputs = []
+    _readElements(root, "", parameters, outputs)
+    return {"nodeType": Path(path).stem, "shaderType": shader_type, "parameters": parameters, "outputs": outputs}
+
+
+def _readElements(element, page, parameters, outputs):
+    """
+    Collect the parameters and outputs of an .args element, pages are walked recursively
+
+    Args:
+        element (ET.Element): args root or page
+        page (str): page path of the element, nested pages joined with "."
+        parameters (list): collected parameters
+        outputs (list): collected outputs
+    """
+    for child in element:
+        if child.tag == "page":
+            name = child.get("name", "")
+            _readElements(child, f"{page}.{name}" if page else name, parameters, outputs)
+
+        elif child.tag == "param":
+            param_type = child.get("type", "float")
+            array_size = child.get("arraySize")
+            match = _ARRAY_TYPE.match(param_type)
+            if match:
+                param_type, array_size = match.group(1), match.group(2) or None
+            connectable = child.get("connectable")
+            parameters.append({
+                "name": child.get("name"),
+                "type": param_type,
+                "default": child.get("default", ""),
+                "label": child.get("label"),
+                "page": page,
+                "connectable": (param_type in _CONNECTABLE_TYPES if connectable is None
+                                else connectable.lower() not in ("false", "0")),
+                "tags": [child.get("struct_name") or param_type],
+                "arraySize": int(array_size) if array_size else None,
+                "isDynamicArray": child.get("isDynamicArray", "0") == "1",
+            })
+
+        elif child.tag == "output":
+            tags = [tag.get("value") for tag in child.iter("tag")]
+            if not tags and child.get("tag"):
+                tags = child.get("tag").split("|")
+            outputs.append({"name": child.get("name"), "tags": tags or ["color"]})
+
+
+def _formatNumber(value):
+    """
+    Format a number like katana does in its templates, "1" and "0.18"
+    """
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _numbers(default, size):
+    """
+    Get the numeric default values of a parameter, a single value is repeated over every component
+
+    Args:
+        default (str): default of the .args file, space separated
+        size (int): number of values
+
+    Returns:
+        list: formatted values
+    """
+    values = default.replace(",", " ").split()
+    try:
+        values = [_formatNumber(value) for value in values]
+    except ValueError:
+        values = []
+    if not values:
+        values = ["0"]
+    if len(values) < size:
+        values = values * size if len(values) == 1 else values + ["0"] * (size - len(values))
+    return values[:size]
+
+
+def _buildParameter(parent, name, param_type, default, array_size=None, dynamic=False):
+    """
+    Add the group_parameter of a single parameter to the "parameters" group
+
+    Args:
+        parent (ET.Element): "parameters" group
+        name (str): parameter name
+        param_type (str): .args parameter type
+        default (str): default of the .args file
+        array_size (int): fixed number of elements of an array parameter
+        dynamic (bool): the parameter is a dynamic array
+    """
+    group = ET.SubElement(parent, "group_parameter", {"name": name})
+    ET.SubElement(group, "number_parameter", {"name": "enable", "value": "0"})
+    attribute_type = _ATTRIBUTE_TYPES.get(param_type, "StringAttr")
+
+    if attribute_type == "StringAttr":
+        ET.SubElement(group, "string_parameter", {"name": "value", "value": default})
+    else:
+        tuple_size = _TUPLE_SIZES.get(param_type, 1)
+        if dynamic:
+            ET.SubElement(group, "number_parameter", {"name": "isDynamicArray", "value": "1"})
+            array_size = 1
+        if array_size or tuple_size > 1:
+            size = (array_size or 1) * tuple_size
+            value = ET.SubElement(group, "numberarray_parameter",
+                                  {"name": "value", "size": str(size), "tupleSize": str(tuple_size)})
+            for i, number in enumerate(_numbers(default, size)):
+                ET.SubElement(value, "number_parameter", {"name": f"i{i}", "value": number})
+        else:
+            ET.SubElement(group, "number_parameter", {"name": "value", "value": _numbers(default, 1)[0]})
+
+    ET.SubElement(group, "string_parameter", {"name": "type", "value": attribute_type})
+
+
+def _buildPort(root, name, port_type, tags, metadata=None):
+    """
+    Add a port to the template root
+
+    Args:
+        root (ET.Element): template root
+        name (str): port name
+        port_type (str): "in" or "out"
+        tags (list): port tags, the first one decides the port color
+        metadata (list): (key, value) entries of an input port
+    """
+    color = _PORT_COLORS.get(tags[0], _DEFAULT_PORT_COLOR)
+    port = ET.SubElement(root, "port", {"color": color, "name": name, "type": port_type})
+    tags_element = ET.SubElement(port, "tags")
+    for tag in tags:
+        ET.SubElement(tags_element, "tag", {"name": tag})
+    if metadata:
+        metadata_element = ET.SubElement(port, "metadata")
+        for key, value in metadata:
+            ET.SubElement(metadata_element, "entry", {"key": key, "value": value})
+
+
+def buildTemplate(args):
+    """
+    Build the katana template of a node type, same layout as the captured templates
+
+    Args:
+        args (dict): node type description, from readArgs
+
+    Returns:
+        ET.Element: template root, readable by templates.TemplateIndex
+    """
+    node_type = args["nodeType"]
+    root = ET.Element("node", {"baseType": "PrmanShadingNode", "name": node_type,
+                               "ns_fromContext": "networkMaterial", "ns_viewState": "2", "selected": "true",
+                               "type": "PrmanShadingNode", "x": "0", "y": "0"})
+
+    for parameter_index, param in enumerate(args["parameters"], 1):
+        if not param["connectable"]:
+            continue
+        metadata = []
+        if param["label"]:
+            metadata.append(("label", param["label"]))
+        if param["page"]:
+            metadata.append(("page", param["page"]))
+        metadata.append(("parameterIndex", str(parameter_index)))
+        _buildPort(root, param["name"], "in", param["tags"], metadata)
+
+    for output in args["outputs"]:
+        _buildPort(root, output["name"], "out", output["tags"])
+    if args["shaderType"] == "bxdf":
+        _buildPort(root, "bxdf_out", "out", ["bxdf"])
+
+    group = ET.SubElement(root, "group_parameter", {"name": node_type})
+    for name, value in (("name", node_type), ("nodeType", node_type), ("__lastValue", ""),
+                        ("__showHiddenParams", "False")):
+        ET.SubElement(group, "string_parameter", {"name": name, "value": value})
+
+    parameters = ET.SubElement(group, "group_parameter", {"name": "parameters"})
+    for param in args["parameters"]:
+        _buildParameter(parameters, param["name"], param["type"], param["default"], param["arraySize"],
+                        param["isDynamicArray"])
+    for output in args["outputs"]:
+        _buildParameter(parameters, output["name"], output["tags"][0], "")
+    ET.SubElement(parameters, "group_parameter", {"name": "__unused"})
+
+    public_interface = ET.SubElement(group, "group_parameter", {"name": "publicInterface"})
+    for name in ("namePrefix", "pagePrefix", "nameRegExFind", "nameRegExReplace", "pageRegExFind",
+                 "pageRegExReplace"):
+        ET.SubElement(public_interface, "string_parameter", {"name": name, "value": ""})
+    ET.SubElement(group, "string_parameter", {"name": "forceRefresh", "value": ""})
+
+    return root
+
+
+def generateTemplate(args_path, output_dir=None):
+    """
+    Write the katana template of an .args file, an unchanged template is not written again
+
+    Args:
+        args_path (str/Path): .args file
+        output_dir (str/Path): directory to write into, templates.GENERATED_TEMPLATE_DIR if not given
+
+    Returns:
+        tuple: (node type, template file, True if the file was written), None if the shader type is not
+               in SHADER_TYPES
+    """
+    args = readArgs(args_path)
+    if args["shaderType"] not in SHADER_TYPES:
+        return None
+
+    output_dir = Path(output_dir or templates.GENERATED_TEMPLATE_DIR)
+    file = output_dir/f"{args['nodeType']}.xml"
+    content = ET.tostring(buildTemplate(args), encoding="unicode")
+    if file.is_file() and file.read_text(encoding="utf-8") == content:
+        return args["nodeType"], file, False
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    file.write_text(content, encoding="utf-8")
+    return args["nodeType"], file, True
+
+
+def listArgs(paths):
+    """
+    Get the .args files of files and directories
+
+    Args:
+        paths (list): .args files or directories holding them
+
+    Returns:
+        list: .args files, sorted per directory
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.args")))
+        else:
+            files.append(path)
+    return files
+
+
+def generateTemplates(paths, output_dir=None, precompile=True):
+    """
+    Generate the templates of every pattern and bxdf in one pass
+
+    A file which fails is logged and skipped, the others are still generated.
+
+    Args:
+        paths (list): .args files or directories holding them
+        output_dir (str/Path): directory to write into, templates.GENERATED_TEMPLATE_DIR if not given
+        precompile (bool): compile the templates into the template disk cache, only when written into
+                        templates.GENERATED_TEMPLATE_DIR
+
+    Returns:
+        dict: {
+        "generated" : {node type: written template file},
+        "unchanged" : [node types whose template was already up to date],
+        "skipped" : [.args files of other shader types],
+        "errors" : {.args file: error message}
+        }
+
+    Example:
+        result = generateTemplates(["/opt/pixar/RenderManProServer-26.0/lib/plugins/Args"])
+        print(sorted(result["generated"])[:2])
+        Output: ["PxrAdjustNormal", "PxrAttribute"]
+    """
+    output_dir = Path(output_dir or templates.GENERATED_TEMPLATE_DIR)
+    result = {"generated": {}, "unchanged": [], "skipped": [], "errors": {}}
+    node_types = []
+    for args_path in listArgs(paths):
+        try:
+            generated = generateTemplate(args_path, output_dir)
+        except (ET.ParseError, OSError, ValueError) as error:
+            log.error("Failed to generate a template from %s: %s", args_path, error)
+            result["errors"][str(args_path)] = str(error)
+            continue
+
+        if generated is None:
+            result["skipped"].append(str(args_path))
+            continue
+        node_type, file, written = generated
+        node_types.append(node_type)
+        if written:
+            result["generated"][node_type] = str(file)
+        else:
+            result["unchanged"].append(node_type)
+
+    log.info("Generated %d templates, %d unchanged", len(result["generated"]), len(result["unchanged"]))
+    if precompile and output_dir.resolve() == Path(templates.GENERATED_TEMPLATE_DIR).resolve():
+        templates.compileTemplates(node_types)
+    return result
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    Args:
+        argv (list): command line arguments, sys.argv[1:] if not given
+
+    Returns:
+        int: exit code, 1 if any .args file failed
+    """
+    parser = argparse.ArgumentParser(description="Generate katana node templates from RenderMan .args files")
+    parser.add_argument("args", nargs="+", help=".args files or directories holding them")
+    parser.add_argument("-o", "--output", default=None,
+                        help=f"output directory, {templates.GENERATED_TEMPLATE_DIR} by default")
+    parser.add_argument("--no-compile", action="store_true",
+                        help="do not compile the templates into the template cache")
+    args = parser.parse_args(argv)
+
+    result = generateTemplates(args.args, args.output, precompile=not args.no_compile)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Headless batch export of every material in a maya scene to katana XML files
+
+Runs in mayapy, without a Qt application or the clipboard:
+
+    mayapy -m Rfm2Rfk.batch /path/to/scene.ma -o /path/to/output
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from pathlib import Path
+
+import maya.cmds as cmds
+
+from Rfm2Rfk import export_session, instrumentation, m2k, templates, utils
+from Rfm2Rfk import dump as network_dump
+from Rfm2Rfk.farm import sceneDirectoryName, uniqueScenes
+from Rfm2Rfk.utils import getMaterialRoots
+
+# maya default shading engines, never part of an exported library
+DEFAULT_SHADING_ENGINES = ["initialShadingGroup", "initialParticleSE"]
+
+RENDERMAN_PLUGIN = "RenderMan_for_Maya"
+
+# file name of a combined export of a scene, without extension
+COMBINED_NAME = "materials"
+
+# prefix of the stdout line carrying a scene result with --json, see Rfm2Rfk.farm
+RESULT_PREFIX = "RFM2RFK_RESULT "
+
+
+def getMaterialFileName(shading_engine, suffix=".xml"):
+    """
+    Get a file name for a material, namespaces and dag separators are replaced
+
+    Args:
+        shading_engine (str): shadingEngine node name
+        suffix (str): file extension
+
+    Returns:
+        str: file name (e.g. "char_body_SG.xml")
+    """
+    return shading_engine.replace(":", "_").replace("|", "_") + suffix
+
+
+def getMaterialFileNames(shading_engines, suffix=".xml"):
+    """
+    Get a distinct file name for every material, materials whose names only differ by separators
+    (e.g. "char:body_SG" and "char_body_SG") get a numbered suffix instead of overwriting each other
+
+    Args:
+        shading_engines (list): shadingEngine node names
+        suffix (str): file extension
+
+    Returns:
+        dict: {shadingEngine: file name}, in input order
+
+    Example:
+        print(getMaterialFileNames(["char:body_SG", "char_body_SG"]))
+        Output: {"char:body_SG": "char_body_SG.xml", "char_body_SG": "char_body_SG_2.xml"}
+    """
+    file_names = {}
+    taken = set()
+    for shading_engine in shading_engines:
+        stem = getMaterialFileName(shading_engine, "")
+        file_name, number = stem + suffix, 1
+        # case insensitive file systems would still overwrite
+        while file_name.lower() in taken:
+            number += 1
+            file_name = "{}_{}{}".format(stem, number, suffix)
+        if number > 1:
+            utils.log.warning("%s would overwrite the file of another material, writing %s instead",
+                              shading_engine, file_name)
+        taken.add(file_name.lower())
+        file_names[shading_engine] = file_name
+    return file_names
+
+
+def exportMaterial(shading_engine, output_dir, dump=False, file_name=None):
+    """
+    Export the surface and displacement networks of a shadingEngine into one katana XML file
+
+    Args:
+        shading_engine (str): shadingEngine node name
+        output_dir (str/Path): directory to write into
+        dump (bool): write a network dump instead, converted later without maya (see Rfm2Rfk.convert)
+        file_name (str): file to write in output_dir, from getMaterialFileName if not given
+
+    Returns:
+        Path: written file, None if the shadingEngine has no shader
+    """
+    roots = getMaterialRoots(shading_engine)
+    if not roots:
+        return None
+
+    path = Path(output_dir) / (file_name or getMaterialFileName(shading_engine, ".json" if dump else ".xml"))
+    exportNetwork(roots, path, dump)
+    return path
+
+
+def exportMaterials(shading_engines, path, dump=False):
+    """
+    Export several shadingEngines into one katana XML file, the nodes they share are queried and written once
+
+    Args:
+        shading_engines (list): shadingEngine node names
+        path (str/Path): file to write
+        dump (bool): write a network dump instead, converted later without maya (see Rfm2Rfk.convert)
+
+    Returns:
+        list: exported shadingEngines, the ones without shader are left out
+    """
+    exported = []
+    roots = []
+    for shading_engine in shading_engines:
+        material_roots = getMaterialRoots(shading_engine)
+        if material_roots:
+            exported.append(shading_engine)
+            roots.extend(material_roots)
+
+    if exported:
+        exportNetwork(list(dict.fromkeys(roots)), path, dump)
+    return exported
+
+
+def exportNetwork(roots, path, dump=False):
+    """
+    Export the networks of material terminal nodes into one katana XML file
+
+    Args:
+        roots (list): terminal node of every material (e.g. its PxrSurface)
+        path (str/Path): file to write
+        dump (bool): write a network dump instead, converted later without maya (see Rfm2Rfk.convert)
+    """
+    with export_session.ExportSession():
+        with instrumentation.stage("traverse"):
+            snapshot = utils.takeConnectionSnapshot(roots)
+        nodes_dict = m2k.generateNodes(snapshot.nodes, snapshot)
+
+    if dump:
+        network_dump.saveNetwork(nodes_dict, snapshot, path, roots)
+        return
+
+    with instrumentation.stage("tree"):
+        tree = m2k.buildTree(nodes_dict, snapshot, roots)
+    m2k.writeXML(tree, path, snapshot)
+
+
+def exportScene(output_dir, scene=None, dump=False, combined=False):
+    """
+    Export every material of a scene, one katana XML file per shadingEngine
+
+    A material which fails is logged and skipped, the others are still exported.
+    Materials which would share a file name are numbered, see getMaterialFileNames.
+    Combined, every material is written into a single file(COMBINED_NAME) where
+    the nodes they share appear once, a failure then fails every material.
+
+    Args:
+        output_dir (str/Path): directory to write into, created if missing
+        scene (str/Path): scene file to open first, the current scene if not given
+        dump (bool): write network dumps instead of katana XML files
+        combined (bool): write every material into one file
+
+    Returns:
+        dict: {
+        "materials" : {shadingEngine: written file path},
+        "errors" : {shadingEngine: error message}
+        }
+    """
+    if scene is not None:
+        cmds.file(str(scene), open=True, force=True)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    result = {"materials": {}, "errors": {}}
+    shading_engines = [node for node in cmds.ls(type="shadingEngine") or [] if node not in DEFAULT_SHADING_ENGINES]
+    if combined:
+        path = output_dir / getMaterialFileName(COMBINED_NAME, ".json" if dump else ".xml")
+        try:
+            exported = exportMaterials(shading_engines, path, dump)
+        except Exception as error:
+            utils.log.warning("Failed to export %s: %s", path, error)
+            result["errors"] = {shading_engine: str(error) for shading_engine in shading_engines}
+            return result
+
+        result["materials"] = {shading_engine: str(path) for shading_engine in exported}
+        utils.log.info("Exported %d materials to %s", len(exported), path)
+        return result
+
+    for shading_engine, file_name in getMaterialFileNames(shading_engines, ".json" if dump else ".xml").items():
+        try:
+            path = exportMaterial(shading_engine, output_dir, dump, file_name)
+        except Exception as error:
+            utils.log.warning("Failed to export %s: %s", shading_engine, error)
+            result["errors"][shading_engine] = str(error)
+            continue
+
+        if path is not None:
+            result["materials"][shading_engine] = str(path)
+            utils.log.info("Exported %s to %s", shading_engine, path)
+
+    return result
+
+
+def initializeStandalone():
+    """
+    Start maya standalone and load RenderMan when running outside of an interactive session
+    """
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    try:
+        cmds.loadPlugin(RENDERMAN_PLUGIN, quiet=True)
+    except RuntimeError:
+        utils.log.warning("Could not load %s, RenderMan nodes will not be recognised", RENDERMAN_PLUGIN)
+
+
+def main(argv=None):
+    """
+    Command line entry point, exports each scene into its own sub directory of the output directory, see
+    farm.sceneDirectoryName
+
+    Args:
+        argv (list): command line arguments, sys.argv[1:] if not given
+
+    Returns:
+        int: exit code, 1 if any material failed
+    """
+    parser = argparse.ArgumentParser(description="Export every RenderMan material of maya scenes to katana XML")
+    parser.add_argument("scenes", nargs="+", help=".ma/.mb scene files")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("--json", action="store_true", help="print every scene result as a json line")
+    parser.add_argument("--combined", action="store_true",
+                        help="write every material of a scene into one file, shared nodes once")
+    parser.add_argument("--dump", action="store_true",
+                        help="write network dumps to convert without maya (python -m Rfm2Rfk.convert)")
+    args = parser.parse_args(argv)
+
+    initializeStandalone()
+
+    failed = False
+    for scene in uniqueScenes(args.scenes):
+        result = exportScene(Path(args.output) / sceneDirectoryName(scene), scene, args.dump, args.combined)
+        failed = failed or bool(result["errors"])
+        if args.json:
+            result["scene"] = str(scene)
+            print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+    # the next workers read the templates compiled here from the disk cache
+    templates.flushDiskCache()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Batched comparison of numeric attributes against katana template defaults
+
+Nodes of a network sharing a type and an attribute layout (the same attribute
+names in the same order, as queried from maya) are compared together: their
+single values form one matrix and their tuple values one matrix per tuple
+size, each compared against the template defaults (TemplateIndex.defaultValues)
+in a single NumPy operation. Without NumPy, or for attributes of unexpected
+types, the same comparison runs in plain python.
+"""
+
+import operator
+
+from Rfm2Rfk import templates
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# same tolerance as m2k.compareParameter
+TOLERANCE = 0.0001
+
+# attribute layouts kept, the cache is emptied once full
+LAYOUT_CACHE_SIZE = 1024
+
+_LAYOUTS = {}
+
+
+class _Columns(object):
+    """
+    Parameters of a layout compared together, all single values or all tuples of the same size
+
+    Args:
+        names (list): parameter names, in attribute order
+        defaults (list): template default of each parameter
+        size (int): tuple size, 0 for single values
+    """
+
+    __slots__ = ("names", "defaults", "size", "getter", "array")
+
+    def __init__(self, names, defaults, size):
+        self.names = names
+        self.defaults = defaults
+        self.size = size
+        self.getter = operator.itemgetter(*names)
+        self.array = numpy.asarray(defaults, dtype=numpy.float64) if numpy is not None else None
+
+    def differs(self, value, default):
+        """
+        Compare a single attribute value like m2k.compareParameter
+
+        Returns:
+            bool: True if the value differs, None if it cannot be compared numerically
+        """
+        if self.size:
+            if not isinstance(value, list) or len(value) != self.size:
+                return None
+            return any(not abs(v - d) < TOLERANCE for v, d in zip(value, default))
+
+        if not isinstance(value, (int, float)):
+            return None
+        return not abs(value - default) < TOLERANCE
+
+
+def _layout(index, attributes):
+    """
+    Get the columns compared for an attribute layout of a node type
+
+    Args:
+        index (TemplateIndex): template index of the node type
+        attributes (tuple): attribute names, in node order
+
+    Returns:
+        list: _Columns, single values first then one per tuple size
+    """
+    key = (index, attributes)
+    layout = _LAYOUTS.get(key)
+    if layout is not None:
+        return layout
+
+    groups = {}
+    for name in attributes:
+        span = index.defaultSlices.get(name)
+        if span is None:
+            continue
+        start, stop, is_array = span
+        if is_array:
+            groups.setdefault(stop - start, ([], []))
+            groups[stop - start][0].append(name)
+            groups[stop - start][1].append(tuple(index.defaultValues[start:stop]))
+        else:
+            groups.setdefault(0, ([], []))
+            groups[0][0].append(name)
+            groups[0][1].append(index.defaultValues[start])
+
+    layout = [_Columns(names, defaults, size) for size, (names, defaults) in sorted(groups.items())]
+    if len(_LAYOUTS) >= LAYOUT_CACHE_SIZE:
+        _LAYOUTS.clear()
+    _LAYOUTS[key] = layout
+    return layout
+
+
+def _compareNumpy(columns, group):
+    """
+    Compare one column group of every node sharing a layout in one NumPy operation
+
+    Args:
+        columns (_Columns): compared parameters
+        group (list): attribute dicts of the nodes
+
+    Returns:
+        list: one list of bools per node, None if some values are not numeric or not of the tuple size
+    """
+    rows = [columns.getter(attributes) for attributes in group]
+    # itemgetter returns the value itself rather than a 1-tuple for a single name
+    tail = (columns.size,) if columns.size else ()
+    shape = (len(group),) + ((len(columns.names),) if len(columns.names) > 1 else ()) + tail
+    try:
+        values = numpy.array(rows)
+    except ValueError:
+        return None
+    if values.shape != shape or values.dtype.kind not in "biuf":
+        return None
+
+    values = values.reshape((len(group), len(columns.names)) + tail)
+    component_differs = ~(numpy.abs(values - columns.array) < TOLERANCE)
+    if columns.size:
+        component_differs = component_differs.any(axis=2)
+    return component_differs.tolist()
+
+
+def _comparePython(columns, attributes):
+    """
+    Compare one column group of a single node in plain python
+
+    Args:
+        columns (_Columns): compared parameters
+        attributes (dict): node attributes
+
+    Returns:
+        dict: {parameter name: True if it differs}, values which cannot be compared are left out
+    """
+    mask = {}
+    for name, default in zip(columns.names, columns.defaults):
+        differ = columns.differs(attributes[name], default)
+        if differ is not None:
+            mask[name] = differ
+    return mask
+
+
+def networkMasks(nodes):
+    """
+    Compare the numeric attributes of every node of a network against their template defaults
+
+    Single values are compared with float defaults and lists with tuple defaults
+    of the same size, every other attribute is left to m2k.compareParameter.
+
+    Args:
+        nodes (list): node dicts with "name", "type" and "attributes"
+
+    Returns:
+        dict: {node name: {parameter name: True if it differs from the default}},
+              parameters which cannot be compared numerically are left out
+
+    Example:
+        masks = networkMasks([surface_dict])
+        print(masks["PxrSurface1"])
+        Output: {"specularRoughness": True, "diffuseColor": False}
+    """
+    masks = {}
+    groups = {}
+    for node in nodes:
+        masks[node["name"]] = {}
+        attributes = node["attributes"]
+        groups.setdefault((node["type"], tuple(attributes)), []).append(node)
+
+    for (node_type, attribute_names), group in groups.items():
+        for columns in _layout(templates.getTemplateIndex(node_type), attribute_names):
+            rows = None
+            if numpy is not None:
+                rows = _compareNumpy(columns, [node["attributes"] for node in group])
+
+            if rows is None:
+                for node in group:
+                    masks[node["name"]].update(_comparePython(columns, node["attributes"]))
+            else:
+                for node, row in zip(group, rows):
+                    masks[node["name"]].update(zip(columns.names, row))
+
+    return masks
+
+
+def parameterMask(node):
+    """
+    Compare the numeric attributes of a single node against their template defaults
+
+    Args:
+        node (dict): node dict with "name", "type" and "attributes"
+
+    Returns:
+        dict: {parameter name: True if it differs from the default}
+    """
+    return networkMasks([node])[node["name"]]
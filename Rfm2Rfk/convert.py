@@ -0,0 +1,157 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Convert network dumps to katana XML without maya
+
+Runs in any python 3 interpreter, so the conversion can run on machines
+without a maya license:
+
+    mayapy -m Rfm2Rfk.batch /library/scene.mb -o /path/to/dumps --dump
+    python -m Rfm2Rfk.convert /path/to/dumps/scene/*.json -o /path/to/output -j 32
+
+Every dump is written to a katana XML file of the same name in the output
+directory, dumps of several directories (e.g. one per scene) keep their
+directories relative to the directory common to all of them.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from Rfm2Rfk import dump, mapping
+
+log = logging.getLogger("clip")
+
+
+def convertDump(dump_path, output):
+    """
+    Convert a single network dump
+
+    Args:
+        dump_path (str/Path): dump file
+        output (str/Path/file): katana XML file, or a text file object to write into
+    """
+    nodes, snapshot, roots = dump.loadNetwork(dump_path)
+    # same layout as the export in maya, one band per material
+    tree = mapping.buildTree(nodes, snapshot, roots)
+    mapping.writeXML(tree, output, snapshot)
+
+
+def outputPaths(dump_paths, output_dir):
+    """
+    Get the katana XML file of every dump, dumps of the same name in different directories stay apart
+
+    Args:
+        dump_paths (list): dump files
+        output_dir (str/Path): output directory
+
+    Returns:
+        dict: {dump file: XML file}, in input order
+    """
+    directories = [os.path.dirname(os.path.abspath(path)) for path in dump_paths]
+    common = os.path.commonpath(directories) if directories else ""
+    return {str(path): Path(output_dir) / os.path.relpath(directory, common) / (Path(path).stem + ".xml")
+            for path, directory in zip(dump_paths, directories)}
+
+
+def _convertInto(dump_path, path):
+    """
+    Convert a dump into its XML file, its directory is created if missing
+
+    Returns:
+        str: written file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    convertDump(dump_path, path)
+    return str(path)
+
+
+def convertDumps(dump_paths, output_dir, workers=None):
+    """
+    Convert network dumps, in parallel worker processes when workers is above 1
+
+    A dump which fails is logged and skipped, the others are still converted. A
+    dump which would overwrite the XML file of another one (e.g. "a.json" and
+    "a.msgpack" of the same directory) fails.
+
+    Args:
+        dump_paths (list): dump files
+        output_dir (str/Path): directory to write into, created if missing
+        workers (int): number of worker processes, cpu count if not given
+
+    Returns:
+        dict: {
+        "converted" : {dump file: written file path},
+        "errors" : {dump file: error message}
+        }
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    result = {"converted": {}, "errors": {}}
+    outcomes = []
+    targets = {}
+    written_by = {}
+    for path, xml_path in outputPaths(dump_paths, output_dir).items():
+        if xml_path in written_by:
+            outcomes.append((path, None, ValueError(f"{xml_path} is already written from {written_by[xml_path]}")))
+        else:
+            written_by[xml_path] = path
+            targets[path] = xml_path
+
+    if workers > 1 and len(targets) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(path, pool.submit(_convertInto, path, str(xml_path))) for path, xml_path in targets.items()]
+            for path, future in futures:
+                try:
+                    outcomes.append((path, future.result(), None))
+                except Exception as error:
+                    outcomes.append((path, None, error))
+    else:
+        for path, xml_path in targets.items():
+            try:
+                outcomes.append((path, _convertInto(path, xml_path), None))
+            except Exception as error:
+                outcomes.append((path, None, error))
+
+    for path, written, error in outcomes:
+        if error is not None:
+            log.error("Failed to convert %s: %s", path, error)
+            result["errors"][path] = str(error)
+        else:
+            log.info("Converted %s to %s", path, written)
+            result["converted"][path] = written
+
+    return result
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    Args:
+        argv (list): command line arguments, sys.argv[1:] if not given
+
+    Returns:
+        int: exit code, 1 if any dump failed
+    """
+    parser = argparse.ArgumentParser(description="Convert Rfm2Rfk network dumps to katana XML without maya")
+    parser.add_argument("dumps", nargs="+", help=".json/.msgpack network dumps")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes, cpu count by default")
+    args = parser.parse_args(argv)
+
+    result = convertDumps(args.dumps, args.output, args.workers)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Differences between two exports of a material network, and the katana patch applying them
+
+Works on node dicts and XML only, so it runs without maya. The nodes of every
+export are saved with saveNodes, the next export is compared against them:
+
+    changes = diffNodes(loadNodes("network.json"), nodes)
+    patch = buildPatchXML(changes, {name: mapped node element, ...})
+"""
+
+import json
+import math
+
+from Rfm2Rfk import ET
+
+# same tolerance as m2k.compareParameter
+TOLERANCE = 0.0001
+
+SAVED_NODES_VERSION = 1
+
+
+def saveNodes(nodes, path):
+    """
+    Save the nodes of an export for the next diff
+
+    Args:
+        nodes (dict): {node_name: node_dict}, only type, attributes and connections are kept
+        path (str/Path): json file
+    """
+    saved = {}
+    for name, node in nodes.items():
+        saved[name] = {
+            "type" : node["type"],
+            "attributes" : node["attributes"],
+            "connections" : node["connections"],
+        }
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump({"version": SAVED_NODES_VERSION, "nodes": saved}, json_file, indent=1, sort_keys=True)
+
+
+def loadNodes(path):
+    """
+    Load the nodes saved by saveNodes
+
+    Args:
+        path (str/Path): json file
+
+    Returns:
+        dict: {node_name: {"type", "attributes", "connections"}}
+
+    Raises:
+        ValueError: If the file was saved by an incompatible version
+    """
+    with open(path, encoding="utf-8") as json_file:
+        saved = json.load(json_file)
+    if saved.get("version") != SAVED_NODES_VERSION:
+        raise ValueError(f"Unsupported saved nodes version: {saved.get('version')}")
+    return saved["nodes"]
+
+
+def valuesDiffer(old, new):
+    """
+    Compare two attribute values, numbers and number lists within TOLERANCE
+
+    Args:
+        old (any): previous value
+        new (any): current value
+
+    Returns:
+        bool
+    """
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return not math.isclose(old, new, rel_tol=0.0, abs_tol=TOLERANCE)
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+        return len(old) != len(new) or any(valuesDiffer(a, b) for a, b in zip(old, new))
+    return old != new
+
+
+def diffNodes(previous, current):
+    """
+    Find what changed between two exports of a network
+
+    A node keeping its name but changing its type is removed and added again.
+
+    Args:
+        previous (dict): {node_name: node_dict} of the previous export
+        current (dict): {node_name: node_dict} of the current export
+
+    Returns:
+        dict: {
+        "added" : [node names, in current order],
+        "removed" : [node names, in previous order],
+        "updated" : [names of nodes with changed parameters or connections, in current order],
+        "parameters" : {node name: [changed attribute names, sorted]},
+        "connections" : {node name: {port: new source plug, None if disconnected}}
+        }
+
+    Example:
+        changes = diffNodes(loadNodes("network.json"), nodes)
+        print(changes["parameters"])
+        Output: {"PxrSurface1": ["specularRoughness"]}
+    """
+    changes = {"added": [], "removed": [], "updated": [], "parameters": {}, "connections": {}}
+
+    for name, old in previous.items():
+        new = current.get(name)
+        if new is None or new["type"] != old["type"]:
+            changes["removed"].append(name)
+
+    for name, new in current.items():
+        old = previous.get(name)
+        if old is None or new["type"] != old["type"]:
+            changes["added"].append(name)
+            continue
+
+        old_attributes = old["attributes"]
+        new_attributes = new["attributes"]
+        parameters = [attr for attr in set(old_attributes) | set(new_attributes)
+                      if attr not in old_attributes or attr not in new_attributes
+                      or valuesDiffer(old_attributes[attr], new_attributes[attr])]
+        if parameters:
+            changes["parameters"][name] = sorted(parameters)
+
+        old_connections = old["connections"]
+        new_connections = new["connections"]
+        rewired = {}
+        for port in sorted(set(old_connections) | set(new_connections)):
+            if old_connections.get(port) != new_connections.get(port):
+                rewired[port] = new_connections.get(port)
+        if rewired:
+            changes["connections"][name] = rewired
+
+        if parameters or rewired:
+            changes["updated"].append(name)
+
+    return changes
+
+
+def changedNodes(changes):
+    """
+    Get the nodes whose current XML is needed to build a patch
+
+    Args:
+        changes (dict): differences from diffNodes
+
+    Returns:
+        list: added and updated node names
+    """
+    return changes["added"] + changes["updated"]
+
+
+def isEmpty(changes):
+    """
+    Check if two exports are identical
+
+    Args:
+        changes (dict): differences from diffNodes
+
+    Returns:
+        bool
+    """
+    return not any(changes.values())
+
+
+def buildPatchXML(changes, mapped):
+    """
+    Build the katana patch applying the differences of two exports
+
+    The patch holds one "remove" element per removed node, one "add" element
+    holding the full XML of every added node, and one "update" element per
+    changed node holding its changed parameter groups and rewired ports. A
+    rewired port without "source" is disconnected. Parameters which are not
+    part of the katana template are skipped.
+
+    Args:
+        changes (dict): differences from diffNodes
+        mapped (dict): {node name: mapped katana node element} of every node in changedNodes
+
+    Returns:
+        ET.ElementTree: patch document
+    """
+    patch_root = ET.Element("katana_patch")
+
+    for name in changes["removed"]:
+        ET.SubElement(patch_root, "remove", {"name": name})
+
+    if changes["added"]:
+        added = ET.SubElement(patch_root, "add")
+        for name in changes["added"]:
+            added.append(mapped[name])
+
+    for name in changes["updated"]:
+        node_element = mapped[name]
+        update = ET.Element("update", {"name": name})
+
+        group = node_element.find("group_parameter")
+        parameters = group.find("group_parameter[@name='parameters']") if group is not None else None
+        for param_name in changes["parameters"].get(name, []):
+            param = parameters.find(f"group_parameter[@name='{param_name}']") if parameters is not None else None
+            if param is not None:
+                update.append(param)
+
+        for port_name in changes["connections"].get(name, {}):
+            port = node_element.find(f"port[@name='{port_name}']")
+            if port is not None:
+                update.append(port)
+
+        if len(update):
+            patch_root.append(update)
+
+    return ET.ElementTree(patch_root)
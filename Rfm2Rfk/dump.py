@@ -0,0 +1,160 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Network dumps: the node dicts and connection snapshot of a copy, saved to a file
+
+A dump holds everything the stages after m2k.generateNode need, including
+the child plug flags and the downstream connections deciding which nodes are
+orphaned, so it converts to katana XML without maya (see Rfm2Rfk.convert).
+Dumps are JSON, or msgpack when the file ends with .msgpack and msgpack is
+installed.
+
+    {
+    "version" : 2,
+    "nodes" : {node name: {"name", "type", "attributes", "connections", "fullPath"}},
+    "snapshot" : {"inputs", "childInputs", "outputs"},
+    "roots" : [terminal node of every exported material, in export order]
+    }
+
+The roots give a combined export the same per material layout as in maya,
+version 1 dumps have none and convert to a single band.
+"""
+
+import json
+
+from pathlib import Path
+
+from Rfm2Rfk.export_node import ExportNode, internKeys
+from Rfm2Rfk.snapshot import ConnectionSnapshot
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DUMP_VERSION = 2
+
+# older versions still read, missing keys take their defaults
+_READ_VERSIONS = (1, DUMP_VERSION)
+
+MSGPACK_SUFFIXES = (".msgpack", ".mpk")
+
+# keys of the node dicts written by m2k.generateNode, layout keys are left out
+_NODE_KEYS = ("name", "type", "attributes", "connections", "fullPath")
+
+
+def networkToDict(nodes, snapshot, roots=None):
+    """
+    Get the dump of a network as plain python data
+
+    Args:
+        nodes (dict): {node_name: node_dict}, in traversal order
+        snapshot (ConnectionSnapshot): connections taken for the copy
+        roots (list): terminal node of every exported material, in export order (optional)
+
+    Returns:
+        dict: dump content
+    """
+    return {
+        "version" : DUMP_VERSION,
+        "nodes" : {name: {key: node[key] for key in _NODE_KEYS if key in node} for name, node in nodes.items()},
+        "snapshot" : {
+            "inputs" : {node: dict(inputs) for node, inputs in snapshot.inputs.items()},
+            "childInputs" : {node: sorted(attributes) for node, attributes in snapshot.childInputs.items()},
+            "outputs" : {node: list(outputs) for node, outputs in snapshot.outputs.items()},
+        },
+        "roots" : list(roots or []),
+    }
+
+
+def networkFromDict(data):
+    """
+    Rebuild a network from its dump content
+
+    Args:
+        data (dict): dump content, from networkToDict
+
+    Returns:
+        tuple: ({node_name: ExportNode}, ConnectionSnapshot, roots list)
+
+    Raises:
+        ValueError: If the dump was written by an incompatible version
+    """
+    if data.get("version") not in _READ_VERSIONS:
+        raise ValueError(f"Unsupported network dump version: {data.get('version')}")
+
+    nodes = {name: ExportNode.fromDict(node) for name, node in data["nodes"].items()}
+    saved = data["snapshot"]
+    snapshot = ConnectionSnapshot(
+        list(nodes),
+        {node: internKeys(inputs) for node, inputs in saved["inputs"].items()},
+        {node: set(attributes) for node, attributes in saved["childInputs"].items()},
+        saved["outputs"],
+    )
+    return nodes, snapshot, list(data.get("roots", []))
+
+
+def isMsgpack(path):
+    """
+    Check if a dump file is written as msgpack, from its extension
+
+    Args:
+        path (str/Path): dump file
+
+    Returns:
+        bool
+    """
+    return Path(path).suffix.lower() in MSGPACK_SUFFIXES
+
+
+def _requireMsgpack(path):
+    if msgpack is None:
+        raise ImportError(f"msgpack is not installed, cannot read or write {path}")
+
+
+def saveNetwork(nodes, snapshot, path, roots=None):
+    """
+    Write a network dump
+
+    Args:
+        nodes (dict): {node_name: node_dict}, in traversal order
+        snapshot (ConnectionSnapshot): connections taken for the copy
+        path (str/Path): dump file, msgpack if it ends with .msgpack, JSON otherwise
+        roots (list): terminal node of every exported material, in export order (optional)
+
+    Example:
+        snapshot = utils.takeConnectionSnapshot(["PxrSurface1"])
+        saveNetwork(m2k.generateNodes(snapshot.nodes, snapshot), snapshot, "network.json", ["PxrSurface1"])
+    """
+    data = networkToDict(nodes, snapshot, roots)
+    if isMsgpack(path):
+        _requireMsgpack(path)
+        with open(path, "wb") as dump_file:
+            dump_file.write(msgpack.packb(data, use_bin_type=True))
+        return
+
+    with open(path, "w", encoding="utf-8") as dump_file:
+        json.dump(data, dump_file)
+
+
+def loadNetwork(path):
+    """
+    Read a network dump
+
+    Args:
+        path (str/Path): dump file written by saveNetwork
+
+    Returns:
+        tuple: ({node_name: ExportNode}, ConnectionSnapshot, roots list)
+
+    Raises:
+        ValueError: If the dump was written by an incompatible version
+    """
+    if isMsgpack(path):
+        _requireMsgpack(path)
+        with open(path, "rb") as dump_file:
+            return networkFromDict(msgpack.unpackb(dump_file.read(), raw=False))
+
+    with open(path, encoding="utf-8") as dump_file:
+        return networkFromDict(json.load(dump_file))
@@ -0,0 +1,227 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Per session cache of exported nodes
+
+Keeps every exported node's dict and XML fragment between copies, so copying
+the same network again only re-queries and re-maps the nodes edited since.
+A node becomes dirty when one of its attributes or connections changes, a
+renamed or deleted node is dropped alone, and only a new or opened scene
+drops the whole cache.
+"""
+
+import maya.OpenMaya as om
+
+from Rfm2Rfk import export_session
+
+# attribute changed messages which make the exported data of a node stale
+_STALE_MESSAGES = (om.MNodeMessage.kAttributeSet | om.MNodeMessage.kConnectionMade |
+                   om.MNodeMessage.kConnectionBroken | om.MNodeMessage.kAttributeAdded |
+                   om.MNodeMessage.kAttributeRemoved | om.MNodeMessage.kAttributeArrayAdded |
+                   om.MNodeMessage.kAttributeArrayRemoved)
+
+_SESSION_CACHE = None
+
+
+class ExportCache(object):
+    """
+    Node dicts and XML fragments of previously exported nodes
+
+    Args:
+        callbacks (bool): watch exported nodes with maya callbacks, nodes are
+            only invalidated through markDirty otherwise
+
+    Example:
+        cache = ExportCache()
+        m2k.copy(cache=cache)
+        cmds.setAttr("PxrSurface1.specularRoughness", 0.5)
+        m2k.copy(cache=cache)  # only PxrSurface1 is queried and mapped again
+    """
+
+    def __init__(self, callbacks=True):
+        self.callbacks = callbacks
+        self.nodes = {}
+        self.fragments = {}
+        self.dirty = set()
+        self._callbackIds = {}
+        self._sceneCallbackIds = []
+        self._dropped = set()
+        self._sceneChanged = False
+
+    def __repr__(self):
+        return "{}({} nodes, {} dirty)".format(self.__class__.__name__, len(self.nodes), len(self.dirty))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def validate(self):
+        """
+        Drop the nodes renamed or deleted since the last copy, everything after a new or opened scene,
+        called once per copy
+        """
+        if self._sceneChanged:
+            self.clear()
+            return
+        while self._dropped:
+            self.forget(self._dropped.pop())
+
+    def markDirty(self, node):
+        """
+        Regenerate a node on the next copy
+
+        Args:
+            node (str): node name
+        """
+        self.dirty.add(node)
+        self.fragments.pop(node, None)
+
+    def getNode(self, node, connections):
+        """
+        Get the cached dict of a node
+
+        Args:
+            node (str): node name
+            connections (dict): current input connections of the node, from the copy's snapshot
+
+        Returns:
+            dict: node dict from m2k.generateNode, None if the node has to be generated again
+        """
+        node_dict = self.nodes.get(node)
+        if node_dict is None or node in self.dirty or node_dict["connections"] != connections:
+            return None
+        return node_dict
+
+    def storeNode(self, node, node_dict):
+        """
+        Cache a freshly generated node dict, its previous fragment is dropped
+
+        Args:
+            node (str): node name
+            node_dict (dict): node dict from m2k.generateNode
+        """
+        self.nodes[node] = node_dict
+        self.dirty.discard(node)
+        self.fragments.pop(node, None)
+        if self.callbacks and node not in self._callbackIds:
+            self._watch(node)
+
+    def getFragment(self, node, key):
+        """
+        Get the cached XML of a node
+
+        Args:
+            node (str): node name
+            key (tuple): everything besides the node dict the fragment depends on (e.g. its position)
+
+        Returns:
+            str: XML fragment, None if the node has to be mapped again
+        """
+        if node in self.dirty:
+            return None
+        fragment = self.fragments.get(node)
+        if fragment is None or fragment[0] != key:
+            return None
+        return fragment[1]
+
+    def storeFragment(self, node, key, fragment):
+        """
+        Cache the XML of a node, only nodes with a cached dict are kept
+
+        Args:
+            node (str): node name
+            key (tuple): everything besides the node dict the fragment depends on (e.g. its position)
+            fragment (str): XML fragment
+        """
+        if node in self.nodes and node not in self.dirty:
+            self.fragments[node] = (key, fragment)
+
+    def forget(self, node):
+        """
+        Forget a single node and remove its callbacks
+
+        Args:
+            node (str): node name
+        """
+        for callback_id in self._callbackIds.pop(node, ()):
+            om.MMessage.removeCallback(callback_id)
+        self.nodes.pop(node, None)
+        self.fragments.pop(node, None)
+        self.dirty.discard(node)
+
+    def clear(self):
+        """
+        Forget every node and remove the callbacks
+        """
+        while self._callbackIds:
+            for callback_id in self._callbackIds.popitem()[1]:
+                om.MMessage.removeCallback(callback_id)
+        while self._sceneCallbackIds:
+            om.MMessage.removeCallback(self._sceneCallbackIds.pop())
+        self.nodes.clear()
+        self.fragments.clear()
+        self.dirty.clear()
+        self._dropped.clear()
+        self._sceneChanged = False
+
+    def _watch(self, node):
+        """
+        Mark a node dirty whenever one of its attributes or connections changes, drop it once renamed or deleted
+
+        Args:
+            node (str): node name
+        """
+        try:
+            obj = export_session.getDependencyNode(node).object()
+        except RuntimeError:
+            # not a maya node, it is never cached
+            self.nodes.pop(node, None)
+            return
+        if not self._sceneCallbackIds:
+            for message in (om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen):
+                self._sceneCallbackIds.append(om.MSceneMessage.addCallback(message, self._sceneChanging))
+        self._callbackIds[node] = [
+            om.MNodeMessage.addAttributeChangedCallback(obj, self._attributeChanged, node),
+            om.MNodeMessage.addNameChangedCallback(obj, self._nodeRenamed, node),
+            om.MNodeMessage.addNodePreRemovalCallback(obj, self._nodeRemoved, node),
+        ]
+
+    def _attributeChanged(self, message, plug, other_plug, node):
+        """
+        MNodeMessage attribute changed callback
+        """
+        if message & _STALE_MESSAGES:
+            self.markDirty(node)
+
+    def _nodeRenamed(self, obj, previous_name, node):
+        """
+        MNodeMessage name changed callback, the node is dropped on the next copy
+        """
+        self.markDirty(node)
+        self._dropped.add(node)
+
+    def _nodeRemoved(self, obj, node):
+        """
+        MNodeMessage pre removal callback, the node is dropped on the next copy
+        """
+        self.markDirty(node)
+        self._dropped.add(node)
+
+    def _sceneChanging(self, client_data):
+        """
+        MSceneMessage before new/open callback, everything is dropped on the next copy
+        """
+        self._sceneChanged = True
+
+
+def getSessionCache():
+    """
+    Get the export cache shared by every interactive copy of this maya session
+
+    Returns:
+        ExportCache
+    """
+    global _SESSION_CACHE
+    if _SESSION_CACHE is None:
+        _SESSION_CACHE = ExportCache()
+    return _SESSION_CACHE
@@ -0,0 +1,142 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Background export of a gathered material network
+
+Maya may only be queried from its main thread, so node dicts and the
+connection snapshot are gathered there first (see m2k.copyAsync). The job then
+lays out, maps and serializes the network on a worker thread, reporting its
+progress and stopping between two nodes once cancelled. It never touches maya.
+"""
+
+import threading
+
+from Rfm2Rfk import instrumentation, mapping
+
+# number of progress reports over a whole job at most
+PROGRESS_STEPS = 100
+
+
+class ExportJob(object):
+    """
+    Lay out, map and serialize a network on a worker thread
+
+    Args:
+        nodes (dict): {node_name: node_dict} gathered on the main thread
+        snapshot (ConnectionSnapshot): connections taken for this copy
+        cache (ExportCache): cache of previous copies, fragments of clean nodes are reused (optional)
+        progress (callable): progress(done, total) called from the worker thread (optional)
+        finished (callable): finished(job) called from the worker thread once done,
+            cancelled or failed (optional)
+        roots (list): terminal node of every exported material, see mapping.buildTree (optional)
+
+    Example:
+        job = ExportJob(nodes_dict, snapshot, finished=lambda job: print(len(job.result)))
+        job.start()
+    """
+
+    def __init__(self, nodes, snapshot, cache=None, progress=None, finished=None, roots=None):
+        self.nodes = nodes
+        self.snapshot = snapshot
+        self.roots = roots
+        self.cache = cache
+        self.progress = progress
+        self.finished = finished
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    def __repr__(self):
+        state = "done" if self.done else "cancelled" if self.cancelled else "running"
+        return "{}({} nodes, {})".format(self.__class__.__name__, len(self.nodes), state)
+
+    @property
+    def cancelled(self):
+        """
+        bool: True once cancel was called
+        """
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        """
+        bool: True once the job finished, whether it succeeded, failed or was cancelled, and
+              its finished callback returned
+        """
+        return self._done.is_set()
+
+    def start(self):
+        """
+        Run the job on a daemon worker thread
+
+        Returns:
+            ExportJob: the job itself
+        """
+        self._thread = threading.Thread(target=self.run, name="Rfm2RfkExport", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """
+        Stop the job before its next node, the result stays None
+        """
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the job to finish
+
+        Args:
+            timeout (float): seconds to wait at most, forever if not given
+
+        Returns:
+            bool: True if the job finished
+        """
+        return self._done.wait(timeout)
+
+    def run(self):
+        """
+        Run the job on the calling thread, errors are kept in self.error
+        """
+        try:
+            self.result = self._export()
+        except Exception as error:
+            self.error = error
+        finally:
+            try:
+                if self.finished is not None:
+                    self.finished(self)
+            finally:
+                self._done.set()
+
+    def _export(self):
+        """
+        Build the XML, node by node
+
+        Returns:
+            str: katana XML, None if cancelled
+        """
+        if self.cancelled:
+            return None
+        with instrumentation.stage("tree"):
+            tree = mapping.buildTree(self.nodes, self.snapshot, self.roots)
+        total = sum(1 for _ in mapping.iterTreeNodes(tree))
+
+        chunks = []
+        reported = 0
+        for chunk in mapping.iterXML(tree, self.snapshot, self.cache):
+            if self.cancelled:
+                return None
+            chunks.append(chunk)
+
+            # the first chunk opens the exported group, every other one but the last is a node
+            done = min(len(chunks) - 1, total)
+            step = done * PROGRESS_STEPS // total if total else PROGRESS_STEPS
+            if self.progress is not None and step > reported:
+                reported = step
+                self.progress(done, total)
+
+        return "".join(chunks)
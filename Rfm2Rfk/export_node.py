@@ -0,0 +1,126 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Compact record of an exported node, passed between the stages of a copy
+
+Every node of a copy used to be a dict, plus a second dict once laid out by
+mapping.buildTree. ExportNode keeps the same keys in slots and reads like a
+dict (node["name"], node.get("X"), dict(node)), so every stage accepts
+records and plain dicts alike. Attribute names repeat across every node of a
+type, they are interned so all nodes share one string per name.
+"""
+
+import sys
+
+from collections.abc import MutableMapping
+
+
+def internName(name):
+    """
+    Get the shared copy of an attribute name
+
+    Args:
+        name (str): attribute name
+
+    Returns:
+        str: equal string, the same object for every node
+    """
+    return sys.intern(name)
+
+
+def internKeys(values):
+    """
+    Get a dict keyed by shared attribute names
+
+    Args:
+        values (dict): {attribute name: value}
+
+    Returns:
+        dict: same items, keys from internName
+    """
+    return {sys.intern(name): value for name, value in values.items()}
+
+
+class ExportNode(MutableMapping):
+    """
+    Node of a copy, with dict style access to its fields
+
+    Unset fields (e.g. the layout before mapping.buildTree) are missing keys,
+    keys outside of FIELDS are refused.
+
+    Args:
+        name (str): node name
+        type (str): node type
+        attributes (dict): {attribute name: value}
+        connections (dict): {destination attribute: source plug}
+        **fields: other FIELDS, e.g. fullPath, level, X, Y
+
+    Example:
+        node = ExportNode("PxrSurface1", "PxrSurface", {"specularRoughness": 0.3}, {})
+        node["X"] = 0
+        print(dict(node))
+        Output: {"name": "PxrSurface1", "type": "PxrSurface", "attributes": {...}, "connections": {}, "X": 0}
+    """
+
+    FIELDS = ("name", "type", "attributes", "connections", "fullPath", "level", "X", "Y")
+
+    __slots__ = FIELDS
+
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, name, type, attributes, connections, **fields):
+        self.name = name
+        self.type = sys.intern(type)
+        self.attributes = attributes
+        self.connections = connections
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def fromDict(cls, node):
+        """
+        Build a record from a node dict, e.g. read from a network dump
+
+        Args:
+            node (dict): node dict with at least name, type, attributes and connections
+
+        Returns:
+            ExportNode: record with interned attribute names
+        """
+        fields = {key: value for key, value in node.items()
+                  if key not in ("name", "type", "attributes", "connections")}
+        return cls(node["name"], node["type"], internKeys(node["attributes"]),
+                   internKeys(node["connections"]), **fields)
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self._FIELD_SET:
+            raise KeyError(f"{self.__class__.__name__} has no field {key!r}")
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in self._FIELD_SET or not hasattr(self, key):
+            raise KeyError(key)
+        delattr(self, key)
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return key in self._FIELD_SET and hasattr(self, key)
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, dict(self))
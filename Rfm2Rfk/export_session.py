@@ -0,0 +1,147 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Maya nodes resolved once per copy
+
+Wrapping a node (Dag_Node) runs objExists, an MSelectionList lookup and an
+MDagPath resolution. Inside an ExportSession every node is wrapped once and the
+wrapper is shared by every stage of the copy, paths naming the same node (e.g.
+its name and its full path) share it too, matched by MObjectHandle. Outside of
+a session nodes are wrapped on every call, like before.
+"""
+
+import maya.OpenMaya as om
+
+from MayaBase.modules.nodel import Dag_Node as Dag
+from MayaBase.modules.utils import open_maya_api
+
+from Rfm2Rfk import instrumentation
+
+# session of the running copy, sessions are only opened from maya's main thread
+_ACTIVE = None
+
+
+class ExportSession(object):
+    """
+    Intern the node wrappers of a copy
+
+    Example:
+        with ExportSession():
+            nodes_dict = m2k.generateNodes(snapshot.nodes, snapshot)
+    """
+
+    def __init__(self):
+        # {node path: (MObjectHandle, Dag_Node)}
+        self._paths = {}
+        # {MObjectHandle hash code: [(MObjectHandle, Dag_Node)]}
+        self._handles = {}
+        self._previous = None
+
+    def __enter__(self):
+        global _ACTIVE
+        self._previous = _ACTIVE
+        _ACTIVE = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _ACTIVE
+        _ACTIVE = self._previous
+        self._previous = None
+        self.clear()
+        return False
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._handles.values())
+
+    def __repr__(self):
+        return "{}({} nodes)".format(self.__class__.__name__, len(self))
+
+    def node(self, path):
+        """
+        Get the wrapper of a node, resolved on its first request only
+
+        Args:
+            path (str): node name or full path
+
+        Returns:
+            Dag_Node: shared wrapper, a new one every time if the node does not exist
+        """
+        entry = self._paths.get(path)
+        if entry is not None and entry[0].isValid():
+            instrumentation.count("session.reused")
+            return entry[1]
+
+        node = Dag(path)
+        instrumentation.count("maya.Dag")
+        if node.dep is None:
+            return node
+
+        handle = om.MObjectHandle(node.dep.object())
+        entries = self._handles.setdefault(handle.hashCode(), [])
+        for other_handle, other_node in entries:
+            if other_handle.isValid() and other_handle == handle:
+                # another path of a node already resolved
+                node = other_node
+                break
+        else:
+            entries.append((handle, node))
+
+        self._paths[path] = (handle, node)
+        return node
+
+    def clear(self):
+        """
+        Forget every resolved node
+        """
+        self._paths.clear()
+        self._handles.clear()
+
+
+def current():
+    """
+    Get the session of the running copy
+
+    Returns:
+        ExportSession: None outside of a session
+    """
+    return _ACTIVE
+
+
+def getNode(path):
+    """
+    Wrap a node, shared with the rest of the copy inside a session
+
+    Args:
+        path (str): node name or full path
+
+    Returns:
+        Dag_Node
+    """
+    if _ACTIVE is not None:
+        return _ACTIVE.node(path)
+    instrumentation.count("maya.Dag")
+    return Dag(path)
+
+
+def getDependencyNode(path):
+    """
+    Get the MFnDependencyNode of a node, from its shared wrapper inside a session
+
+    Args:
+        path (str): node name or full path
+
+    Returns:
+        MFnDependencyNode
+
+    Raises:
+        RuntimeError: if the node does not exist
+    """
+    if _ACTIVE is None:
+        instrumentation.count("maya.MFnDependencyNode")
+        return open_maya_api.toDependencyNode(path)
+
+    dep = _ACTIVE.node(path).dep
+    if dep is None:
+        raise RuntimeError("No object matches name: {}".format(path))
+    return dep
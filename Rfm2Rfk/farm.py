@@ -0,0 +1,227 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Convert many maya scenes in parallel, one mayapy worker process per scene
+
+Runs in any python 3 interpreter, maya is only imported by the workers:
+
+    python -m Rfm2Rfk.farm /library/*.mb -o /path/to/output -j 32
+
+Every worker runs Rfm2Rfk.batch on its scene, the driver collects per scene
+results, errors and timings into a single manifest.json in the output directory.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+log = logging.getLogger("clip")
+
+# same marker as Rfm2Rfk.batch.RESULT_PREFIX, batch can only be imported inside maya
+RESULT_PREFIX = "RFM2RFK_RESULT "
+
+MANIFEST_NAME = "manifest.json"
+
+
+def sceneDirectoryName(scene):
+    """
+    Get the sub directory of the output directory a scene is exported into
+
+    Scene names repeat across a library (e.g. a/lib.mb and b/lib.mb), a short
+    hash of the absolute scene path keeps their directories apart.
+
+    Args:
+        scene (str/Path): scene file
+
+    Returns:
+        str: directory name (e.g. "lib_3f2a9c1e")
+    """
+    path = Path(os.path.abspath(scene))
+    return f"{path.stem}_{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]}"
+
+
+def uniqueScenes(scenes):
+    """
+    Drop scenes listed more than once, they would be exported into the same directory at the same time
+
+    Args:
+        scenes (list): scene files
+
+    Returns:
+        list: scene files, first occurrences in input order
+
+    Raises:
+        ValueError: If two different scenes get the same directory name
+    """
+    directories = {}
+    unique = []
+    for scene in scenes:
+        path = os.path.abspath(scene)
+        name = sceneDirectoryName(path)
+        if name in directories:
+            if directories[name] != path:
+                raise ValueError(f"{scene} and {directories[name]} would be exported into the same directory {name}")
+            log.warning("%s is listed more than once, it is converted once", scene)
+            continue
+        directories[name] = path
+        unique.append(scene)
+    return unique
+
+
+def mayapyCommand(scene, output_dir, mayapy=None):
+    """
+    Build the command line converting a single scene with Rfm2Rfk.batch
+
+    Args:
+        scene (str): scene file
+        output_dir (str): output directory
+        mayapy (str): mayapy executable, $MAYAPY or "mayapy" on the PATH if not given
+
+    Returns:
+        list: command arguments
+    """
+    mayapy = mayapy or os.environ.get("MAYAPY", "mayapy")
+    return [mayapy, "-m", "Rfm2Rfk.batch", str(scene), "-o", str(output_dir), "--json"]
+
+
+def parseResult(stdout):
+    """
+    Find the scene result printed by a worker among the rest of its output
+
+    Args:
+        stdout (str): worker standard output
+
+    Returns:
+        dict: scene result, None if the worker did not print one
+    """
+    for line in reversed(stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return None
+
+
+def convertScene(scene, output_dir, command=mayapyCommand, timeout=None):
+    """
+    Convert one scene in its own worker process
+
+    Args:
+        scene (str): scene file
+        output_dir (str): output directory
+        command (callable): command(scene, output_dir) returning the worker command line
+        timeout (float): seconds before the worker is killed (optional)
+
+    Returns:
+        dict: {
+        "scene" : scene file,
+        "status" : "ok", "errors" (some materials failed) or "failed" (worker failed),
+        "materials" : {shadingEngine: written file path},
+        "errors" : {shadingEngine or "worker": error message},
+        "seconds" : wall time of the worker
+        }
+    """
+    record = {"scene": str(scene), "status": "failed", "materials": {}, "errors": {}, "seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(command(scene, output_dir), capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as error:
+        record["errors"]["worker"] = str(error)
+        record["seconds"] = time.perf_counter() - start
+        return record
+
+    record["seconds"] = time.perf_counter() - start
+    result = parseResult(process.stdout)
+    if result is None:
+        stderr = process.stderr.strip().splitlines()
+        record["errors"]["worker"] = stderr[-1] if stderr else f"worker exited with {process.returncode}"
+        return record
+
+    record["materials"] = result.get("materials", {})
+    record["errors"] = result.get("errors", {})
+    record["status"] = "errors" if record["errors"] else "ok"
+    return record
+
+
+def convertScenes(scenes, output_dir, workers=None, command=mayapyCommand, timeout=None):
+    """
+    Convert scenes in parallel and write the manifest
+
+    Every scene runs in its own worker process (a separate mayapy), the pool
+    threads only start the workers and wait for them. A scene listed more than
+    once is converted once.
+
+    Args:
+        scenes (list): scene files
+        output_dir (str/Path): output directory, created if missing
+        workers (int): number of concurrent worker processes, cpu count if not given
+        command (callable): command(scene, output_dir) returning the worker command line
+        timeout (float): seconds before a worker is killed (optional)
+
+    Returns:
+        dict: manifest {"workers", "seconds", "failed", "scenes": [per scene records in input order]}
+
+    Raises:
+        ValueError: If two different scenes get the same directory name, see uniqueScenes
+    """
+    scenes = uniqueScenes(scenes)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convertScene, scene, str(output_dir), command, timeout) for scene in scenes]
+        records = []
+        for future in futures:
+            record = future.result()
+            log.info("%s: %s in %.1fs", record["scene"], record["status"], record["seconds"])
+            records.append(record)
+
+    manifest = {
+        "workers": workers,
+        "seconds": time.perf_counter() - start,
+        "failed": sum(1 for record in records if record["status"] != "ok"),
+        "scenes": records,
+    }
+    with open(output_dir / MANIFEST_NAME, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    return manifest
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    Args:
+        argv (list): command line arguments, sys.argv[1:] if not given
+
+    Returns:
+        int: exit code, 1 if any scene failed
+    """
+    parser = argparse.ArgumentParser(description="Convert maya scenes to katana XML in parallel mayapy workers")
+    parser.add_argument("scenes", nargs="+", help=".ma/.mb scene files")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes, cpu count by default")
+    parser.add_argument("--mayapy", default=None, help="mayapy executable, $MAYAPY or mayapy by default")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a scene is abandoned")
+    args = parser.parse_args(argv)
+
+    def command(scene, output_dir):
+        return mayapyCommand(scene, output_dir, args.mayapy)
+
+    manifest = convertScenes(args.scenes, args.output, args.workers, command, args.timeout)
+    return 1 if manifest["failed"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Graph helpers for exported material networks
+
+Node dicts only record their input connections, these helpers index them once
+so every later stage can walk the network in both directions in O(V+E), and
+lay it out as a layered DAG where every node appears exactly once.
+"""
+
+from collections import deque
+
+
+def sourceNode(connection):
+    """
+    Get the node name of a connection source
+
+    Args:
+        connection (str): source plug (e.g. "PxrTexture1.resultRGB")
+
+    Returns:
+        str: node name (e.g. "PxrTexture1")
+    """
+    return connection.split('.')[0]
+
+
+def buildAdjacency(nodes):
+    """
+    Build forward/reverse adjacency of a network from its connections dicts
+
+    Args:
+        nodes (dict): Dictionary of all node data {node_name: node_dict}
+
+    Returns:
+        tuple: (downstream, upstream)
+            - downstream (dict): {node_name: [names of nodes it feeds, in nodes order]}
+            - upstream (dict): {node_name: [names of nodes feeding it, in connections order]}
+
+    Example:
+        downstream, upstream = buildAdjacency(nodes)
+        print(downstream["PxrTexture1"])
+        Output: ["PxrSurface1"]
+    """
+    downstream = {name: [] for name in nodes}
+    upstream = {name: [] for name in nodes}
+
+    for name, node in nodes.items():
+        seen = set()
+        for connection in node["connections"].values():
+            source = sourceNode(connection)
+            if source not in downstream or source in seen:
+                continue
+            seen.add(source)
+            upstream[name].append(source)
+            downstream[source].append(name)
+
+    return downstream, upstream
+
+
+def terminalNodes(downstream):
+    """
+    Find nodes which feed no other node of the network (e.g. shaders like PxrSurface)
+
+    Args:
+        downstream (dict): forward adjacency from buildAdjacency
+
+    Returns:
+        list: terminal node names
+    """
+    return [name for name, outputs in downstream.items() if not outputs]
+
+
+def materialNodes(roots, upstream):
+    """
+    Get the network of every material of a multi material export, shared nodes belong to each of them
+
+    Args:
+        roots (list): terminal node of every material (e.g. its PxrSurface), in export order
+        upstream (dict): reverse adjacency from buildAdjacency
+
+    Returns:
+        dict: {root: [names of the root and every node upstream of it, breadth first]},
+              roots which are not part of the network are left out
+    """
+    materials = {}
+    for root in roots:
+        if root not in upstream or root in materials:
+            continue
+        visited = {root}
+        queue = deque([root])
+        members = []
+        while queue:
+            name = queue.popleft()
+            members.append(name)
+            for source in upstream[name]:
+                if source not in visited:
+                    visited.add(source)
+                    queue.append(source)
+        materials[root] = members
+    return materials
+
+
+def longestPathLayers(downstream, upstream):
+    """
+    Assign every node the length of the longest path reaching it from a source node
+
+    Nodes caught in a cycle (not possible in a valid shading network) are placed
+    right after their deepest already placed upstream node.
+
+    Args:
+        downstream (dict): forward adjacency from buildAdjacency
+        upstream (dict): reverse adjacency from buildAdjacency
+
+    Returns:
+        dict: {node_name: layer}
+    """
+    indegree = {name: len(inputs) for name, inputs in upstream.items()}
+    queue = deque(name for name, count in indegree.items() if not count)
+    layers = {name: 0 for name in queue}
+
+    while queue:
+        name = queue.popleft()
+        for output in downstream[name]:
+            layers[output] = max(layers.get(output, 0), layers[name] + 1)
+            indegree[output] -= 1
+            if not indegree[output]:
+                queue.append(output)
+
+    for name in upstream:
+        if indegree[name] > 0:
+            layers[name] = max([layers[i] + 1 for i in upstream[name] if i in layers] or [0])
+
+    return layers
+
+
+def _countCrossings(upper, lower, edges):
+    """
+    Count edge crossings between two adjacent ordered layers
+
+    Args:
+        upper (list): ordered node keys of the upper layer
+        lower (list): ordered node keys of the lower layer
+        edges (dict): {upper_key: [lower keys]}
+
+    Returns:
+        int: number of crossing edge pairs
+    """
+    lower_position = {key: index for index, key in enumerate(lower)}
+    targets = []
+    for key in upper:
+        targets.extend(sorted(lower_position[i] for i in edges.get(key, ()) if i in lower_position))
+
+    # count inversions with a fenwick tree
+    tree = [0] * (len(lower) + 1)
+    crossings = 0
+    for seen, target in enumerate(targets):
+        index = target + 1
+        smaller_or_equal = 0
+        while index:
+            smaller_or_equal += tree[index]
+            index -= index & -index
+        crossings += seen - smaller_or_equal
+
+        index = target + 1
+        while index <= len(lower):
+            tree[index] += 1
+            index += index & -index
+
+    return crossings
+
+
+def orderLayers(layers, downstream, sweeps=4):
+    """
+    Order the nodes inside every layer to reduce edge crossings (barycenter heuristic)
+
+    Edges spanning several layers are routed through virtual nodes so each of
+    them takes part in the ordering of the layers it passes. The best ordering
+    found over the up/down sweeps is kept.
+
+    Args:
+        layers (dict): {node_name: layer} from longestPathLayers, in network order
+        downstream (dict): forward adjacency from buildAdjacency
+        sweeps (int): number of down+up barycenter passes
+
+    Returns:
+        list: one ordered list of node names per layer
+    """
+    if not layers:
+        return []
+
+    # proper layered graph, virtual nodes are (source, target, layer) tuples
+    down = {name: [] for name in layers}
+    up = {name: [] for name in layers}
+    ordering = [[] for _ in range(max(layers.values()) + 1)]
+    for name in layers:
+        ordering[layers[name]].append(name)
+
+    for name in layers:
+        for output in downstream[name]:
+            if layers[output] <= layers[name]:
+                continue
+            previous = name
+            for layer in range(layers[name] + 1, layers[output]):
+                virtual = (name, output, layer)
+                down[virtual] = []
+                up[virtual] = []
+                ordering[layer].append(virtual)
+                down[previous].append(virtual)
+                up[virtual].append(previous)
+                previous = virtual
+            down[previous].append(output)
+            up[output].append(previous)
+
+    def crossings(order):
+        return sum(_countCrossings(order[i], order[i + 1], down) for i in range(len(order) - 1))
+
+    def reorder(layer, fixed, neighbours):
+        position = {key: index for index, key in enumerate(fixed)}
+        current = {key: index for index, key in enumerate(layer)}
+
+        def barycenter(key):
+            linked = [position[i] for i in neighbours[key] if i in position]
+            return sum(linked) / len(linked) if linked else current[key]
+
+        return sorted(layer, key=barycenter)
+
+    best = [list(layer) for layer in ordering]
+    best_crossings = crossings(best)
+    for _ in range(sweeps):
+        if not best_crossings:
+            break
+        for index in range(1, len(ordering)):
+            ordering[index] = reorder(ordering[index], ordering[index - 1], up)
+        for index in range(len(ordering) - 2, -1, -1):
+            ordering[index] = reorder(ordering[index], ordering[index + 1], down)
+
+        current_crossings = crossings(ordering)
+        if current_crossings < best_crossings:
+            best = [list(layer) for layer in ordering]
+            best_crossings = current_crossings
+
+    return [[key for key in layer if not isinstance(key, tuple)] for layer in best]
@@ -0,0 +1,161 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Stage timers and counters of a copy, off by default
+
+Enable it in the script editor (or set RFM2RFK_INSTRUMENTATION=1), copy, then
+dump the report:
+
+    from Rfm2Rfk import instrumentation
+    instrumentation.enable()
+    Rfm2Rfk.copy()
+    instrumentation.dumpReport("/tmp/copy_report.json")
+
+Stages are "traverse" (connection snapshot), "query" (node attributes),
+"tree" (layout), "map" (template mapping) and "serialize" (XML text).
+Counters record maya queries ("maya.<command>") and nodes. Template
+lookups come from the template cache statistics.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+from Rfm2Rfk import templates
+
+log = logging.getLogger("clip")
+
+ENABLED = os.environ.get("RFM2RFK_INSTRUMENTATION", "") not in ("", "0")
+
+_LOCK = threading.Lock()
+_STAGES = {}
+_COUNTERS = {}
+_TEMPLATE_BASELINE = [0, 0]
+
+
+def enable():
+    """
+    Start recording, everything recorded so far is dropped
+    """
+    global ENABLED
+    reset()
+    ENABLED = True
+
+
+def disable():
+    """
+    Stop recording, the report stays available until the next reset
+    """
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """
+    Drop every recorded timing and counter
+    """
+    info = templates.getTemplateIndex.cache_info()
+    with _LOCK:
+        _STAGES.clear()
+        _COUNTERS.clear()
+        _TEMPLATE_BASELINE[:] = [info.hits, info.misses]
+
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        with _LOCK:
+            total = _STAGES.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+
+@contextmanager
+def _untimed():
+    yield
+
+
+def stage(name):
+    """
+    Time a stage of the copy, stages run several times (e.g. "map" once per node) are summed
+
+    Args:
+        name (str): stage name
+
+    Returns:
+        context manager, doing nothing while disabled
+
+    Example:
+        with instrumentation.stage("tree"):
+            tree = buildTree(nodes_dict, snapshot)
+    """
+    if not ENABLED:
+        return _untimed()
+    return _timed(name)
+
+
+def count(name, amount=1):
+    """
+    Increase a counter while enabled
+
+    Args:
+        name (str): counter name (e.g. "maya.listConnections")
+        amount (int): increment
+    """
+    if not ENABLED:
+        return
+    with _LOCK:
+        _COUNTERS[name] = _COUNTERS.get(name, 0) + amount
+
+
+def report():
+    """
+    Get everything recorded since the last reset
+
+    Returns:
+        dict: {
+        "stages" : {stage: {"seconds": total seconds, "calls": times run}},
+        "counters" : {counter: value},
+        "maya_calls" : sum of every "maya.*" counter,
+        "template_lookups" : {"hits": n, "misses": n}
+        }
+    """
+    info = templates.getTemplateIndex.cache_info()
+    with _LOCK:
+        stages = {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in _STAGES.items()}
+        counters = dict(sorted(_COUNTERS.items()))
+        baseline = list(_TEMPLATE_BASELINE)
+
+    return {
+        "stages" : stages,
+        "counters" : counters,
+        "maya_calls" : sum(value for name, value in counters.items() if name.startswith("maya.")),
+        "template_lookups" : {"hits": info.hits - baseline[0], "misses": info.misses - baseline[1]},
+    }
+
+
+def dumpReport(path=None):
+    """
+    Log the report as JSON on the "clip" logger, and optionally write it to a file
+
+    Args:
+        path (str/Path): JSON file to write (optional)
+
+    Returns:
+        str: JSON report
+    """
+    text = json.dumps(report(), indent=2)
+    log.info("Rfm2Rfk report:\n%s", text)
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as json_file:
+            json_file.write(text)
+    return text
@@ -5,38 +5,46 @@ Created:2025
 Copy maya Material Network to Katana
 """
 
-import maya.cmds as cmds
+import os
 
-from PySide2.QtGui import QGuiApplication
+import maya.cmds as cmds
+import maya.mel as mel
+import maya.utils
 
-CLIPBOARD = QGuiApplication.clipboard()
+from . import ET
 
-from pathlib import Path
+from Rfm2Rfk import diff, export_cache, export_job, export_session, instrumentation, templates, utils
+from Rfm2Rfk import dump as network_dump
+from Rfm2Rfk.export_node import ExportNode
+# maya free stages, re-exported so every stage of a copy stays reachable from m2k
+from Rfm2Rfk.mapping import (KATANA_NODE_WIDTH, KATANA_SPACE_WIDTH, KATANA_ROW_HEIGHT, buildPatch, buildTree,
+                             buildXML, compareParameter, iterateMapping, iterTreeNodes, iterXML, mapNode, writeXML)
 
-from MayaBase.modules.nodel import Dag_Node as Dag
 
-from Rfm2Rfk.utils import checkOrphaned
-from . import ET
+# background copy started by copyAsync, a new copy cancels it
+_ASYNC_JOB = None
 
-from Rfm2Rfk import utils
-
-_XML_CACHE = {}
-_TEMPLATE_DIR = Path(__file__).parent/"renderer"/"Prman"/"node"
 
 def loadALLTEMPLATES():
     """
-    Pre-load all katana nodes templates to cache
+    Pre-load all katana nodes templates to cache, templates are otherwise loaded on first use
 
     """
-    for file in _TEMPLATE_DIR.glob("*.xml"):
-        node_type = file.stem
-        _XML_CACHE[node_type] = ET.parse(file)
+    for node_type in templates.listTemplates():
+        templates.getTemplateIndex(node_type)
+    # templates compiled here are written into the disk cache once
+    templates.flushDiskCache()
 
-loadALLTEMPLATES()
 
-KATANA_NODE_WIDTH = 200
-KATANA_SPACE_WIDTH = 60
-KATANA_ROW_HEIGHT = 100
+def getClipboard():
+    """
+    Get the Qt clipboard, PySide2 is only imported for interactive copies so batch exports run in mayapy
+
+    Returns:
+        QClipboard: None if no Qt application is running
+    """
+    from PySide2.QtGui import QGuiApplication
+    return QGuiApplication.clipboard()
 
 
 
@@ -44,6 +52,10 @@ def getAllNodes(nodes):
     """
     Get selected nodes and all nodes upstream
 
+    Walks upstream breadth first, querying the whole frontier with a single
+    listConnections call, so the number of maya commands grows with the depth
+    of the network instead of its size.
+
     Args:
         nodes (list)
     Returns:
@@ -52,27 +64,27 @@ def getAllNodes(nodes):
 
     result_nodes = []
     processed = set()
-    while nodes:
-        current = nodes.pop()
-        if current in processed:
-            continue
-        result_nodes.append(current)
-        processed.add(current)
+    frontier = list(dict.fromkeys(nodes))
+    while frontier:
+        result_nodes.extend(frontier)
+        processed.update(frontier)
 
-        connections = cmds.listConnections(current, source=True, destination=False) or []
-        nodes.extend([n for n in connections if n not in processed])
+        connections = cmds.listConnections(frontier, source=True, destination=False) or []
+        instrumentation.count("maya.listConnections")
+        frontier = [n for n in dict.fromkeys(connections) if n not in processed]
 
     return result_nodes
 
 
-def generateNode(node):
+def generateNode(node, snapshot=None):
     """
     Generate individual node dict
 
     Args:
         node (str) : node fullpath
+        snapshot (ConnectionSnapshot) : connections taken for this copy, queried from maya if not given
     Returns:
-        dict : {
+        ExportNode : read like a dict {
         "name" : node name,
         "type" : node type,
         "attributes" : node attributes (dict {"diffuseColor" : [0, 0, 0], ...}),
@@ -81,380 +93,229 @@ def generateNode(node):
     }
 
     """
-    node_attributes = utils.getNodeAttributes(node)
-    node_connections = utils.getInputConnctions(node)
-    node = Dag(node)
+    node_attributes = utils.getNodeAttributesFromPlugs(node)
+    if snapshot is not None:
+        node_connections = snapshot.inputConnections(node)
+    else:
+        node_connections = utils.getInputConnctions(node)
+    node = export_session.getNode(node)
     node_name = node.name
     node_type = node.type
     node_fullPath = node.fullPath
 
-    return {
-        "name" : node_name,
-        "type" : node_type,
-        "attributes" : node_attributes,
-        "connections" : node_connections,
-        "fullPath" : node_fullPath
-    }
+    return ExportNode(node_name, node_type, node_attributes, node_connections, fullPath=node_fullPath)
 
 
-def compareParameter(attr_name, node_dict):
+def generateNodes(node_names, snapshot, cache=None):
     """
-    This function retrieves a specified parameter's value from a Maya node and compares it
-    against the matching parameter definition in an XML file.
-
-    It supports both single values and array-type parameters (like float3/double3) with tolerance-based comparison for
-    floating-point numbers.
+    Generate the dicts of every node of a network, reusing the clean nodes of an export cache
 
     Args:
-        attr_name (str): Name of the parameter to compare (e.g., "diffuseColor").
-        node_dict (dict): Maya node dictionary
-
+        node_names (list): node names, in traversal order
+        snapshot (ConnectionSnapshot): connections taken for this copy
+        cache (ExportCache): cache of previous copies (optional)
     Returns:
-        any: The Maya parameter value if it differs from the XML definition
-        None: If the Maya parameter matches the XML value (within tolerance for floats)
-
-    Note:
-        - For array parameters (like float3), compares each component with 0.0001 tolerance
-        - Non-array parameters return the Maya value directly
+        dict: {node_name: ExportNode}
     """
-
-    node_type = node_dict["type"]
-
-    template = _XML_CACHE[node_type]
-
-    # deep copy template data to avoid contaminating template in cache
-    tree = ET.ElementTree(ET.fromstring(ET.tostring(template.getroot())))
-    root = tree.getroot()
-
-    group_params_element = root.find(f".//group_parameter[@name='{node_type}']")
-    param_element = group_params_element.find(f".//group_parameter[@name='{attr_name}']")
-    param_value = node_dict["attributes"][attr_name]
-
-
-    # compare value of specific attribute from maya to katana
-    # if param type is float3 or double3
-    # same return None, otherwise return param value from maya
-    # other param type return maya value
-    if param_element:
-        if isinstance(param_value, list):
-            new_values = []
-            xml_values = []
-            for index, value in enumerate(param_value):
-                index = "i" + str(index)
-                xml_val = float(param_element.find(f".//number_parameter[@name='{index}']").get("value"))
-                xml_values.append(xml_val)
-                if abs(value - xml_val) < 0.0001:
-                    new_values.append(xml_val)
-                    continue
-                else:
-                    new_values.append(value)
-
-            if xml_values == new_values:
-                return None
-
-            else:
-                return new_values
-
-        elif isinstance(param_value, (int, float)):
-            xml_value = float(param_element.find(".//number_parameter[@name='value']").get("value"))
-            if abs(param_value - xml_value) < 0.0001:
-                return None
+    nodes_dict = {}
+    with instrumentation.stage("query"):
+        for node_name in node_names:
+            node_dict = None
+            if cache is not None:
+                node_dict = cache.getNode(node_name, snapshot.inputConnections(node_name))
+            if node_dict is None:
+                node_dict = generateNode(node_name, snapshot)
+                instrumentation.count("nodes.queried")
+                if cache is not None:
+                    cache.storeNode(node_name, node_dict)
             else:
-                return param_value
+                instrumentation.count("nodes.cached")
+            nodes_dict[node_name] = node_dict
+    return nodes_dict
 
-        elif isinstance(param_value, str):
-            print(param_value)
-            return param_value
 
-    return None
-
-def iterateMapping(node):
+def copy(path=None, cache=None, previous=None):
     """
-    Maps Maya node parameters to Katana XML parameters using cached templates.
-
-     Args:
-        node (dict): Maya node dictionary containing:
-            - name (str): Node name
-            - type (str): Node type (must match template filename)
-            - attributes (dict): Parameter values
-            - connections (dict): Input connections
-            - fullPath (str): Full node path
-            - X (int): pos X value
-            - Y (int): pox Y value
-    Returns:
-        ET.ElementTree: Configured Katana node XML structure
+    Copy xml data to clipboard
 
-    Raises:
-        ValueError: If no matching template found or child attributes are connected
-        RuntimeError: If XML processing fails
+    Only the nodes edited since the previous copy are queried and mapped again.
 
+    Args:
+        path (str/Path): stream the xml into this file instead of the clipboard (optional)
+        cache (ExportCache): cache of previous copies, the session cache if not given
+        previous (str/Path): saved nodes of the previous export (optional), only a patch
+            against them is copied if the file exists, the current nodes are saved into it
     """
-    node_type=node["type"]
-
-    template = _XML_CACHE[node_type]
-
-    # deep copy template data to avoid contaminating template in cache
-    tree = ET.ElementTree(ET.fromstring(ET.tostring(template.getroot())))
-    root = tree.getroot()
-
-    node_name = node["name"]
-
-    params_root_element = root.find(f".//group_parameter[@name='{node_type}']")
-
-    if params_root_element is None:
-        raise ValueError(f"No matching node type '{node_type}' found in XML template")
-
-    # Convert katana node name to maya node name
-    root.set('name', node_name)
-    params_root_element.set('name', node_name)
-    params_root_element.find("string_parameter[@name='name']").set('value', node_name)
-
-    # Set node position
-    root.set('x', str(node["X"]))
-    root.set('y', str(node["Y"]))
-
-    # process all parameters(attributes)
-    params_element = root.find(".//group_parameter[@name='parameters']")
-    for param in params_element.findall("group_parameter"):
-        param_name = param.get('name')
-
-
-        if param_name not in node['attributes']:
-            continue
-
-        value = compareParameter(param_name, node)
-        if value is None:
-            continue
-        # print(f"{param_name} : {value}")
-        # Handle different parameter types
-        enable_param = param.find("*[@name='enable']")
-        value_param = param.find("*[@name='value']")
-        if value_param is not None:
-            # print(f"find param : {param_name}")
-            enable_param.set('value', str("1"))
-            if isinstance(value, (int, float)):
-                value_param.set('value', str(value))
-
-            elif isinstance(value, str):
-                value_param.set('value', value)
-
-            elif isinstance(value, list) and int(value_param.get('tupleSize')) == len(value):
-                for i in range(len(value)):
-                    val = value[i]
-                    index = 'i' + str(i)
-                    array_element = value_param.find(f"number_parameter[@name='{index}']")
-                    array_element.set('value', str(val))
-
-            else:
-                continue
-
-    # process connections
-    connections = node["connections"]
-
-    for attr, src_connection in connections.items():
-        if utils.connectionInputIsChild(node["name"], attr):
-            raise ValueError(f"Katana Do Not Support Child Attribute! Error Attribute: {src_connection}\n"
-                             f"Please Use A Parent Attribute Connect")
-
-        port_node = root.find(f".//port[@name='{attr}']")
-        if port_node is not None:
-            port_node.set("source", src_connection)
-            utils.log.info("Connected: %s.%s to %s", node_name, attr, src_connection)
-    return tree
-
+    clipboard = getClipboard() if path is None else None
+    if path is None and not clipboard:
+        utils.log.info("Clipboard not available, sorry")
+        return
+    if cache is None:
+        cache = export_cache.getSessionCache()
+    cache.validate()
+
+    # every node is resolved once, the later stages do not query maya
+    with export_session.ExportSession():
+        with instrumentation.stage("traverse"):
+            selected_nodes = cmds.ls(selection=True)
+            instrumentation.count("maya.ls")
+            # several materials are exported together, their shared nodes once
+            roots = utils.getExportRoots(selected_nodes)
+            # every connection question of the later stages is answered by this snapshot
+            snapshot = utils.takeConnectionSnapshot(roots)
+        utils.log.debug("Collected %d nodes", len(snapshot.nodes))
+
+        nodes_dict = generateNodes(snapshot.nodes, snapshot, cache)
+
+    with instrumentation.stage("tree"):
+        tree = buildTree(nodes_dict, snapshot, roots)
+    if previous is not None and os.path.isfile(previous):
+        patch = buildPatch(tree, diff.loadNodes(previous), snapshot)
+        with instrumentation.stage("serialize"):
+            chunks = [ET.tostring(patch.getroot(), encoding='unicode')]
+    else:
+        chunks = iterXML(tree, snapshot, cache)
 
-def insertNode(nodes, node_name, branch, y_coord, level=0):
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as xml_file:
+            xml_file.writelines(chunks)
+        utils.log.info("Successfully exported nodes to %s", path)
+    else:
+        xml_str = "".join(chunks)
+        if xml_str:
+            clipboard.setText(xml_str)
+            utils.log.info(
+                "Successfully copied nodes to clipboard. "
+                "You can paste them to Katana now."
+            )
+        else:
+            utils.log.info("Nothing copied")
+
+    # only saved once the export succeeded, the next patch is relative to it
+    if previous is not None:
+        diff.saveNodes(nodes_dict, previous)
+    # templates compiled by this copy are written into the disk cache
+    templates.flushDiskCache()
+
+
+def dump(path):
     """
-       Recursively builds a hierarchical tree structure from node connections.
-
-       Args:
-           nodes (dict): Dictionary of all node data {node_name: node_dict}
-           node_name (str): Current node to process
-           branch (dict): Parent branch to attach to
-           y_coord (int) : branch's y coordinate
-           level (int): Current depth level (used for layout)
-
-       """
-    if node_name in nodes:
-
-        current_node = nodes[node_name]
-
-        new_branch = {
-            "name" : node_name,
-            "type" :current_node["type"],
-            "X" : level * (KATANA_NODE_WIDTH + KATANA_SPACE_WIDTH),
-            "Y": y_coord,
-            "attributes" : current_node["attributes"],
-            "connections" : current_node["connections"],
-            "children" : []
-        }
-        print(new_branch)
-        branch["children"].append(new_branch)
-
-        # find nodes downstream
-        downstream_nodes = [name for name, dict in nodes.items() if any(node_name == conn.split('.')[0] for conn in dict["connections"].values())]
-        print(downstream_nodes)
-
-        for down_node in downstream_nodes:
-            insertNode(nodes, down_node, new_branch, y_coord, level=level + 1)
-
-
+    Save the selected network as a network dump, converted to katana XML without maya by Rfm2Rfk.convert
 
+    Args:
+        path (str/Path): dump file, msgpack if it ends with .msgpack, JSON otherwise
+    """
+    with export_session.ExportSession():
+        roots = utils.getExportRoots(cmds.ls(selection=True))
+        snapshot = utils.takeConnectionSnapshot(roots)
+        nodes_dict = generateNodes(snapshot.nodes, snapshot)
+    network_dump.saveNetwork(nodes_dict, snapshot, path, roots)
+    utils.log.info("Saved %d nodes to %s", len(nodes_dict), path)
 
 
-def buildTree(nodes):
+def copyAsync(cache=None):
     """
-    Build a material tree from nodes list for generating XML data.
+    Copy xml data to clipboard without freezing maya
 
-    Args:
-        nodes (dict): Dictionary of all nodes data {node_name: node_dict}
+    Attributes and connections are gathered on the main thread, the network is
+    then laid out, mapped and serialized on a worker thread. Progress is shown
+    in the main progress bar where Esc cancels the copy, the clipboard is set
+    from the main thread once it finishes. Starting a copy cancels the running one.
 
+    Args:
+        cache (ExportCache): cache of previous copies, the session cache if not given
     Returns:
-        dict: Tree structure containing:
-            - name: "root"
-            - children: Hierarchical node structure
-            - terminal_nodes: List of terminal nodes (e.g. shaders)
-            - orphaned_nodes: List of unconnected nodes
-
+        ExportJob: the running job (see job.cancel), None if the clipboard is not available
     """
-
-    tree = {"name" : "root", "children" : [], "terminal_nodes" : [], "orphaned_nodes" : [], "branch_Y_coords": {}}
-
-    # deal with orphaned nodes
-    for orphaned_name in nodes:
-        if checkOrphaned(orphaned_name):
-            orphaned_node = nodes[orphaned_name]
-            orphaned_node.update({
-                "X" : 0,
-                "Y" : 0
-            })
-            tree["orphaned_nodes"].append(nodes[orphaned_name])
-
-    # find all terminal nodes(like shader nodes e.g.PxrSurface)
-    terminal_nodes = [name for name in nodes if not any(name in n["connections"].values() for n in nodes.values())]
-    tree["terminal_nodes"] = terminal_nodes
-
-    # find nodes most upstream(has no input connections)
-    started_nodes = [name for name in nodes if not nodes[name].get("connections")]
-
-    # start to build the nodes tree in order
-    for branch_index, node_name in enumerate(started_nodes):
-        y_coord = branch_index * (KATANA_ROW_HEIGHT + KATANA_SPACE_WIDTH)
-        insertNode(nodes, node_name, tree, y_coord)
-
-    return tree
-
-
-def buildXML(tree):
+    global _ASYNC_JOB
+    clipboard = getClipboard()
+    if not clipboard:
+        utils.log.info("Clipboard not available, sorry")
+        return None
+
+    if _ASYNC_JOB is not None and not _ASYNC_JOB.done:
+        # the worker stops before its next node, it must not write into the cache anymore
+        _ASYNC_JOB.cancel()
+        _ASYNC_JOB.wait()
+
+    if cache is None:
+        cache = export_cache.getSessionCache()
+    cache.validate()
+
+    with export_session.ExportSession():
+        with instrumentation.stage("traverse"):
+            roots = utils.getExportRoots(cmds.ls(selection=True))
+            instrumentation.count("maya.ls")
+            snapshot = utils.takeConnectionSnapshot(roots)
+        nodes_dict = generateNodes(snapshot.nodes, snapshot, cache)
+
+    progress_bar = _beginProgress(len(nodes_dict))
+    job = export_job.ExportJob(
+        nodes_dict, snapshot, cache, roots=roots,
+        progress=lambda done, total: maya.utils.executeDeferred(_reportProgress, job, progress_bar, done),
+        finished=lambda job: maya.utils.executeDeferred(_finishCopy, job, clipboard, progress_bar),
+    )
+    _ASYNC_JOB = job.start()
+    return job
+
+
+def _beginProgress(total):
     """
-    Build katana XML
+    Show the main progress bar for a background copy
 
     Args:
-        tree (dict): material tree structure
+        total (int): number of nodes
     Returns:
-        ET.ElementTree: Complete Katana XML document
+        str: main progress bar, None without maya UI
     """
-    print("Building XML from tree:", tree)  # check input tree
-
-    katana_root = ET.Element("katana")
-    xml_exported_nodes = ET.SubElement(katana_root, "node")
-    xml_exported_nodes.attrib["name"] = "__SAVE_exportedNodes"
-    xml_exported_nodes.attrib["type"] = "Group"
-
-    # Calculate maximum depths for all nodes
-    node_depths = {}
-    getMaxDepths(tree["children"], node_depths)
-
-    # Get global maximum depth
-    max_level = max(node_depths.values()) if node_depths else 0
+    if cmds.about(batch=True):
+        return None
+    progress_bar = mel.eval("$tmp = $gMainProgressBar")
+    cmds.progressBar(progress_bar, edit=True, beginProgress=True, isInterruptable=True,
+                     status="Copying to Katana...", maxValue=max(total, 1))
+    return progress_bar
 
-    # Add orphaned nodes first
-    if tree["orphaned_nodes"]:
-        for orphaned_node in tree.get("orphaned_nodes", []):
-            xml_exported_nodes.append(iterateMapping(orphaned_node).getroot())
 
-
-    # Recursively build the tree by levels using max depth of each node
-    processed_nodes=set()
-    for current_level in range(0, max_level+1):
-        processTreeLevel(tree["children"], current_level, xml_exported_nodes, node_depths, processed_nodes)
-
-
-    # xml_str = ET.tostring(katana_root, encoding='unicode')
-    # print("Final XML output:", xml_str) # test XML
-
-    return ET.ElementTree(katana_root)
-
-def processTreeLevel(nodes, target_level, parent_xml, depth_dict, processed_nodes):
+def _reportProgress(job, progress_bar, done):
     """
-    Processes nodes at specific target level based on pre-calculated depths.
+    Update the main progress bar on the main thread, cancel the job if Esc was pressed
 
     Args:
-        nodes: List of node dictionaries
-        target_level: Current processing level
-        parent_xml: Parent XML element
-        depth_dict: Node depth mapping {name: max_depth}
-        processed_nodes : a set to store processed nodes which have connections
+        job (ExportJob): background copy
+        progress_bar (str): main progress bar, None without maya UI
+        done (int): number of mapped nodes
     """
-    for node in nodes:
-        node_name = node["name"]
-        if (depth_dict[node_name] == target_level and node_name not in processed_nodes):
-            leaf = iterateMapping(node)
-            parent_xml.append(leaf.getroot())
-            processed_nodes.add(node_name)
-
-        processTreeLevel(node["children"], target_level, parent_xml, depth_dict, processed_nodes)
-
-
-def getMaxDepths(nodes, depth_dict, level=0):
-    """
-       Recursively calculates maximum depth for each node across all branches.
-
-       Args:
-           nodes: List of node dictionaries
-           depth_dict: Dictionary stores each node's max depth {node_name: max_depth}
-           level: Current recursion depth
-       """
-
-    for node in nodes:
-        node_name = node["name"]
-        if node_name not in depth_dict or level > depth_dict[node_name]:
-            depth_dict[node_name] = level
-        getMaxDepths(node["children"], depth_dict, level+1)
+    if progress_bar is None or job.done or job is not _ASYNC_JOB:
+        return
+    if cmds.progressBar(progress_bar, query=True, isCancelled=True):
+        job.cancel()
+        return
+    cmds.progressBar(progress_bar, edit=True, progress=done)
 
 
-def copy():
+def _finishCopy(job, clipboard, progress_bar):
     """
-    Copy xml data to clipboard
+    Set the clipboard on the main thread once a background copy finished
 
+    Args:
+        job (ExportJob): finished background copy
+        clipboard (QClipboard): clipboard to set
+        progress_bar (str): main progress bar, None without maya UI
     """
-    if not CLIPBOARD:
-        utils.log.info("Clipboard not available, sorry")
-        return
-    selected_nodes = cmds.ls(selection=True)
-    all_nodes = getAllNodes(selected_nodes)
-    print(f"Collected {len(all_nodes)} nodes: {all_nodes}") # output test
-
-    nodes_dict = {}
-    for node_name in all_nodes:
-        nodes_dict[node_name] = generateNode(node_name)
-    print("Generated nodes dict:", nodes_dict) # output test
-
-    tree = buildTree(nodes_dict)
-    xml = buildXML(tree)
-    xml_str = ET.tostring(xml.getroot(), encoding='unicode')
-    if xml_str:
-        CLIPBOARD.setText(xml_str)
+    # a cancelled job may finish after the next copy started, the progress bar is then no longer its own
+    if progress_bar is not None and job is _ASYNC_JOB:
+        cmds.progressBar(progress_bar, edit=True, endProgress=True)
+
+    if job.cancelled:
+        utils.log.info("Copy cancelled")
+    elif job.error is not None:
+        utils.log.error("Copy failed: %s", job.error)
+    elif job.result:
+        clipboard.setText(job.result)
         utils.log.info(
             "Successfully copied nodes to clipboard. "
             "You can paste them to Katana now."
         )
     else:
         utils.log.info("Nothing copied")
-
-
-
-
-
-
-
+    templates.flushDiskCache()
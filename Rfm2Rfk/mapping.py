@@ -0,0 +1,717 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Maya free stages of a copy: layout, mapping to katana templates and XML serialization
+
+Every stage works on node records or dicts gathered from maya (see m2k.generateNode) and
+on the connection snapshot of the copy, so it can run on a worker thread or
+outside of maya. Without a snapshot the connection questions are asked to
+maya directly.
+"""
+
+import copy
+import logging
+import threading
+
+from collections import OrderedDict
+
+from Rfm2Rfk import ET
+from Rfm2Rfk import compare, diff, graph, instrumentation, templates
+from Rfm2Rfk.export_node import ExportNode
+
+log = logging.getLogger("clip")
+
+KATANA_NODE_WIDTH = 200
+KATANA_SPACE_WIDTH = 60
+KATANA_ROW_HEIGHT = 100
+
+# mapped node contents kept, least recently used first out, 0 disables sharing them
+FRAGMENT_CACHE_SIZE = 4096
+
+_FRAGMENTS = OrderedDict()
+_FRAGMENTS_LOCK = threading.Lock()
+
+
+def compareParameter(attr_name, node_dict):
+    """
+    This function retrieves a specified parameter's value from a Maya node and compares it
+    against the matching parameter definition in an XML file.
+
+    It supports both single values and array-type parameters (like float3/double3) with tolerance-based comparison for
+    floating-point numbers.
+
+    Args:
+        attr_name (str): Name of the parameter to compare (e.g., "diffuseColor").
+        node_dict (dict): Maya node dictionary
+
+    Returns:
+        any: The Maya parameter value if it differs from the XML definition
+        None: If the Maya parameter matches the XML value (within tolerance for floats)
+
+    Note:
+        - For array parameters (like float3), compares each component with 0.0001 tolerance
+        - Non-array parameters return the Maya value directly
+    """
+
+    spec = templates.getTemplateIndex(node_dict["type"]).parameters.get(attr_name)
+    param_value = node_dict["attributes"][attr_name]
+
+    # compare value of specific attribute from maya to katana
+    # if param type is float3 or double3
+    # same return None, otherwise return param value from maya
+    # other param type return maya value
+    if spec:
+        if isinstance(param_value, list):
+            xml_values = spec.default
+            if not isinstance(xml_values, tuple) or len(xml_values) != len(param_value):
+                return param_value
+
+            new_values = []
+            for value, xml_val in zip(param_value, xml_values):
+                if abs(value - xml_val) < 0.0001:
+                    new_values.append(xml_val)
+                else:
+                    new_values.append(value)
+
+            if list(xml_values) == new_values:
+                return None
+
+            else:
+                return new_values
+
+        elif isinstance(param_value, (int, float)):
+            xml_value = spec.default
+            if not isinstance(xml_value, float):
+                return param_value
+            if abs(param_value - xml_value) < 0.0001:
+                return None
+            else:
+                return param_value
+
+        elif isinstance(param_value, str):
+            return param_value
+
+    return None
+
+def iterateMapping(node, snapshot=None, mask=None):
+    """
+    Maps Maya node parameters to Katana XML parameters using cached templates.
+
+    Nodes with the same content (type, written parameters and connected ports)
+    are mapped once, see FRAGMENT_CACHE_SIZE. Every call returns its own copy
+    of the mapped node, which can be edited freely.
+
+     Args:
+        node (dict): Maya node dictionary containing:
+            - name (str): Node name
+            - type (str): Node type (must match template filename)
+            - attributes (dict): Parameter values
+            - connections (dict): Input connections
+            - fullPath (str): Full node path
+            - X (int): pos X value
+            - Y (int): pox Y value
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+        mask (dict): numeric parameters differing from their defaults, from compare.networkMasks,
+                     computed for this node alone if not given
+    Returns:
+        ET.ElementTree: Configured Katana node XML structure
+
+    Raises:
+        ValueError: If no matching template found or child attributes are connected
+        RuntimeError: If XML processing fails
+
+    """
+    index, fragment, port_paths = _mapContent(node, snapshot, mask)
+    elements = _elementsAt(copy.deepcopy(fragment.root),
+                           [index.groupPath, index.namePath] + list(port_paths.values()))
+    _setNodeValues(index, elements, port_paths, node["name"], str(node["X"]), str(node["Y"]),
+                   node["connections"])
+    return ET.ElementTree(elements[()])
+
+
+def mapFragment(node, snapshot=None, mask=None):
+    """
+    Map a single node straight to its XML text, same text as serializing iterateMapping
+
+    Nodes of the same content share their serialized text, only the name,
+    position and port sources are filled in for every node.
+
+    Args:
+        node (dict): node dictionary ready for iterateMapping
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+        mask (dict): numeric parameters differing from their defaults, see iterateMapping
+    Returns:
+        str: XML text of the node
+    """
+    with instrumentation.stage("map"):
+        index, fragment, port_paths = _mapContent(node, snapshot, mask)
+
+    with instrumentation.stage("serialize"):
+        if fragment.segments is None:
+            fragment.segments = _serializeSegments(index, fragment.root, port_paths)
+
+        values = {
+            "name" : _escapeAttribute(node["name"]),
+            "x" : str(node["X"]),
+            "y" : str(node["Y"]),
+        }
+        connections = node["connections"]
+        for attr in port_paths:
+            values["port:" + attr] = _escapeAttribute(connections[attr])
+
+        segments = fragment.segments
+        text = [segments[0]]
+        for i in range(1, len(segments), 2):
+            text.append(values[segments[i]])
+            text.append(segments[i + 1])
+        return "".join(text)
+
+
+class _Fragment(object):
+    """
+    Mapped parameters shared by every node of the same content
+
+    Args:
+        root (ET.Element): read-only root of the mapped template, name, position and ports are not set
+    """
+
+    __slots__ = ("root", "segments")
+
+    def __init__(self, root):
+        self.root = root
+        # serialized text split around the node values, see _serializeSegments
+        self.segments = None
+
+
+def _mapContent(node, snapshot, mask):
+    """
+    Check the connections of a node and get its mapped parameters
+
+    Args:
+        node (dict): node dictionary ready for iterateMapping
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+        mask (dict): numeric parameters differing from their defaults, computed for this node if not given
+
+    Returns:
+        tuple: (TemplateIndex, _Fragment, {connected attribute: port path})
+
+    Raises:
+        ValueError: If child attributes are connected
+    """
+    node_type=node["type"]
+    instrumentation.count("nodes.mapped")
+
+    index = templates.getTemplateIndex(node_type)
+    node_name = node["name"]
+    connections = node["connections"]
+
+    for attr, src_connection in connections.items():
+        if snapshot is not None:
+            input_is_child = snapshot.sourceIsChild(node_name, attr)
+        else:
+            from Rfm2Rfk import utils
+            input_is_child = utils.connectionInputIsChild(node_name, attr)
+        if input_is_child:
+            raise ValueError(f"Katana Do Not Support Child Attribute! Error Attribute: {src_connection}\n"
+                             f"Please Use A Parent Attribute Connect")
+
+    # numeric parameters left at their default are skipped without comparing them one by one
+    if mask is None:
+        mask = compare.parameterMask(node)
+
+    port_paths = {}
+    for attr, src_connection in connections.items():
+        port_path = index.ports.get(attr)
+        if port_path is not None:
+            port_paths[attr] = port_path
+            log.info("Connected: %s.%s to %s", node_name, attr, src_connection)
+
+    return index, _mappedContent(index, node, mask, port_paths), port_paths
+
+
+def _setNodeValues(index, elements, port_paths, name, x, y, sources):
+    """
+    Set the name, position and port sources of a node on the copied elements of its fragment
+
+    Args:
+        index (TemplateIndex): template index of the node type
+        elements (dict): {path: element} from _copyPaths or _elementsAt
+        port_paths (dict): {connected attribute: port path}
+        name (str): node name
+        x (str): node position
+        y (str): node position
+        sources (dict): {connected attribute: source plug}
+    """
+    root = elements[()]
+
+    # Convert katana node name to maya node name
+    root.set('name', name)
+    elements[index.groupPath].set('name', name)
+    elements[index.namePath].set('value', name)
+
+    # Set node position
+    root.set('x', x)
+    root.set('y', y)
+
+    # process connections
+    for attr, port_path in port_paths.items():
+        elements[port_path].set("source", sources[attr])
+
+
+# separates the node values from the rest of a serialized fragment, never part of katana XML
+_PLACEHOLDER = "\ue000"
+
+
+def _serializeSegments(index, root, port_paths):
+    """
+    Serialize a fragment with placeholders for the node values
+
+    Returns:
+        list: text segments, every odd one is the key of a node value ("name", "x", "y" or "port:<attribute>")
+    """
+    elements = _copyPaths(root, [index.groupPath, index.namePath] + list(port_paths.values()))
+    sources = {attr: _PLACEHOLDER + "port:" + attr + _PLACEHOLDER for attr in port_paths}
+    _setNodeValues(index, elements, port_paths, _PLACEHOLDER + "name" + _PLACEHOLDER,
+                   _PLACEHOLDER + "x" + _PLACEHOLDER, _PLACEHOLDER + "y" + _PLACEHOLDER, sources)
+    return ET.tostring(elements[()], encoding='unicode').split(_PLACEHOLDER)
+
+
+def _escapeAttribute(value):
+    """
+    Escape an attribute value like ElementTree does when serializing
+
+    Args:
+        value (str)
+
+    Returns:
+        str
+    """
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if "<" in value:
+        value = value.replace("<", "&lt;")
+    if ">" in value:
+        value = value.replace(">", "&gt;")
+    if "\"" in value:
+        value = value.replace("\"", "&quot;")
+    if "\r" in value:
+        value = value.replace("\r", "&#13;")
+    if "\n" in value:
+        value = value.replace("\n", "&#10;")
+    if "\t" in value:
+        value = value.replace("\t", "&#09;")
+    return value
+
+
+def _writeParameters(index, node, mask):
+    """
+    Clone the template of a node and write the parameters differing from their defaults
+
+    Args:
+        index (TemplateIndex): template index of the node type
+        node (dict): Maya node dictionary
+        mask (dict): numeric parameters differing from their defaults
+
+    Returns:
+        ET.Element: root of the mapped template, name, position and ports are not set
+    """
+    # clone template once per node to avoid contaminating template in cache
+    root = index.clone()
+
+    # process all parameters(attributes)
+    for param_name in node['attributes']:
+        spec = index.parameters.get(param_name)
+        if spec is None or mask.get(param_name) is False:
+            continue
+
+        value = compareParameter(param_name, node)
+        if value is None:
+            continue
+        # Handle different parameter types
+        if spec.valuePath is not None:
+            if spec.enablePath is not None:
+                index.element(root, spec.enablePath).set('value', str("1"))
+            value_param = index.element(root, spec.valuePath)
+            if isinstance(value, (int, float)):
+                value_param.set('value', str(value))
+
+            elif isinstance(value, str):
+                value_param.set('value', value)
+
+            elif isinstance(value, list) and spec.tupleSize == len(value):
+                for i in range(len(value)):
+                    value_param[i].set('value', str(value[i]))
+
+            else:
+                continue
+
+    return root
+
+
+def _contentKey(index, node, mask, port_paths):
+    """
+    Key of everything a mapped node depends on, but its name, position and port sources
+
+    Args:
+        index (TemplateIndex): template index of the node type
+        node (dict): Maya node dictionary
+        mask (dict): numeric parameters differing from their defaults
+        port_paths (dict): {connected attribute: port path}
+
+    Returns:
+        tuple: hashable key, parameters left at their default are left out
+    """
+    written = []
+    for name, value in node["attributes"].items():
+        if name in index.parameters and mask.get(name) is not False:
+            written.append((name, tuple(value) if isinstance(value, list) else value))
+    return index, tuple(written), tuple(port_paths)
+
+
+def _mappedContent(index, node, mask, port_paths):
+    """
+    Get the mapped parameters of a node, shared by every node of the same content
+
+    Args:
+        index (TemplateIndex): template index of the node type
+        node (dict): Maya node dictionary
+        mask (dict): numeric parameters differing from their defaults
+        port_paths (dict): {connected attribute: port path}
+
+    Returns:
+        _Fragment: shared mapped parameters
+    """
+    if FRAGMENT_CACHE_SIZE <= 0:
+        return _Fragment(_writeParameters(index, node, mask))
+
+    key = _contentKey(index, node, mask, port_paths)
+    with _FRAGMENTS_LOCK:
+        content = _FRAGMENTS.get(key)
+        if content is not None:
+            _FRAGMENTS.move_to_end(key)
+    if content is not None:
+        instrumentation.count("fragments.shared")
+        return content
+
+    content = _Fragment(_writeParameters(index, node, mask))
+    with _FRAGMENTS_LOCK:
+        _FRAGMENTS[key] = content
+        while len(_FRAGMENTS) > FRAGMENT_CACHE_SIZE:
+            _FRAGMENTS.popitem(last=False)
+    return content
+
+
+def _elementsAt(root, paths):
+    """
+    Get the elements along some paths of a mapped node
+
+    Args:
+        root (ET.Element): root of a mapped node
+        paths (list): element paths (child indices from the root)
+
+    Returns:
+        dict: {path: element}, the root under ()
+    """
+    elements = {(): root}
+    for path in paths:
+        element = root
+        for child in path:
+            element = element[child]
+        elements[path] = element
+    return elements
+
+
+def _copyPaths(root, paths):
+    """
+    Shallow copy a mapped node so the elements along some paths can be set, other elements stay shared
+
+    Args:
+        root (ET.Element): root of a mapped node
+        paths (list): element paths (child indices from the root) to copy
+
+    Returns:
+        dict: {path: copied element}, the copied root under ()
+    """
+    elements = {(): _shallowCopy(root)}
+    for path in paths:
+        for depth in range(1, len(path) + 1):
+            prefix = path[:depth]
+            if prefix not in elements:
+                parent = elements[path[:depth - 1]]
+                elements[prefix] = parent[path[depth - 1]] = _shallowCopy(parent[path[depth - 1]])
+    return elements
+
+
+def _shallowCopy(element):
+    """
+    Copy an element and its attributes, its children stay shared
+
+    copy.copy is not enough, it shares the attributes dict with the original.
+
+    Args:
+        element (ET.Element)
+
+    Returns:
+        ET.Element
+    """
+    copied = element.makeelement(element.tag, dict(element.attrib))
+    copied.text = element.text
+    copied.tail = element.tail
+    copied.extend(element)
+    return copied
+
+
+def clearFragmentCache():
+    """
+    Forget every mapped node content, e.g. after editing a template in place
+    """
+    with _FRAGMENTS_LOCK:
+        _FRAGMENTS.clear()
+
+
+def buildTree(nodes, snapshot=None, roots=None):
+    """
+    Build a layered material network from nodes list for generating XML data.
+
+    Every node is placed once: its level is the longest path reaching it from the
+    most upstream nodes, and nodes inside a level are ordered to reduce crossings.
+    When several materials are exported together, each one is laid out in its own
+    band of rows, a node shared by several materials sits in the band of the first.
+
+    Args:
+        nodes (dict): Dictionary of all nodes data {node_name: node_dict}
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+        roots (list): terminal node of every exported material, in export order (optional)
+
+    Returns:
+        dict: Tree structure containing:
+            - name: "root"
+            - children: Laid out nodes (ExportNode) ordered by band, level then row, each with
+                        "level", "X" and "Y" keys
+            - terminal_nodes: List of terminal nodes (e.g. shaders)
+            - orphaned_nodes: List of unconnected nodes
+            - materials: {root: node names of its network}, empty if no roots were given
+
+    """
+
+    tree = {"name" : "root", "children" : [], "terminal_nodes" : [], "orphaned_nodes" : [], "materials" : {}}
+
+    # deal with orphaned nodes
+    for orphaned_name in nodes:
+        if snapshot is not None:
+            orphaned = snapshot.isOrphaned(orphaned_name)
+        else:
+            from Rfm2Rfk import utils
+            orphaned = utils.checkOrphaned(orphaned_name)
+        if orphaned:
+            orphaned_node = nodes[orphaned_name]
+            orphaned_node.update({
+                "X" : 0,
+                "Y" : 0
+            })
+            tree["orphaned_nodes"].append(nodes[orphaned_name])
+
+    # index connections once
+    downstream, upstream = graph.buildAdjacency(nodes)
+
+    # find all terminal nodes(like shader nodes e.g.PxrSurface)
+    tree["terminal_nodes"] = graph.terminalNodes(downstream)
+
+    # lay out the connected network, orphaned nodes are already placed and have no edges
+    orphaned_names = {node["name"] for node in tree["orphaned_nodes"]}
+    downstream = {name: outputs for name, outputs in downstream.items() if name not in orphaned_names}
+    upstream = {name: inputs for name, inputs in upstream.items() if name not in orphaned_names}
+    levels = graph.longestPathLayers(downstream, upstream)
+    # a selected node feeding another one is part of that material, it is not the root of its own
+    roots = [root for root in roots or [] if root in downstream and not downstream[root]]
+    if roots:
+        tree["materials"] = graph.materialNodes(roots, upstream)
+        bands = _materialBands(levels, downstream, tree["materials"])
+    else:
+        bands = [graph.orderLayers(levels, downstream)]
+
+    first_row = 0
+    for band in bands:
+        for level, layer in enumerate(band):
+            for row, node_name in enumerate(layer):
+                current_node = nodes[node_name]
+                # attributes and connections are shared with the node, not copied
+                tree["children"].append(ExportNode(
+                    node_name, current_node["type"], current_node["attributes"], current_node["connections"],
+                    level=level,
+                    X=level * (KATANA_NODE_WIDTH + KATANA_SPACE_WIDTH),
+                    Y=(first_row + row) * (KATANA_ROW_HEIGHT + KATANA_SPACE_WIDTH),
+                ))
+        first_row += max((len(layer) for layer in band), default=0)
+
+    return tree
+
+
+def _materialBands(levels, downstream, materials):
+    """
+    Split a laid out network into one band per material, a shared node goes to the band of its first material
+
+    Args:
+        levels (dict): {node_name: level} from graph.longestPathLayers
+        downstream (dict): forward adjacency from graph.buildAdjacency
+        materials (dict): {root: node names of its network} from graph.materialNodes
+
+    Returns:
+        list: one band per material, then one for nodes outside every material, each a list of
+              ordered node names per level (see graph.orderLayers)
+    """
+    owners = {}
+    for root, members in materials.items():
+        for name in members:
+            owners.setdefault(name, root)
+
+    groups = {root: {} for root in materials}
+    groups[None] = {}
+    for name, level in levels.items():
+        groups[owners.get(name)][name] = level
+
+    bands = []
+    for group in groups.values():
+        if group:
+            band_downstream = {name: [output for output in downstream[name] if output in group] for name in group}
+            bands.append(graph.orderLayers(group, band_downstream))
+    return bands
+
+
+def iterTreeNodes(tree):
+    """
+    Iterate laid out nodes in emission order: orphaned nodes first, then level by level
+
+    Args:
+        tree (dict): material tree structure
+    Yields:
+        dict: node dictionary ready for iterateMapping
+    """
+    # Add orphaned nodes first
+    for orphaned_node in tree.get("orphaned_nodes", []):
+        yield orphaned_node
+
+    # Bucket nodes by level in a single pass, then emit them level by level,
+    # buildTree lays out every node once
+    levels = {}
+    for node in tree["children"]:
+        levels.setdefault(node["level"], []).append(node)
+
+    for level in sorted(levels):
+        yield from levels[level]
+
+
+def buildXML(tree, snapshot=None):
+    """
+    Build katana XML
+
+    Args:
+        tree (dict): material tree structure
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+    Returns:
+        ET.ElementTree: Complete Katana XML document
+    """
+    katana_root = ET.Element("katana")
+    xml_exported_nodes = ET.SubElement(katana_root, "node")
+    xml_exported_nodes.attrib["name"] = "__SAVE_exportedNodes"
+    xml_exported_nodes.attrib["type"] = "Group"
+
+    with instrumentation.stage("map"):
+        nodes = list(iterTreeNodes(tree))
+        masks = compare.networkMasks(nodes)
+        for node in nodes:
+            xml_exported_nodes.append(iterateMapping(node, snapshot, masks[node["name"]]).getroot())
+
+    return ET.ElementTree(katana_root)
+
+
+def mapNode(node, snapshot=None, cache=None, mask=None):
+    """
+    Map a single node to its serialized katana XML, reusing the fragment of an export cache
+
+    Args:
+        node (dict): node dictionary ready for iterateMapping
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+        cache (ExportCache): cache of previous copies (optional)
+        mask (dict): numeric parameters differing from their defaults, see iterateMapping
+    Returns:
+        str: XML text of the node
+    """
+    if cache is None:
+        return mapFragment(node, snapshot, mask)
+
+    # the node dict is cached separately, the fragment also depends on the layout
+    key = (node["X"], node["Y"])
+    fragment = cache.getFragment(node["name"], key)
+    if fragment is None:
+        fragment = mapFragment(node, snapshot, mask)
+        cache.storeFragment(node["name"], key, fragment)
+    else:
+        instrumentation.count("fragments.reused")
+    return fragment
+
+
+def iterXML(tree, snapshot=None, cache=None):
+    """
+    Serialize katana XML incrementally, same document as buildXML
+
+    Every node is mapped, serialized and released before the next one, so the
+    whole document is never held as an element tree.
+
+    Args:
+        tree (dict): material tree structure
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+        cache (ExportCache): cache of previous copies, only dirty or moved nodes are mapped (optional)
+    Yields:
+        str: XML text chunks, one per node plus the enclosing group
+    """
+    yield '<katana><node name="__SAVE_exportedNodes" type="Group">'
+    nodes = list(iterTreeNodes(tree))
+    # with a cache most nodes are not mapped again, the few which are get their own mask
+    with instrumentation.stage("map"):
+        masks = compare.networkMasks(nodes) if cache is None else {}
+    for node in nodes:
+        yield mapNode(node, snapshot, cache, masks.get(node["name"]))
+    yield '</node></katana>'
+
+
+def writeXML(tree, output, snapshot=None, cache=None):
+    """
+    Stream katana XML into a file
+
+    Args:
+        tree (dict): material tree structure
+        output (str/Path/file): file path, or a text file object to write into
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+        cache (ExportCache): cache of previous copies (optional)
+    """
+    if hasattr(output, "write"):
+        for chunk in iterXML(tree, snapshot, cache):
+            output.write(chunk)
+        return
+
+    with open(output, "w", encoding="utf-8") as xml_file:
+        writeXML(tree, xml_file, snapshot, cache)
+
+
+def buildPatch(tree, previous, snapshot=None):
+    """
+    Build the katana patch turning a previous export into the current network, see diff.buildPatchXML
+
+    Only added and changed nodes are mapped.
+
+    Args:
+        tree (dict): material tree structure
+        previous (dict): nodes of the previous export, from diff.loadNodes
+        snapshot (ConnectionSnapshot): connections taken for this copy, queried from maya if not given
+    Returns:
+        ET.ElementTree: patch document
+    """
+    nodes = {node["name"]: node for node in iterTreeNodes(tree)}
+    changes = diff.diffNodes(previous, nodes)
+    changed = [nodes[name] for name in diff.changedNodes(changes)]
+    with instrumentation.stage("map"):
+        masks = compare.networkMasks(changed)
+        mapped = {node["name"]: iterateMapping(node, snapshot, masks[node["name"]]).getroot() for node in changed}
+    return diff.buildPatchXML(changes, mapped)
@@ -0,0 +1,86 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Connection snapshot of an exported material network
+
+The snapshot is taken once per copy (see utils.takeConnectionSnapshot) and
+answers every connection question of the later stages without asking maya.
+"""
+
+
+class ConnectionSnapshot(object):
+    """
+    Plug level connections of a material network at the time of the copy
+
+    Args:
+        nodes (list): node names of the network, in traversal order
+        inputs (dict): {node: {destination attribute: source plug}}
+        childInputs (dict): {node: set of destination attributes fed by a child plug}
+        outputs (dict): {node: [names of every node it feeds, one per connection]}
+
+    Example:
+        snapshot = utils.takeConnectionSnapshot(["PxrSurface1"])
+        print(snapshot.inputConnections("PxrSurface1"))
+        Output: {"diffuseColor": "PxrTexture1.resultRGB"}
+    """
+
+    def __init__(self, nodes, inputs, childInputs, outputs):
+        self.nodes = nodes
+        self.inputs = inputs
+        self.childInputs = childInputs
+        self.outputs = outputs
+
+    def __repr__(self):
+        return "{}({} nodes)".format(self.__class__.__name__, len(self.nodes))
+
+    def inputConnections(self, node):
+        """
+        Input connections of a node, same format as utils.getInputConnctions
+
+        Args:
+            node (str): node name
+
+        Returns:
+            dict: {destination attribute: source plug}
+        """
+        return dict(self.inputs.get(node, {}))
+
+    def sourceIsChild(self, node, attribute):
+        """
+        Check if the source of an input connection is a child attribute, see utils.connectionInputIsChild
+
+        Args:
+            node (str): node name
+            attribute (str): destination attribute
+
+        Returns:
+            bool
+        """
+        return attribute in self.childInputs.get(node, ())
+
+    def downstreamNodes(self, node):
+        """
+        Every node fed by a node, inside or outside the network
+
+        Args:
+            node (str): node name
+
+        Returns:
+            set: node names
+        """
+        return set(self.outputs.get(node, ()))
+
+    def isOrphaned(self, node):
+        """
+        Identifies orphaned nodes, see utils.checkOrphaned
+
+        Args:
+            node (str): node name
+
+        Returns:
+            bool: True if node is at most connected to a single default Maya node
+        """
+        connected = [plug.split('.')[0] for plug in self.inputs.get(node, {}).values()]
+        connected += self.outputs.get(node, [])
+        return len(connected) <= 1 and all('default' in name for name in connected)
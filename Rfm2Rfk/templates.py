@@ -0,0 +1,482 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Compiled index of katana node templates
+
+Every template is scanned once when it is loaded, the index keeps each
+parameter's default value(s), tuple size and element path, as well as the
+element path of every port, so mapping a node never needs to search the xml.
+Templates are loaded on first use per node type and kept in a bounded cache.
+
+Compiled indices are also kept in a cache file on disk, keyed by template path,
+mtime, size and hash, so a fresh mayapy reads them back without parsing any
+xml. The element tree of a cached template is only rebuilt the first time a
+node of its type is copied. The cache file is plain JSON, every index is only
+decoded when its node type is first used, and new indices are only written
+by flushDiskCache, called by the copy and batch entry points once their
+export is done. Merely importing this module never writes the cache.
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import logging
+import os
+
+from pathlib import Path
+
+from Rfm2Rfk import ET
+
+log = logging.getLogger("clip")
+
+TEMPLATE_DIR = Path(__file__).parent/"renderer"/"Prman"/"node"
+
+# templates generated from RenderMan .args files (see Rfm2Rfk.args_templates),
+# $RFM2RFK_GENERATED_TEMPLATES or ~/.rfm2rfk/templates, the templates of TEMPLATE_DIR come first
+GENERATED_TEMPLATE_DIR = Path(os.environ.get("RFM2RFK_GENERATED_TEMPLATES") or
+                              Path.home()/".rfm2rfk"/"templates")
+
+# node types kept in memory, the least recently used template is dropped first, changed with setCacheSize
+TEMPLATE_CACHE_SIZE = 256
+
+# compiled template cache file, $RFM2RFK_TEMPLATE_CACHE or ~/.rfm2rfk/templates.cache, None disables it
+TEMPLATE_CACHE = Path(os.environ.get("RFM2RFK_TEMPLATE_CACHE") or Path.home()/".rfm2rfk"/"templates.cache")
+
+# bump whenever TemplateIndex or ParameterSpec change, older cache files are then ignored
+TEMPLATE_CACHE_VERSION = 3
+
+# contents of TEMPLATE_CACHE once read, {template path: [mtime_ns, size, sha1, JSON of TemplateIndex.toDict]},
+# only the serialized indices are kept, the indices themselves live in the bounded getTemplateIndex cache
+_DISK_CACHE = None
+
+# _DISK_CACHE holds entries missing from TEMPLATE_CACHE
+_DISK_CACHE_DIRTY = False
+
+
+class ParameterSpec(object):
+    """
+    Read-only description of a single katana parameter in a template
+
+    Args:
+        name (str): parameter name (e.g. "diffuseColor")
+        path (tuple): child indices from the template root to the parameter group
+        enablePath (tuple): child indices to the "enable" element, None if missing
+        valuePath (tuple): child indices to the "value" element, None if missing
+        default (float/tuple/str): default value, a tuple for array parameters
+        tupleSize (int): tuple size of array parameters, 0 for single values
+    """
+
+    __slots__ = ("name", "path", "enablePath", "valuePath", "default", "tupleSize")
+
+    def __init__(self, name, path, enablePath, valuePath, default, tupleSize):
+        self.name = name
+        self.path = path
+        self.enablePath = enablePath
+        self.valuePath = valuePath
+        self.default = default
+        self.tupleSize = tupleSize
+
+    def __repr__(self):
+        return "{}('{}')".format(self.__class__.__name__, self.name)
+
+
+class TemplateIndex(object):
+    """
+    Per node type index built from a katana node template
+
+    Args:
+        tree (ET.ElementTree/ET.Element): parsed katana node template
+
+    Example:
+        index = TemplateIndex(ET.parse("PxrSurface.xml"))
+        print(index.parameters["specularRoughness"].default)
+        Output: 0.2
+    """
+
+    def __init__(self, tree):
+        root = tree.getroot() if isinstance(tree, ET.ElementTree) else tree
+        self._root = root
+        self._source = None
+        self.nodeType = root.get("name")
+        self.parameters = {}
+        self.ports = {}
+        self.groupPath = None
+        self.namePath = None
+        self.parametersPath = None
+        # numeric defaults of every parameter flattened into one array, see Rfm2Rfk.compare
+        self.defaultValues = []
+        self.defaultSlices = {}
+
+        for index, child in enumerate(root):
+            if child.tag == "port":
+                self.ports[child.get("name")] = (index,)
+
+            elif child.tag == "group_parameter" and child.get("name") == self.nodeType:
+                self.groupPath = (index,)
+                self._indexGroup(child, self.groupPath)
+
+        if self.groupPath is None:
+            raise ValueError(f"No matching node type '{self.nodeType}' found in XML template")
+
+        self._indexDefaults()
+
+    def _indexDefaults(self):
+        """
+        Flatten the numeric defaults of every parameter into defaultValues
+        """
+        for name, spec in self.parameters.items():
+            if isinstance(spec.default, float):
+                self.defaultSlices[name] = (len(self.defaultValues), len(self.defaultValues) + 1, False)
+                self.defaultValues.append(spec.default)
+            elif isinstance(spec.default, tuple):
+                self.defaultSlices[name] = (len(self.defaultValues), len(self.defaultValues) + len(spec.default), True)
+                self.defaultValues.extend(spec.default)
+
+    def _indexGroup(self, group, group_path):
+        """
+        Record the name parameter and every parameter under the "parameters" group
+
+        Args:
+            group (ET.Element): group_parameter named after the node type
+            group_path (tuple): child indices to the group
+        """
+        for index, child in enumerate(group):
+            name = child.get("name")
+            if child.tag == "string_parameter" and name == "name":
+                self.namePath = group_path + (index,)
+
+            elif child.tag == "group_parameter" and name == "parameters":
+                self.parametersPath = group_path + (index,)
+                for param_index, param in enumerate(child):
+                    # groups without children (e.g. "__unused") carry no value
+                    if param.tag != "group_parameter" or not len(param):
+                        continue
+                    param_path = self.parametersPath + (param_index,)
+                    self.parameters[param.get("name")] = self._indexParameter(param, param_path)
+
+    @staticmethod
+    def _indexParameter(param, param_path):
+        """
+        Build the ParameterSpec of a single parameter group
+
+        Args:
+            param (ET.Element): group_parameter of the parameter
+            param_path (tuple): child indices to the parameter group
+
+        Returns:
+            ParameterSpec
+        """
+        enable_path = None
+        value_path = None
+        default = None
+        tuple_size = 0
+
+        for index, child in enumerate(param):
+            name = child.get("name")
+            if name == "enable":
+                enable_path = param_path + (index,)
+
+            elif name == "value":
+                value_path = param_path + (index,)
+                if child.tag == "numberarray_parameter":
+                    tuple_size = int(child.get("tupleSize", len(child)))
+                    default = tuple(float(i.get("value")) for i in child)
+                elif child.tag == "number_parameter":
+                    default = float(child.get("value"))
+                else:
+                    default = child.get("value")
+
+        return ParameterSpec(param.get("name"), param_path, enable_path, value_path, default, tuple_size)
+
+    def toDict(self):
+        """
+        Get the index as plain data, see fromDict
+
+        Returns:
+            dict: template XML and every recorded path and default, JSON serializable
+        """
+        source = self._source if self._root is None else ET.tostring(self._root, encoding="unicode")
+        return {
+            "source" : source,
+            "nodeType" : self.nodeType,
+            "parameters" : [[spec.name, spec.path, spec.enablePath, spec.valuePath, spec.default, spec.tupleSize]
+                            for spec in self.parameters.values()],
+            "ports" : self.ports,
+            "groupPath" : self.groupPath,
+            "namePath" : self.namePath,
+            "parametersPath" : self.parametersPath,
+        }
+
+    @classmethod
+    def fromDict(cls, data):
+        """
+        Rebuild an index from toDict data without parsing its template, the tree is parsed on first use
+
+        Args:
+            data (dict): from toDict, lists may stand for tuples (e.g. read back from JSON)
+
+        Returns:
+            TemplateIndex
+        """
+        def path(value):
+            return tuple(value) if value is not None else None
+
+        index = cls.__new__(cls)
+        index._root = None
+        index._source = data["source"]
+        index.nodeType = data["nodeType"]
+        index.parameters = {}
+        for name, param_path, enable_path, value_path, default, tuple_size in data["parameters"]:
+            if isinstance(default, list):
+                default = tuple(default)
+            index.parameters[name] = ParameterSpec(name, path(param_path), path(enable_path), path(value_path),
+                                                   default, tuple_size)
+        index.ports = {name: path(port_path) for name, port_path in data["ports"].items()}
+        index.groupPath = path(data["groupPath"])
+        index.namePath = path(data["namePath"])
+        index.parametersPath = path(data["parametersPath"])
+        index.defaultValues = []
+        index.defaultSlices = {}
+        index._indexDefaults()
+        return index
+
+    @property
+    def root(self):
+        """
+        ET.Element: read-only template root, parsed on first access for an index read from the disk cache
+
+        The disk cache spares the scan of every template at startup, not the parse of the
+        templates actually copied: each one is parsed once, when its first node is cloned.
+        """
+        if self._root is None:
+            self._root = ET.fromstring(self._source)
+        return self._root
+
+    def clone(self):
+        """
+        Copy the template for a single emitted node, the cached template stays read-only
+
+        Returns:
+            ET.Element: root of an independent copy of the template
+        """
+        return copy.deepcopy(self.root)
+
+    @staticmethod
+    def element(root, path):
+        """
+        Resolve an element path recorded by the index on a copy of the template
+
+        Args:
+            root (ET.Element): root of a copy of the template
+            path (tuple): child indices from the root
+
+        Returns:
+            ET.Element
+        """
+        element = root
+        for index in path:
+            element = element[index]
+        return element
+
+
+def listTemplates():
+    """
+    List every node type with a katana template
+
+    Returns:
+        list: node types (e.g. ["PxrChecker", "PxrDisney", ...])
+    """
+    return sorted({file.stem for directory in (TEMPLATE_DIR, GENERATED_TEMPLATE_DIR)
+                   for file in directory.glob("*.xml")})
+
+
+def templateFile(node_type):
+    """
+    Get the katana template of a node type, a template of TEMPLATE_DIR wins over a generated one
+
+    Args:
+        node_type (str): node type
+
+    Returns:
+        Path: template file, None if there is no template for the node type
+    """
+    for directory in (TEMPLATE_DIR, GENERATED_TEMPLATE_DIR):
+        file = directory/f"{node_type}.xml"
+        if file.is_file():
+            return file
+    return None
+
+
+def _readDiskCache():
+    """
+    Read the compiled template cache file once per session
+
+    Returns:
+        dict: {template path: [mtime_ns, size, sha1, index JSON]}, empty if missing, outdated or unreadable
+    """
+    global _DISK_CACHE
+    if _DISK_CACHE is None:
+        _DISK_CACHE = {}
+        try:
+            with open(TEMPLATE_CACHE, encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+            if data.get("version") == TEMPLATE_CACHE_VERSION:
+                _DISK_CACHE = data["entries"]
+        except FileNotFoundError:
+            pass
+        except Exception as error:
+            log.debug("Ignoring template cache %s: %s", TEMPLATE_CACHE, error)
+    return _DISK_CACHE
+
+
+def flushDiskCache():
+    """
+    Write the indices compiled since the last flush into the cache file, nothing is written if
+    none were compiled or the cache is disabled
+
+    Called by the entry points (m2k.copy, batch.main, compileTemplates) once their export is
+    done. Concurrent sessions simply replace each other's file.
+    """
+    global _DISK_CACHE_DIRTY
+    if not _DISK_CACHE_DIRTY or _DISK_CACHE is None or TEMPLATE_CACHE is None:
+        return
+    temp_path = TEMPLATE_CACHE.with_name(f"{TEMPLATE_CACHE.name}.{os.getpid()}.tmp")
+    try:
+        TEMPLATE_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            json.dump({"version": TEMPLATE_CACHE_VERSION, "entries": _DISK_CACHE}, cache_file)
+        os.replace(temp_path, TEMPLATE_CACHE)
+        _DISK_CACHE_DIRTY = False
+    except OSError as error:
+        log.debug("Could not write template cache %s: %s", TEMPLATE_CACHE, error)
+
+
+def clearDiskCache():
+    """
+    Forget the compiled template cache read in this session and delete its file
+    """
+    global _DISK_CACHE, _DISK_CACHE_DIRTY
+    _DISK_CACHE = None
+    _DISK_CACHE_DIRTY = False
+    if TEMPLATE_CACHE is not None and TEMPLATE_CACHE.is_file():
+        TEMPLATE_CACHE.unlink()
+
+
+def loadTemplate(node_type):
+    """
+    Get the compiled index of a node type's katana template
+
+    The index comes from the disk cache when the template's mtime and size, or
+    failing that its hash, still match, the template is parsed otherwise and
+    its index is written into the cache file by the next flushDiskCache.
+
+    Args:
+        node_type (str): node type (must match template filename)
+
+    Returns:
+        TemplateIndex
+
+    Raises:
+        KeyError: If there is no template for the node type
+    """
+    file = templateFile(node_type)
+    if file is None:
+        raise KeyError(node_type)
+    if TEMPLATE_CACHE is None:
+        return TemplateIndex(ET.parse(file))
+
+    return _cachedIndex(file)[0]
+
+
+def _cachedIndex(file):
+    """
+    Get the compiled index of a template from the disk cache, compiling it into the cache if outdated
+
+    Args:
+        file (Path): template file
+
+    Returns:
+        tuple: (TemplateIndex, True if the disk cache entry was added or updated)
+    """
+    global _DISK_CACHE_DIRTY
+    entries = _readDiskCache()
+    key = str(file.resolve())
+    stat = file.stat()
+    entry = entries.get(key)
+    if entry is not None and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+        return TemplateIndex.fromDict(json.loads(entry[3])), False
+
+    digest = hashlib.sha1(file.read_bytes()).hexdigest()
+    if entry is not None and entry[2] == digest:
+        payload = entry[3]
+        index = TemplateIndex.fromDict(json.loads(payload))
+    else:
+        index = TemplateIndex(ET.parse(file))
+        payload = json.dumps(index.toDict())
+
+    entries[key] = [stat.st_mtime_ns, stat.st_size, digest, payload]
+    _DISK_CACHE_DIRTY = True
+    return index, True
+
+
+def compileTemplates(node_types=None):
+    """
+    Compile templates into the disk cache ahead of time, the cache file is written once at the end
+
+    Args:
+        node_types (list): node types to compile, every template if not given
+
+    Returns:
+        int: number of templates compiled again
+
+    Raises:
+        KeyError: If there is no template for a node type
+    """
+    if TEMPLATE_CACHE is None:
+        return 0
+    compiled = 0
+    for node_type in listTemplates() if node_types is None else node_types:
+        file = templateFile(node_type)
+        if file is None:
+            raise KeyError(node_type)
+        compiled += _cachedIndex(file)[1]
+    flushDiskCache()
+    return compiled
+
+
+def _getTemplateIndex(node_type):
+    """
+    Get the template index of a node type, loading it on first use
+
+    Args:
+        node_type (str): node type (must match template filename)
+
+    Returns:
+        TemplateIndex
+
+    Raises:
+        KeyError: If there is no template for the node type
+    """
+    return loadTemplate(node_type)
+
+
+getTemplateIndex = functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)(_getTemplateIndex)
+
+
+def setCacheSize(size):
+    """
+    Change how many node types are kept in memory, the indices loaded so far are dropped
+
+    Args:
+        size (int/None): node types kept by getTemplateIndex, None keeps every node type
+
+    Example:
+        setCacheSize(1024)
+        print(getTemplateIndex.cache_info().maxsize)
+        Output: 1024
+    """
+    global TEMPLATE_CACHE_SIZE, getTemplateIndex
+    TEMPLATE_CACHE_SIZE = size
+    getTemplateIndex = functools.lru_cache(maxsize=size)(_getTemplateIndex)
@@ -0,0 +1,55 @@
+"""
+Author:SuoLin Zhang
+Created:2025
+
+Shared test fixtures
+
+Test modules loading templates import setUpModule and tearDownModule, so the
+template disk cache and generated templates of the tests live in a temporary
+directory instead of the user's ~/.rfm2rfk, for worker processes too.
+"""
+
+import os
+import shutil
+import tempfile
+
+from pathlib import Path
+from unittest import mock
+
+from Rfm2Rfk import templates
+
+_TEMP_DIR = None
+_PATCHES = []
+
+
+def setUpModule():
+    """
+    Redirect the template disk cache and generated templates to a temporary directory
+    """
+    global _TEMP_DIR
+    _TEMP_DIR = Path(tempfile.mkdtemp())
+    cache = _TEMP_DIR/"templates.cache"
+    generated = _TEMP_DIR/"templates"
+    _PATCHES[:] = [
+        mock.patch.object(templates, "TEMPLATE_CACHE", cache),
+        mock.patch.object(templates, "GENERATED_TEMPLATE_DIR", generated),
+        mock.patch.dict(os.environ, {"RFM2RFK_TEMPLATE_CACHE": str(cache),
+                                     "RFM2RFK_GENERATED_TEMPLATES": str(generated)}),
+    ]
+    for patch in _PATCHES:
+        patch.start()
+    # entries read from the user's cache must not be written into the temporary one, nor the other way round
+    templates.clearDiskCache()
+
+
+def tearDownModule():
+    """
+    Restore the template disk cache, nothing read or compiled by the tests is written into it
+    """
+    global _TEMP_DIR
+    templates.clearDiskCache()
+    for patch in reversed(_PATCHES):
+        patch.stop()
+    del _PATCHES[:]
+    shutil.rmtree(_TEMP_DIR, ignore_errors=True)
+    _TEMP_DIR = None
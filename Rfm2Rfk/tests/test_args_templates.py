@@ -0,0 +1,137 @@
+from Rfm2Rfk import ET, args_templates, mapping, templates
+from Rfm2Rfk.snapshot import ConnectionSnapshot
+from Rfm2Rfk.templates import TemplateIndex
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+CHECKER_ARGS = Path(__file__).parent/"PxrChecker.args"
+
+BXDF_ARGS = """
+<args format="1.0">
+    <shaderType name="bxdf"/>
+    <param name="inputMaterial" label="Input Material" type="vstruct"/>
+    <page name="Diffuse" open="True">
+        <param name="diffuseGain" label="Gain" type="float" default="1.0"/>
+        <param name="diffuseColor" label="Color" type="color" default="0.18 0.18 0.18"/>
+        <page name="Advanced">
+            <param name="diffuseExponent" label="Exponent" type="float" default="1.0"/>
+        </page>
+    </page>
+    <param name="bumpNormal" label="Bump" type="normal" default="0 0 0"/>
+    <param name="utilityPattern" label="Utility Pattern" type="int" default="0" isDynamicArray="1"
+           connectable="True"/>
+    <param name="label" type="string" default=""/>
+</args>
+"""
+
+LIGHT_ARGS = '<args format="1.0"><shaderType><tag value="light"/></shaderType></args>'
+
+
+def ports(root):
+    """{port name: (color, type, tags, label, parameterIndex)} of a template."""
+    result = {}
+    for port in root.iter("port"):
+        entries = {entry.get("key"): entry.get("value") for entry in port.iter("entry")}
+        result[port.get("name")] = (port.get("color"), port.get("type"), [tag.get("name") for tag in port.iter("tag")],
+                                    entries.get("label"), entries.get("parameterIndex"))
+    return result
+
+
+class TEST_RFM2RFK_ARGS_TEMPLATES(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.args_dir = self.temp_dir/"args"
+        self.args_dir.mkdir()
+        shutil.copy(CHECKER_ARGS, self.args_dir)
+        (self.args_dir/"PxrTestSurface.args").write_text(BXDF_ARGS)
+        (self.args_dir/"PxrTestLight.args").write_text(LIGHT_ARGS)
+        self.output_dir = self.temp_dir/"generated"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_args_templates_matches_captured(self):
+        generated = args_templates.buildTemplate(args_templates.readArgs(CHECKER_ARGS))
+        captured = templates.getTemplateIndex("PxrChecker")
+        index = TemplateIndex(generated)
+
+        self.assertEqual(list(index.parameters), list(captured.parameters))
+        for name, spec in captured.parameters.items():
+            self.assertEqual(index.parameters[name].default, spec.default, name)
+            self.assertEqual(index.parameters[name].tupleSize, spec.tupleSize, name)
+        self.assertEqual(ports(generated), ports(captured.root))
+
+    def test_args_templates_bxdf(self):
+        root = args_templates.buildTemplate(args_templates.readArgs(self.write("PxrTestSurface", BXDF_ARGS)))
+        index = TemplateIndex(root)
+        generated_ports = ports(root)
+
+        self.assertEqual(list(index.ports), ["inputMaterial", "diffuseGain", "diffuseColor", "diffuseExponent",
+                                             "bumpNormal", "utilityPattern", "bxdf_out"])
+        self.assertEqual(generated_ports["bxdf_out"], ("0.2627 0.5686 0.3176", "out", ["bxdf"], None, None))
+        self.assertEqual(generated_ports["bumpNormal"][0], "0.5686 0.2980 0.1882")
+        self.assertEqual(index.parameters["diffuseColor"].default, (0.18, 0.18, 0.18))
+        self.assertEqual(index.parameters["utilityPattern"].default, (0.0,))
+        self.assertEqual(index.parameters["label"].default, "")
+        pages = {port.get("name"): port.find("metadata/entry[@key='page']") for port in root.iter("port")}
+        self.assertEqual(pages["diffuseExponent"].get("value"), "Diffuse.Advanced")
+        self.assertIsNone(pages["bumpNormal"])
+
+    def test_args_templates_generate(self):
+        result = args_templates.generateTemplates([self.args_dir], self.output_dir)
+
+        self.assertEqual(sorted(result["generated"]), ["PxrChecker", "PxrTestSurface"])
+        self.assertEqual(result["skipped"], [str(self.args_dir/"PxrTestLight.args")])
+
+        # a second pass leaves the templates and their compiled indices alone
+        mtime = (self.output_dir/"PxrChecker.xml").stat().st_mtime_ns
+        again = args_templates.generateTemplates([self.args_dir], self.output_dir)
+        self.assertEqual(again["generated"], {})
+        self.assertEqual(sorted(again["unchanged"]), ["PxrChecker", "PxrTestSurface"])
+        self.assertEqual((self.output_dir/"PxrChecker.xml").stat().st_mtime_ns, mtime)
+
+    def test_args_templates_error(self):
+        (self.args_dir/"PxrBroken.args").write_text("<args><param")
+        result = args_templates.generateTemplates([self.args_dir], self.output_dir)
+
+        self.assertIn(str(self.args_dir/"PxrBroken.args"), result["errors"])
+        self.assertIn("PxrTestSurface", result["generated"])
+
+    def test_args_templates_compiled(self):
+        with mock.patch.object(templates, "GENERATED_TEMPLATE_DIR", self.output_dir), \
+                mock.patch.object(templates, "TEMPLATE_CACHE", self.temp_dir/"templates.cache"):
+            templates.clearDiskCache()
+            try:
+                self.assertEqual(args_templates.main([str(self.args_dir)]), 0)
+
+                # a fresh maya session reads the compiled index, no template is parsed
+                templates._DISK_CACHE = None
+                with mock.patch.object(ET, "parse", wraps=ET.parse) as parses:
+                    index = templates.loadTemplate("PxrTestSurface")
+                self.assertEqual(parses.call_count, 0)
+                self.assertIn("PxrTestSurface", templates.listTemplates())
+
+                node = {"name": "surface", "type": "PxrTestSurface", "attributes": {"diffuseGain": 0.5},
+                        "connections": {}, "X": 0, "Y": 0}
+                with mock.patch.object(templates, "getTemplateIndex", return_value=index):
+                    root = mapping.iterateMapping(node, ConnectionSnapshot(["surface"], {}, {}, {})).getroot()
+                value = root.find(".//group_parameter[@name='diffuseGain']/number_parameter[@name='value']")
+                self.assertEqual(value.get("value"), "0.5")
+            finally:
+                templates.clearDiskCache()
+
+    def write(self, node_type, content):
+        path = self.args_dir/f"{node_type}.args"
+        path.write_text(content)
+        return path
+
+
+if __name__ == "__main__":
+    unittest.main()
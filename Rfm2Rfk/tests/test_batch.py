@@ -0,0 +1,120 @@
+from MayaBase.modules.nodel import Dag_Node as Dag
+
+import maya.cmds as cmds
+
+from Rfm2Rfk import batch, convert, utils, ET
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TEST_RFM2RFK_BATCH(unittest.TestCase):
+
+    def setUp(self):
+        self.endNodeName = "NWM_END"
+        self.upstreamNodeName = "NWM_UP"
+        self.shadingEngineName = "test_SG"
+
+        self.endNode = Dag(cmds.shadingNode("PxrSurface", name=self.endNodeName, asShader=True))
+        self.upstreamNode = Dag(cmds.shadingNode("PxrChecker", name=self.upstreamNodeName, asShader=True))
+        self.shadingEngine = Dag(cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name=self.shadingEngineName))
+
+        cmds.connectAttr(self.upstreamNode.a.resultRGB, self.endNode.a.diffuseColor)
+        cmds.connectAttr(self.endNode.a.outColor, self.shadingEngine.a.rman__surface)
+
+        self.output = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        if self.endNode.exists():
+            self.endNode.delete()
+
+        if self.upstreamNode.exists():
+            self.upstreamNode.delete()
+
+        if self.shadingEngine.exists():
+            self.shadingEngine.delete()
+
+        self.output.cleanup()
+
+    def test_batch_getMaterialRoots(self):
+        self.assertEqual(batch.getMaterialRoots(self.shadingEngineName), [self.endNodeName])
+
+    def test_batch_getMaterialFileName(self):
+        self.assertEqual(batch.getMaterialFileName("char:body_SG"), "char_body_SG.xml")
+
+    def test_batch_getMaterialFileNames(self):
+        file_names = batch.getMaterialFileNames(["char:body_SG", "char_body_SG", "char_body_SG_2", "Char_Body_SG"])
+        self.assertEqual(file_names, {"char:body_SG": "char_body_SG.xml", "char_body_SG": "char_body_SG_2.xml",
+                                      "char_body_SG_2": "char_body_SG_2_2.xml", "Char_Body_SG": "Char_Body_SG_3.xml"})
+
+    def test_batch_exportScene_same_file_name(self):
+        # "ns:test_SG" and "ns_test_SG" would both write ns_test_SG.xml
+        other_engine = Dag(cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name="ns_test_SG"))
+        cmds.connectAttr(self.endNode.a.outColor, other_engine.a.rman__surface)
+        cmds.namespace(add="ns")
+        cmds.rename(self.shadingEngineName, "ns:test_SG")
+        try:
+            result = batch.exportScene(self.output.name)
+        finally:
+            cmds.rename("ns:test_SG", self.shadingEngineName)
+            cmds.namespace(removeNamespace="ns")
+            other_engine.delete()
+
+        self.assertEqual(sorted(os.path.basename(path) for path in result["materials"].values()),
+                         ["ns_test_SG.xml", "ns_test_SG_2.xml"])
+
+    def test_batch_exportScene(self):
+        result = batch.exportScene(self.output.name)
+
+        path = os.path.join(self.output.name, "test_SG.xml")
+        self.assertEqual(result["materials"][self.shadingEngineName], path)
+        self.assertNotIn("initialShadingGroup", result["materials"])
+
+        exported = ET.parse(path).getroot()
+        names = [node.get("name") for node in exported.find("node")]
+        self.assertEqual(sorted(names), sorted([self.endNodeName, self.upstreamNodeName]))
+
+    def test_batch_exportMaterials_shared_nodes(self):
+        # a second material fed by the same checker
+        other_node = Dag(cmds.shadingNode("PxrSurface", name="NWM_OTHER", asShader=True))
+        other_engine = Dag(cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name="other_SG"))
+        cmds.connectAttr(self.upstreamNode.a.resultRGB, other_node.a.diffuseColor)
+        cmds.connectAttr(other_node.a.outColor, other_engine.a.rman__surface)
+        try:
+            path = os.path.join(self.output.name, "materials.xml")
+            with mock.patch.object(utils, "getNodeAttributesFromPlugs",
+                                   wraps=utils.getNodeAttributesFromPlugs) as queries:
+                exported = batch.exportMaterials([self.shadingEngineName, "other_SG"], path)
+        finally:
+            other_node.delete()
+            other_engine.delete()
+
+        self.assertEqual(exported, [self.shadingEngineName, "other_SG"])
+        self.assertEqual(queries.call_count, 3)
+        names = [node.get("name") for node in ET.parse(path).getroot().find("node")]
+        self.assertEqual(sorted(names), sorted([self.endNodeName, "NWM_OTHER", self.upstreamNodeName]))
+
+    def test_batch_exportNetwork_dump_round_trip(self):
+        # two materials fed by the same checker, converted without maya as exported with it
+        other_node = Dag(cmds.shadingNode("PxrSurface", name="NWM_OTHER", asShader=True))
+        cmds.connectAttr(self.upstreamNode.a.resultRGB, other_node.a.diffuseColor)
+        roots = [self.endNodeName, "NWM_OTHER"]
+        xml_path = os.path.join(self.output.name, "materials.xml")
+        dump_path = os.path.join(self.output.name, "materials.json")
+        try:
+            batch.exportNetwork(roots, xml_path)
+            batch.exportNetwork(roots, dump_path, dump=True)
+        finally:
+            other_node.delete()
+
+        converted_path = os.path.join(self.output.name, "converted.xml")
+        convert.convertDump(dump_path, converted_path)
+        with open(xml_path, encoding="utf-8") as exported, open(converted_path, encoding="utf-8") as converted:
+            self.assertEqual(converted.read(), exported.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
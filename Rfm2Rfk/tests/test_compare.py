@@ -0,0 +1,59 @@
+from Rfm2Rfk import compare, templates
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import unittest
+from unittest import mock
+
+
+def surface(name, **attributes):
+    return {"name": name, "type": "PxrSurface", "attributes": attributes}
+
+
+class TEST_RFM2RFK_COMPARE(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [
+            surface("default", diffuseGain=1.0, diffuseColor=[0.18, 0.18, 0.18], specularRoughness=0.2),
+            surface("tolerance", diffuseGain=1.00005, diffuseColor=[0.18, 0.18, 0.18001], specularRoughness=0.2),
+            surface("changed", diffuseGain=0.5, diffuseColor=[0.18, 0.5, 0.18], specularRoughness=0.2),
+            surface("mixed", diffuseGain=[1.0], diffuseColor=1.0, specularRoughness=float("nan")),
+            surface("other", diffuseColor=[0.18, 0.18], unknownAttribute=1.0, diffuseGain=True),
+        ]
+        self.expected = {
+            "default": {"diffuseGain": False, "diffuseColor": False, "specularRoughness": False},
+            "tolerance": {"diffuseGain": False, "diffuseColor": False, "specularRoughness": False},
+            "changed": {"diffuseGain": True, "diffuseColor": True, "specularRoughness": False},
+            "mixed": {"specularRoughness": True},
+            "other": {"diffuseGain": False},
+        }
+
+    def test_compare_default_slices(self):
+        index = templates.getTemplateIndex("PxrSurface")
+        start, stop, is_array = index.defaultSlices["diffuseColor"]
+        self.assertTrue(is_array)
+        self.assertEqual(index.defaultValues[start:stop], list(index.parameters["diffuseColor"].default))
+        start, stop, is_array = index.defaultSlices["specularRoughness"]
+        self.assertFalse(is_array)
+        self.assertEqual(index.defaultValues[start:stop], [0.2])
+
+    def test_compare_network_masks(self):
+        # the first nodes only hold numbers of the expected sizes, the others need the per value comparison
+        numeric = self.nodes[:3]
+        self.assertEqual(compare.networkMasks(numeric), {node["name"]: self.expected[node["name"]] for node in numeric})
+        self.assertEqual(compare.networkMasks(self.nodes), self.expected)
+
+    def test_compare_python_fallback(self):
+        with mock.patch.object(compare, "numpy", None):
+            compare._LAYOUTS.clear()
+            try:
+                masks = compare.networkMasks(self.nodes)
+            finally:
+                compare._LAYOUTS.clear()
+        self.assertEqual(masks, self.expected)
+
+    def test_compare_parameter_mask(self):
+        self.assertEqual(compare.parameterMask(self.nodes[2]), self.expected["changed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
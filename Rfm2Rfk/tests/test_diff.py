@@ -0,0 +1,114 @@
+from Rfm2Rfk import ET, diff
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import os
+import tempfile
+import unittest
+
+
+def node(node_type, attributes=None, connections=None):
+    return {"type": node_type, "attributes": attributes or {}, "connections": connections or {}}
+
+
+MAPPED_SURFACE = """
+<node name="PxrSurface1" type="PrmanShadingNode" x="260" y="0">
+    <port name="diffuseColor" type="in" source="PxrTexture2.resultRGB"/>
+    <port name="specularFaceColor" type="in"/>
+    <group_parameter name="PxrSurface1">
+        <string_parameter name="name" value="PxrSurface1"/>
+        <group_parameter name="parameters">
+            <group_parameter name="specularRoughness">
+                <number_parameter name="enable" value="1"/>
+                <number_parameter name="value" value="0.5"/>
+            </group_parameter>
+            <group_parameter name="diffuseGain">
+                <number_parameter name="enable" value="0"/>
+                <number_parameter name="value" value="1"/>
+            </group_parameter>
+        </group_parameter>
+    </group_parameter>
+</node>
+"""
+
+
+class TEST_RFM2RFK_DIFF(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = {
+            "PxrSurface1": node("PxrSurface", {"specularRoughness": 0.2, "diffuseColor": [0.18, 0.18, 0.18]},
+                                {"diffuseColor": "PxrTexture1.resultRGB",
+                                 "specularFaceColor": "PxrTexture1.resultRGB"}),
+            "PxrTexture1": node("PxrTexture", {"filename": "a.tex"}),
+            "PxrChecker1": node("PxrChecker"),
+        }
+        self.current = {
+            "PxrSurface1": node("PxrSurface", {"specularRoughness": 0.5, "diffuseColor": [0.18, 0.18, 0.18000001]},
+                                {"diffuseColor": "PxrTexture2.resultRGB"}),
+            "PxrTexture1": node("PxrTexture", {"filename": "a.tex"}),
+            "PxrTexture2": node("PxrTexture", {"filename": "b.tex"}),
+            "PxrChecker1": node("PxrTexture"),
+        }
+
+    def test_diff_nodes(self):
+        changes = diff.diffNodes(self.previous, self.current)
+
+        self.assertEqual(changes["added"], ["PxrTexture2", "PxrChecker1"])
+        self.assertEqual(changes["removed"], ["PxrChecker1"])
+        self.assertEqual(changes["parameters"], {"PxrSurface1": ["specularRoughness"]})
+        self.assertEqual(changes["connections"], {"PxrSurface1": {"diffuseColor": "PxrTexture2.resultRGB",
+                                                                  "specularFaceColor": None}})
+        self.assertEqual(diff.changedNodes(changes), ["PxrTexture2", "PxrChecker1", "PxrSurface1"])
+
+    def test_diff_identical(self):
+        changes = diff.diffNodes(self.current, self.current)
+        self.assertTrue(diff.isEmpty(changes))
+        self.assertEqual(diff.changedNodes(changes), [])
+
+    def test_diff_values(self):
+        self.assertFalse(diff.valuesDiffer(0.2, 0.20001))
+        self.assertTrue(diff.valuesDiffer(0.2, 0.21))
+        self.assertTrue(diff.valuesDiffer([0.0, 0.0], [0.0, 0.0, 0.0]))
+        self.assertTrue(diff.valuesDiffer(True, False))
+        self.assertTrue(diff.valuesDiffer("a.tex", "b.tex"))
+
+    def test_diff_saved_nodes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "network.json")
+            diff.saveNodes(dict(self.current, PxrTexture2=dict(self.current["PxrTexture2"], X=0, Y=0)), path)
+            loaded = diff.loadNodes(path)
+
+        self.assertEqual(loaded, self.current)
+        self.assertTrue(diff.isEmpty(diff.diffNodes(loaded, self.current)))
+
+    def test_diff_patch_xml(self):
+        changes = diff.diffNodes(self.previous, self.current)
+        mapped = {
+            "PxrSurface1": ET.fromstring(MAPPED_SURFACE),
+            "PxrTexture2": ET.Element("node", {"name": "PxrTexture2"}),
+            "PxrChecker1": ET.Element("node", {"name": "PxrChecker1"}),
+        }
+        patch = diff.buildPatchXML(changes, mapped).getroot()
+
+        self.assertEqual([(element.tag, element.get("name")) for element in patch],
+                         [("remove", "PxrChecker1"), ("add", None), ("update", "PxrSurface1")])
+        self.assertEqual([element.get("name") for element in patch[1]], ["PxrTexture2", "PxrChecker1"])
+
+        update = patch[2]
+        self.assertEqual([(element.tag, element.get("name")) for element in update],
+                         [("group_parameter", "specularRoughness"),
+                          ("port", "diffuseColor"), ("port", "specularFaceColor")])
+        self.assertEqual(update[1].get("source"), "PxrTexture2.resultRGB")
+        self.assertIsNone(update[2].get("source"))
+
+    def test_diff_patch_deterministic(self):
+        def patch():
+            mapped = {name: ET.fromstring(MAPPED_SURFACE) if name == "PxrSurface1" else ET.Element("node")
+                      for name in self.current}
+            changes = diff.diffNodes(self.previous, self.current)
+            return ET.tostring(diff.buildPatchXML(changes, mapped).getroot())
+
+        self.assertEqual(patch(), patch())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+from Rfm2Rfk import convert, dump, mapping
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+from Rfm2Rfk.tests.test_mapping import layeredStack, networkSnapshot
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+def dumpedNetwork():
+    """Layer stack with an orphaned node and a child plug connection."""
+    nodes = layeredStack(4)
+    nodes["orphan"] = {"name": "orphan", "type": "PxrTexture", "attributes": {"filename": "a.tex"},
+                       "connections": {}, "fullPath": "orphan"}
+    snapshot = networkSnapshot(nodes)
+    snapshot.outputs["orphan"] = ["defaultTextureList1"]
+    snapshot.childInputs["layer0"] = {"colorA"}
+    return nodes, snapshot
+
+
+class TEST_RFM2RFK_DUMP(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes, self.snapshot = dumpedNetwork()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "network.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSameNetwork(self, nodes, snapshot, roots):
+        self.assertEqual(roots, [])
+        self.assertEqual(list(nodes), list(self.nodes))
+        self.assertEqual(nodes, self.nodes)
+        self.assertEqual(snapshot.nodes, self.snapshot.nodes)
+        for name in self.nodes:
+            self.assertEqual(snapshot.inputConnections(name), self.snapshot.inputConnections(name))
+            self.assertEqual(snapshot.isOrphaned(name), self.snapshot.isOrphaned(name))
+            for attribute in self.nodes[name]["connections"]:
+                self.assertEqual(snapshot.sourceIsChild(name, attribute),
+                                 self.snapshot.sourceIsChild(name, attribute))
+
+    def test_dump_json_round_trip(self):
+        dump.saveNetwork(self.nodes, self.snapshot, self.path)
+        nodes, snapshot, roots = dump.loadNetwork(self.path)
+
+        self.assertSameNetwork(nodes, snapshot, roots)
+        self.assertTrue(snapshot.isOrphaned("orphan"))
+        self.assertTrue(snapshot.sourceIsChild("layer0", "colorA"))
+
+    def test_dump_msgpack_round_trip(self):
+        if dump.msgpack is None:
+            self.skipTest("msgpack is not installed")
+        path = os.path.join(self.directory.name, "network.msgpack")
+        dump.saveNetwork(self.nodes, self.snapshot, path)
+        self.assertSameNetwork(*dump.loadNetwork(path))
+
+    def test_dump_msgpack_missing(self):
+        with mock.patch.object(dump, "msgpack", None):
+            with self.assertRaises(ImportError):
+                dump.saveNetwork(self.nodes, self.snapshot, os.path.join(self.directory.name, "network.msgpack"))
+
+    def test_dump_layout_keys_left_out(self):
+        mapping.buildTree(self.nodes, self.snapshot)
+        self.assertIn("X", self.nodes["orphan"])
+        data = dump.networkToDict(self.nodes, self.snapshot)
+        self.assertNotIn("X", data["nodes"]["orphan"])
+
+    def test_dump_roots(self):
+        dump.saveNetwork(self.nodes, self.snapshot, self.path, ["layer3", "orphan"])
+        self.assertEqual(dump.loadNetwork(self.path)[2], ["layer3", "orphan"])
+
+    def test_dump_version_1(self):
+        # written before the roots were saved
+        data = dump.networkToDict(self.nodes, self.snapshot)
+        data["version"] = 1
+        del data["roots"]
+        self.assertSameNetwork(*dump.networkFromDict(data))
+
+    def test_dump_version(self):
+        dump.saveNetwork(self.nodes, self.snapshot, self.path)
+        with open(self.path, encoding="utf-8") as json_file:
+            data = json.load(json_file)
+        data["version"] = 0
+        with self.assertRaises(ValueError):
+            dump.networkFromDict(data)
+
+
+class TEST_RFM2RFK_CONVERT(unittest.TestCase):
+
+    def setUp(self):
+        # the child plug would be refused, the converted network only keeps the orphan flag
+        self.nodes, self.snapshot = dumpedNetwork()
+        self.snapshot.childInputs.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.dump_path = os.path.join(self.directory.name, "network.json")
+        dump.saveNetwork(self.nodes, self.snapshot, self.dump_path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def expectedXML(self):
+        nodes, snapshot = dumpedNetwork()
+        snapshot.childInputs.clear()
+        return "".join(mapping.iterXML(mapping.buildTree(nodes, snapshot), snapshot))
+
+    def test_convert_dump(self):
+        output = os.path.join(self.directory.name, "network.xml")
+        convert.convertDump(self.dump_path, output)
+        with open(output, encoding="utf-8") as xml_file:
+            self.assertEqual(xml_file.read(), self.expectedXML())
+
+    def test_convert_materials_layout(self):
+        # two materials sharing a texture keep one band each, as in maya
+        def materials():
+            nodes = {"shared": {"name": "shared", "type": "PxrTexture", "attributes": {}, "connections": {}}}
+            for i in range(2):
+                nodes[f"texture{i}"] = {"name": f"texture{i}", "type": "PxrTexture", "attributes": {},
+                                        "connections": {}}
+                nodes[f"surface{i}"] = {"name": f"surface{i}", "type": "PxrSurface", "attributes": {},
+                                        "connections": {"diffuseColor": f"texture{i}.resultRGB",
+                                                        "specularFaceColor": "shared.resultRGB"}}
+            return nodes
+
+        nodes = materials()
+        snapshot = networkSnapshot(nodes)
+        roots = ["surface0", "surface1"]
+        expected = "".join(mapping.iterXML(mapping.buildTree(materials(), snapshot, roots), snapshot))
+        single_band = "".join(mapping.iterXML(mapping.buildTree(materials(), snapshot), snapshot))
+        dump.saveNetwork(nodes, snapshot, self.dump_path, roots)
+
+        output = os.path.join(self.directory.name, "network.xml")
+        convert.convertDump(self.dump_path, output)
+        with open(output, encoding="utf-8") as xml_file:
+            converted = xml_file.read()
+        self.assertEqual(converted, expected)
+        self.assertNotEqual(converted, single_band)
+
+    def test_convert_child_plug_refused(self):
+        nodes, snapshot = dumpedNetwork()
+        dump.saveNetwork(nodes, snapshot, self.dump_path)
+        result = convert.convertDumps([self.dump_path], os.path.join(self.directory.name, "out"), workers=1)
+
+        self.assertEqual(result["converted"], {})
+        self.assertIn("Child Attribute", result["errors"][self.dump_path])
+
+    def test_convert_same_names(self):
+        # dumps of two scenes holding a material of the same name
+        paths = []
+        for scene in ("lib_a", "lib_b"):
+            os.makedirs(os.path.join(self.directory.name, scene))
+            paths.append(os.path.join(self.directory.name, scene, "network.json"))
+            dump.saveNetwork(self.nodes, self.snapshot, paths[-1])
+        paths.append(os.path.join(self.directory.name, "lib_a", "network.mpk"))
+        output_dir = os.path.join(self.directory.name, "out")
+        result = convert.convertDumps(paths, output_dir, workers=1)
+
+        self.assertEqual(result["converted"], {paths[0]: os.path.join(output_dir, "lib_a", "network.xml"),
+                                               paths[1]: os.path.join(output_dir, "lib_b", "network.xml")})
+        self.assertIn("already written", result["errors"][paths[2]])
+
+    def test_convert_cli_without_maya(self):
+        output_dir = os.path.join(self.directory.name, "out")
+        script = ("import sys; from Rfm2Rfk import convert; code = convert.main(sys.argv[1:]); "
+                  "assert not [name for name in sys.modules if name.split('.')[0] in ('maya', 'MayaBase')]; "
+                  "sys.exit(code)")
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        environment = dict(os.environ, PYTHONPATH=root)
+        other_path = os.path.join(self.directory.name, "other.json")
+        dump.saveNetwork(self.nodes, self.snapshot, other_path)
+        process = subprocess.run([sys.executable, "-c", script, self.dump_path, other_path, "-o", output_dir,
+                                  "-j", "2"], capture_output=True, text=True, env=environment)
+
+        self.assertEqual(process.returncode, 0, process.stderr)
+        for name in ("network.xml", "other.xml"):
+            with open(os.path.join(output_dir, name), encoding="utf-8") as xml_file:
+                self.assertEqual(xml_file.read(), self.expectedXML())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+from MayaBase.modules.nodel import Dag_Node as Dag
+
+import maya.cmds as cmds
+
+from Rfm2Rfk import m2k, mapping, utils
+from Rfm2Rfk.export_cache import ExportCache
+from Rfm2Rfk.snapshot import ConnectionSnapshot
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TEST_RFM2RFK_EXPORT_CACHE(unittest.TestCase):
+
+    def setUp(self):
+        self.endNode = Dag(cmds.shadingNode("PxrSurface", name="NWM_END", asShader=True))
+        self.upstreamNode = Dag(cmds.shadingNode("PxrChecker", name="NWM_UP", asShader=True))
+        cmds.connectAttr(self.upstreamNode.a.resultRGB, self.endNode.a.diffuseColor)
+        cmds.select(self.endNode.fullPath)
+
+        self.cache = ExportCache()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "network.xml")
+
+    def tearDown(self):
+        self.cache.clear()
+        for node in (self.endNode, self.upstreamNode):
+            if node.exists():
+                node.delete()
+        shutil.rmtree(self.directory)
+
+    def copy(self):
+        with mock.patch.object(utils, "getNodeAttributesFromPlugs",
+                               wraps=utils.getNodeAttributesFromPlugs) as queries:
+            m2k.copy(self.path, cache=self.cache)
+        with open(self.path, encoding="utf-8") as xml_file:
+            return xml_file.read(), queries.call_count
+
+    def test_export_cache_unchanged_network(self):
+        first, first_queries = self.copy()
+        second, second_queries = self.copy()
+
+        self.assertEqual(first_queries, 2)
+        self.assertEqual(second_queries, 0)
+        self.assertEqual(second, first)
+
+    def test_export_cache_attribute_changed(self):
+        self.copy()
+        self.endNode.a.specularRoughness.set(0.75)
+        xml_str, queries = self.copy()
+
+        self.assertEqual(queries, 1)
+        self.assertIn('value="0.75"', xml_str)
+
+    def test_export_cache_connection_changed(self):
+        self.copy()
+        cmds.disconnectAttr(self.upstreamNode.a.resultRGB, self.endNode.a.diffuseColor)
+        xml_str, queries = self.copy()
+
+        self.assertEqual(queries, 1)
+        self.assertNotIn("NWM_UP", xml_str)
+
+    def test_export_cache_unrelated_changes(self):
+        self.copy()
+        other = cmds.shadingNode("PxrChecker", name="NWM_OTHER", asShader=True)
+        cmds.rename(other, "NWM_OTHER_renamed")
+        cmds.delete("NWM_OTHER_renamed")
+        self.endNode.a.specularRoughness.set(0.75)
+        cmds.undo()
+        xml_str, queries = self.copy()
+
+        # only the node edited then restored is queried again
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_export_cache_deleted_node(self):
+        self.copy()
+        cmds.disconnectAttr(self.upstreamNode.a.resultRGB, self.endNode.a.diffuseColor)
+        self.upstreamNode.delete()
+        self.copy()
+
+        self.assertNotIn("NWM_UP", self.cache.nodes)
+
+    def test_export_cache_new_scene(self):
+        self.copy()
+        self.cache._sceneChanging(None)
+        self.cache.validate()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_export_cache_renamed_node(self):
+        self.copy()
+        self.upstreamNode.rename("NWM_UP_renamed")
+        xml_str, queries = self.copy()
+
+        self.assertEqual(queries, 2)
+        self.assertIn("NWM_UP_renamed", xml_str)
+
+
+def fanInNetwork(node_count):
+    """Binary fan-in of PxrChecker nodes, node i is fed by nodes 2i+1 and 2i+2."""
+    nodes = {}
+    for i in range(node_count):
+        connections = {}
+        for port, child in (("colorA", 2 * i + 1), ("colorB", 2 * i + 2)):
+            if child < node_count:
+                connections[port] = f"node{child}.resultRGB"
+        nodes[f"node{i}"] = {"name": f"node{i}", "type": "PxrChecker", "fullPath": f"node{i}",
+                             "attributes": {"dimensions": 3.0, "colorA": [0.5, 0.5, 0.5]},
+                             "connections": connections}
+    return nodes
+
+
+class TEST_RFM2RFK_EXPORT_CACHE_SCALING(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = fanInNetwork(300)
+        outputs = {name: [] for name in self.scene}
+        for name, node in self.scene.items():
+            for connection in node["connections"].values():
+                outputs[connection.split(".")[0]].append(name)
+        outputs["node0"].append("node0SG")
+        inputs = {name: dict(node["connections"]) for name, node in self.scene.items()}
+        self.snapshot = ConnectionSnapshot(list(self.scene), inputs, {}, outputs)
+
+    def generateNode(self, node, snapshot=None):
+        node_dict = dict(self.scene[node])
+        node_dict["attributes"] = dict(node_dict["attributes"])
+        return node_dict
+
+    def copyNetwork(self, cache):
+        with mock.patch.object(m2k, "generateNode", side_effect=self.generateNode) as generated, \
+                mock.patch.object(mapping, "mapFragment", wraps=mapping.mapFragment) as mapped:
+            nodes_dict = m2k.generateNodes(self.snapshot.nodes, self.snapshot, cache)
+            xml_str = "".join(m2k.iterXML(m2k.buildTree(nodes_dict, self.snapshot), self.snapshot, cache))
+        return xml_str, generated.call_count, mapped.call_count
+
+    def test_export_cache_one_edit(self):
+        # invalidation is driven by the dirty set alone
+        cache = ExportCache(callbacks=False)
+        first, first_generated, _ = self.copyNetwork(cache)
+
+        self.scene["node150"]["attributes"]["dimensions"] = 4.0
+        cache.markDirty("node150")
+        second, generated, mapped = self.copyNetwork(cache)
+        uncached = self.copyNetwork(None)[0]
+
+        self.assertEqual(generated, 1)
+        self.assertEqual(mapped, 1)
+        self.assertEqual(second, uncached)
+        self.assertNotEqual(second, first)
+        self.assertEqual(first_generated, len(self.scene))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+from Rfm2Rfk import ET, mapping
+from Rfm2Rfk.export_job import ExportJob
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+from Rfm2Rfk.tests.test_mapping import layeredStack, networkSnapshot
+
+import threading
+import unittest
+from unittest import mock
+
+
+class TEST_RFM2RFK_EXPORT_JOB(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = layeredStack(50)
+        self.snapshot = networkSnapshot(self.nodes)
+
+    def test_export_job_matches_iterXML(self):
+        expected = "".join(mapping.iterXML(mapping.buildTree(layeredStack(50), self.snapshot), self.snapshot))
+        progress = []
+        finished = []
+        job = ExportJob(self.nodes, self.snapshot, progress=lambda done, total: progress.append((done, total)),
+                        finished=finished.append)
+
+        self.assertIs(job.start(), job)
+        self.assertTrue(job.wait(10))
+
+        self.assertEqual(job.result, expected)
+        self.assertIsNone(job.error)
+        self.assertEqual(finished, [job])
+        self.assertEqual(progress[-1], (101, 101))
+        self.assertEqual([done for done, _ in progress], sorted(done for done, _ in progress))
+        self.assertLessEqual(len(progress), 101)
+        ET.fromstring(job.result)
+
+    def test_export_job_runs_off_main_thread(self):
+        threads = []
+        job = ExportJob(self.nodes, self.snapshot, finished=lambda job: threads.append(threading.current_thread()))
+        job.start().wait(10)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_export_job_cancel(self):
+        job = ExportJob(self.nodes, self.snapshot)
+        job.progress = lambda done, total: job.cancel() if done >= 10 else None
+        with mock.patch.object(mapping, "mapFragment", wraps=mapping.mapFragment) as mapped:
+            job.run()
+
+        self.assertTrue(job.cancelled)
+        self.assertTrue(job.done)
+        self.assertIsNone(job.result)
+        self.assertLess(mapped.call_count, 20)
+
+    def test_export_job_error(self):
+        self.nodes["surface"]["type"] = "PxrUnknownPattern"
+        finished = []
+        job = ExportJob(self.nodes, self.snapshot, finished=finished.append)
+        job.run()
+
+        self.assertIsInstance(job.error, KeyError)
+        self.assertIsNone(job.result)
+        self.assertEqual(finished, [job])
+
+
+if __name__ == "__main__":
+    unittest.main()
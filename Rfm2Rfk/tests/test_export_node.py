@@ -0,0 +1,94 @@
+from Rfm2Rfk import dump, mapping
+from Rfm2Rfk.export_node import ExportNode, internKeys
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+from Rfm2Rfk.tests.test_mapping import networkSnapshot
+
+import tracemalloc
+import unittest
+
+
+# attribute names of a PxrTexture, as maya hands them out: a new string per node
+TEXTURE_ATTRIBUTES = ["filename", "firstChannel", "atlasStyle", "invertT", "filter", "blur", "lerp",
+                      "missingColor", "missingAlpha", "linearize", "manifold", "mipBias", "maxResolution",
+                      "optimizeIndirect"]
+
+
+def textureNetwork(node_count, record):
+    """Chain of textures as generated from maya, records with interned names or plain dicts."""
+    nodes = {}
+    for i in range(node_count):
+        name = f"texture{i}"
+        attributes = {"".join(list(attr)): 0.5 for attr in TEXTURE_ATTRIBUTES}
+        connections = {"".join(list("manifold")): f"texture{i + 1}.resultRGB"} if i + 1 < node_count else {}
+        if record:
+            nodes[name] = ExportNode(name, "PxrTexture", internKeys(attributes), internKeys(connections),
+                                     fullPath=name)
+        else:
+            nodes[name] = {"name": name, "type": "PxrTexture", "attributes": attributes,
+                           "connections": connections, "fullPath": name}
+    return nodes
+
+
+class TEST_RFM2RFK_EXPORT_NODE(unittest.TestCase):
+
+    def setUp(self):
+        self.node = ExportNode("surface", "PxrSurface", {"specularRoughness": 0.3}, {}, fullPath="|surface")
+
+    def test_export_node_dict_access(self):
+        self.assertEqual(self.node["name"], "surface")
+        self.assertIsNone(self.node.get("X"))
+        self.assertNotIn("X", self.node)
+
+        self.node["X"] = 260
+        self.assertEqual(self.node["X"], 260)
+        self.assertEqual(list(self.node), ["name", "type", "attributes", "connections", "fullPath", "X"])
+
+        del self.node["X"]
+        with self.assertRaises(KeyError):
+            self.node["X"]
+
+    def test_export_node_unknown_key(self):
+        with self.assertRaises(KeyError):
+            self.node["color"] = 1
+        with self.assertRaises(KeyError):
+            self.node["__class__"]
+        self.assertFalse(hasattr(self.node, "__dict__"))
+
+    def test_export_node_equals_dict(self):
+        expected = {"name": "surface", "type": "PxrSurface", "attributes": {"specularRoughness": 0.3},
+                    "connections": {}, "fullPath": "|surface"}
+        self.assertEqual(self.node, expected)
+        self.assertEqual(dict(self.node), expected)
+        self.assertEqual(ExportNode.fromDict(expected), self.node)
+
+    def test_export_node_interned_names(self):
+        first = ExportNode.fromDict({"name": "a", "type": "PxrTexture", "attributes": {"".join(["bl", "ur"]): 0.0},
+                                     "connections": {}})
+        second = ExportNode.fromDict({"name": "b", "type": "PxrTexture", "attributes": {"".join(["b", "lur"]): 0.0},
+                                      "connections": {}})
+        self.assertIs(next(iter(first["attributes"])), next(iter(second["attributes"])))
+
+    def test_export_node_dump(self):
+        nodes = textureNetwork(3, record=True)
+        loaded, _, _ = dump.networkFromDict(dump.networkToDict(nodes, networkSnapshot(nodes)))
+        self.assertIsInstance(loaded["texture0"], ExportNode)
+        self.assertEqual(loaded, nodes)
+
+    def test_export_node_memory(self):
+        node_count = 10000
+        peaks = {}
+        for record in (False, True):
+            tracemalloc.start()
+            nodes = textureNetwork(node_count, record)
+            tree = mapping.buildTree(nodes, networkSnapshot(nodes))
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks[record] = current
+            self.assertEqual(len(tree["children"]), node_count)
+            del nodes, tree
+
+        self.assertLess(peaks[True], peaks[False] * 0.8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from MayaBase.modules.nodel import Dag_Node as Dag
+
+import maya.cmds as cmds
+
+from Rfm2Rfk import export_session, m2k, utils
+from Rfm2Rfk.export_cache import ExportCache
+from Rfm2Rfk.export_session import ExportSession
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TEST_RFM2RFK_EXPORT_SESSION(unittest.TestCase):
+
+    def setUp(self):
+        self.endNode = Dag(cmds.shadingNode("PxrSurface", name="NWM_END", asShader=True))
+        self.upstreamNode = Dag(cmds.shadingNode("PxrChecker", name="NWM_UP", asShader=True))
+        cmds.connectAttr(self.upstreamNode.a.resultRGB, self.endNode.a.diffuseColor)
+        cmds.select(self.endNode.fullPath)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for node in (self.endNode, self.upstreamNode):
+            if node.exists():
+                node.delete()
+        shutil.rmtree(self.directory)
+
+    def test_export_session_interns_nodes(self):
+        with ExportSession() as session:
+            self.assertIs(export_session.current(), session)
+            node = export_session.getNode(self.endNode.fullPath)
+            self.assertIs(export_session.getNode(self.endNode.fullPath), node)
+            self.assertIs(export_session.getNode(self.endNode.name), node)
+            self.assertIs(export_session.getDependencyNode(self.endNode.fullPath), node.dep)
+            self.assertEqual(len(session), 1)
+
+        self.assertIsNone(export_session.current())
+        self.assertEqual(len(session), 0)
+        self.assertIsNot(export_session.getNode(self.endNode.fullPath), node)
+
+    def test_export_session_missing_node(self):
+        with ExportSession():
+            self.assertIsNone(export_session.getNode("NWM_MISSING").dep)
+            with self.assertRaises(RuntimeError):
+                export_session.getDependencyNode("NWM_MISSING")
+
+    def test_export_session_deleted_node(self):
+        with ExportSession():
+            export_session.getNode(self.upstreamNode.fullPath)
+            self.upstreamNode.delete()
+            self.assertIsNone(export_session.getNode("NWM_UP").dep)
+
+    def test_export_session_copy_resolves_nodes_once(self):
+        path = os.path.join(self.directory, "network.xml")
+        cache = ExportCache()
+        try:
+            with mock.patch.object(export_session, "Dag", wraps=Dag) as wrapped:
+                m2k.copy(path, cache=cache)
+        finally:
+            cache.clear()
+
+        self.assertEqual(wrapped.call_count, 2)
+        with open(path, encoding="utf-8") as xml_file:
+            self.assertIn('name="NWM_END"', xml_file.read())
+
+    def test_export_session_utils(self):
+        with ExportSession():
+            self.assertFalse(utils.connectionInputIsChild(self.endNode.fullPath, "diffuseColor"))
+            self.assertEqual(utils.getNodeAttributesFromPlugs(self.endNode.fullPath),
+                             utils.getNodeAttributes(self.endNode.fullPath))
+
+
+if __name__ == "__main__":
+    unittest.main()
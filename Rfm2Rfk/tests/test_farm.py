@@ -0,0 +1,86 @@
+from Rfm2Rfk import farm
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import functools
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+# stand-in for a mayapy worker: fails on scenes named "broken", otherwise writes one material file,
+# it first waits until the given number of workers have started, workers run one by one fail
+STAND_IN_WORKER = """
+import glob, json, os, sys, time
+scene, output, workers = sys.argv[1], sys.argv[2], int(sys.argv[3])
+name = os.path.splitext(os.path.basename(scene))[0]
+open(os.path.join(output, name + ".started"), "w").close()
+deadline = time.time() + 60
+while len(glob.glob(os.path.join(output, "*.started"))) < workers:
+    if time.time() > deadline:
+        sys.exit("other workers did not start")
+    time.sleep(0.01)
+if name == "broken":
+    sys.exit("cannot open " + scene)
+path = os.path.join(output, name + "_SG.xml")
+open(path, "w").write("<katana/>")
+print("some maya output")
+print("RFM2RFK_RESULT " + json.dumps({"materials": {name + "_SG": path}, "errors": {}}))
+"""
+
+
+def standInCommand(scene, output_dir, workers=1):
+    return [sys.executable, "-c", STAND_IN_WORKER, scene, output_dir, str(workers)]
+
+
+class TEST_RFM2RFK_FARM(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.output.cleanup()
+
+    def test_farm_mayapyCommand(self):
+        command = farm.mayapyCommand("a.mb", "out", mayapy="/opt/maya/bin/mayapy")
+        self.assertEqual(command, ["/opt/maya/bin/mayapy", "-m", "Rfm2Rfk.batch", "a.mb", "-o", "out", "--json"])
+
+    def test_farm_parseResult(self):
+        self.assertEqual(farm.parseResult("noise\nRFM2RFK_RESULT {\"errors\": {}}\n"), {"errors": {}})
+        self.assertIsNone(farm.parseResult("noise"))
+
+    def test_farm_convertScenes(self):
+        scenes = ["lib/a.mb", "lib/b.mb", "lib/broken.mb", "lib/c.mb"]
+        # every worker waits for the three others
+        manifest = farm.convertScenes(scenes, self.output.name, workers=4,
+                                      command=functools.partial(standInCommand, workers=4))
+
+        self.assertEqual([record["scene"] for record in manifest["scenes"]], scenes)
+        self.assertEqual([record["status"] for record in manifest["scenes"]], ["ok", "ok", "failed", "ok"])
+        self.assertIn("cannot open", manifest["scenes"][2]["errors"]["worker"])
+        self.assertTrue(os.path.exists(manifest["scenes"][0]["materials"]["a_SG"]))
+        self.assertEqual(manifest["failed"], 1)
+
+        with open(os.path.join(self.output.name, farm.MANIFEST_NAME)) as manifest_file:
+            self.assertEqual(json.load(manifest_file)["failed"], 1)
+
+    def test_farm_sceneDirectoryName(self):
+        self.assertNotEqual(farm.sceneDirectoryName("a/lib.mb"), farm.sceneDirectoryName("b/lib.mb"))
+        self.assertEqual(farm.sceneDirectoryName("a/lib.mb"), farm.sceneDirectoryName("a/../a/lib.mb"))
+        self.assertTrue(farm.sceneDirectoryName("a/lib.mb").startswith("lib_"))
+
+    def test_farm_duplicate_scenes(self):
+        scenes = ["a/lib.mb", "b/lib.mb", "a/../a/lib.mb"]
+        manifest = farm.convertScenes(scenes, self.output.name, workers=2, command=standInCommand)
+
+        self.assertEqual([record["scene"] for record in manifest["scenes"]], ["a/lib.mb", "b/lib.mb"])
+
+        with mock.patch.object(farm, "sceneDirectoryName", return_value="lib"):
+            with self.assertRaises(ValueError):
+                farm.uniqueScenes(["a/lib.mb", "b/lib.mb"])
+
+
+if __name__ == "__main__":
+    unittest.main()
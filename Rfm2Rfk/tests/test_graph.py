@@ -0,0 +1,73 @@
+from Rfm2Rfk import graph
+
+import unittest
+
+
+def makeNode(connections):
+    return {"type": "PxrTexture", "attributes": {}, "connections": connections}
+
+
+class TEST_RFM2RFK_GRAPH(unittest.TestCase):
+
+    def setUp(self):
+        # PxrTexture feeds both the surface and the normal map, the normal map feeds the surface
+        self.nodes = {
+            "PxrTexture1": makeNode({}),
+            "PxrNormalMap1": makeNode({"inputRGB": "PxrTexture1.resultRGB"}),
+            "PxrSurface1": makeNode({"diffuseColor": "PxrTexture1.resultRGB",
+                                     "specularFaceColor": "PxrTexture1.resultRGB",
+                                     "bumpNormal": "PxrNormalMap1.resultN",
+                                     "presence": "outsideNode.resultA"}),
+        }
+
+    def test_graph_sourceNode(self):
+        self.assertEqual(graph.sourceNode("PxrTexture1.resultRGB"), "PxrTexture1")
+
+    def test_graph_buildAdjacency(self):
+        downstream, upstream = graph.buildAdjacency(self.nodes)
+        self.assertEqual(downstream["PxrTexture1"], ["PxrNormalMap1", "PxrSurface1"])
+        self.assertEqual(downstream["PxrSurface1"], [])
+        self.assertEqual(upstream["PxrSurface1"], ["PxrTexture1", "PxrNormalMap1"])
+        self.assertEqual(upstream["PxrTexture1"], [])
+
+    def test_graph_terminalNodes(self):
+        downstream = graph.buildAdjacency(self.nodes)[0]
+        self.assertEqual(graph.terminalNodes(downstream), ["PxrSurface1"])
+
+    def test_graph_longestPathLayers(self):
+        downstream, upstream = graph.buildAdjacency(self.nodes)
+        layers = graph.longestPathLayers(downstream, upstream)
+        self.assertEqual(layers, {"PxrTexture1": 0, "PxrNormalMap1": 1, "PxrSurface1": 2})
+
+    def test_graph_orderLayers(self):
+        downstream, upstream = graph.buildAdjacency(self.nodes)
+        layers = graph.orderLayers(graph.longestPathLayers(downstream, upstream), downstream)
+        self.assertEqual(layers, [["PxrTexture1"], ["PxrNormalMap1"], ["PxrSurface1"]])
+
+    def test_graph_orderLayers_crossings(self):
+        # A feeds D and B feeds C, listing C before D crosses the two edges
+        nodes = {
+            "A": makeNode({}),
+            "B": makeNode({}),
+            "C": makeNode({"input": "B.out"}),
+            "D": makeNode({"input": "A.out"}),
+        }
+        downstream, upstream = graph.buildAdjacency(nodes)
+        layers = graph.orderLayers(graph.longestPathLayers(downstream, upstream), downstream)
+        self.assertEqual(layers, [["A", "B"], ["D", "C"]])
+
+    def test_graph_materialNodes(self):
+        nodes = dict(self.nodes, PxrSurface2=makeNode({"diffuseColor": "PxrTexture1.resultRGB"}))
+        upstream = graph.buildAdjacency(nodes)[1]
+        materials = graph.materialNodes(["PxrSurface1", "PxrSurface2", "PxrSurface1", "missing"], upstream)
+        self.assertEqual(materials, {"PxrSurface1": ["PxrSurface1", "PxrTexture1", "PxrNormalMap1"],
+                                     "PxrSurface2": ["PxrSurface2", "PxrTexture1"]})
+
+    def test_graph_countCrossings(self):
+        edges = {"A": ["D"], "B": ["C"]}
+        self.assertEqual(graph._countCrossings(["A", "B"], ["C", "D"], edges), 1)
+        self.assertEqual(graph._countCrossings(["A", "B"], ["D", "C"], edges), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+from Rfm2Rfk import instrumentation, mapping
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+from Rfm2Rfk.tests.test_mapping import layeredStack, networkSnapshot
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TEST_RFM2RFK_INSTRUMENTATION(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled = instrumentation.ENABLED
+        self.nodes = layeredStack(20)
+        self.snapshot = networkSnapshot(self.nodes)
+
+    def tearDown(self):
+        instrumentation.ENABLED = self.enabled
+        instrumentation.reset()
+
+    def export(self):
+        with instrumentation.stage("tree"):
+            tree = mapping.buildTree(self.nodes, self.snapshot)
+        return "".join(mapping.iterXML(tree, self.snapshot))
+
+    def test_instrumentation_off_by_default(self):
+        with mock.patch.dict(os.environ, {"RFM2RFK_INSTRUMENTATION": ""}):
+            self.assertFalse(instrumentation.ENABLED)
+
+        instrumentation.disable()
+        instrumentation.reset()
+        self.export()
+        instrumentation.count("maya.listConnections")
+
+        report = instrumentation.report()
+        self.assertEqual(report["stages"], {})
+        self.assertEqual(report["counters"], {})
+        self.assertEqual(report["maya_calls"], 0)
+
+    def test_instrumentation_stages(self):
+        expected = self.export()
+        instrumentation.enable()
+        self.assertEqual(self.export(), expected)
+
+        report = instrumentation.report()
+        self.assertEqual(set(report["stages"]), {"tree", "map", "serialize"})
+        self.assertEqual(report["stages"]["tree"]["calls"], 1)
+        self.assertEqual(report["stages"]["serialize"]["calls"], len(self.nodes))
+        self.assertEqual(report["counters"]["nodes.mapped"], len(self.nodes))
+        self.assertGreater(report["template_lookups"]["hits"], 0)
+
+    def test_instrumentation_maya_calls(self):
+        instrumentation.enable()
+        instrumentation.count("maya.listConnections", 3)
+        instrumentation.count("maya.MPlug")
+        instrumentation.count("nodes.queried", 10)
+
+        report = instrumentation.report()
+        self.assertEqual(report["maya_calls"], 4)
+        self.assertEqual(report["counters"]["nodes.queried"], 10)
+
+    def test_instrumentation_dump_report(self):
+        instrumentation.enable()
+        self.export()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.json")
+            with self.assertLogs("clip", "INFO"):
+                text = instrumentation.dumpReport(path)
+            with open(path, encoding="utf-8") as json_file:
+                saved = json.load(json_file)
+
+        self.assertEqual(saved, json.loads(text))
+        self.assertIn("map", saved["stages"])
+
+
+if __name__ == "__main__":
+    unittest.main()
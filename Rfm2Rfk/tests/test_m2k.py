@@ -2,12 +2,14 @@ from MayaBase.modules.nodel import Dag_Node as Dag
 
 import maya.cmds as cmds
 
-from Rfm2Rfk import m2k, ET
+import Rfm2Rfk
+from Rfm2Rfk import m2k, utils, ET
+import os
+import tempfile
 import unittest
+from unittest import mock
 
-from Rfm2Rfk.m2k import buildXML
-
-_XML_CACHE = {}
+from Rfm2Rfk.tests import setUpModule, tearDownModule
 
 
 class TEST_RFM2RFK_M2K_BASE(unittest.TestCase):
@@ -24,59 +26,6 @@ class TEST_RFM2RFK_M2K_BASE(unittest.TestCase):
         cmds.connectAttr(self.upstreamNode.a.resultRGB, self.endNode.a.diffuseColor)
         cmds.connectAttr(self.endNode.a.outColor, self.shadingEngine.a.rman__surface)
 
-        test_template = """
-        <node baseType="PrmanShadingNode" name="PxrSurface" selected="true" ns_fromContext="networkMaterial" type="PrmanShadingNode">
-            <group_parameter name="PxrSurface">
-                <string_parameter name="name" value="PxrSurface"/>
-                <string_parameter name="nodeType" value="PxrSurface"/>
-                <string_parameter name="__lastValue" value="wzdrtwzyk2ycgyj54dqoqlfewy7mkpvlbdw7px5mskhduq4w6fniFalse"/>
-                <string_parameter name="__showHiddenParams" value="False"/>
-                <group_parameter name="parameters"> 
-                    <group_parameter name="diffuseColor">
-                        <number_parameter name="enable" value="0"/>
-                        <numberarray_parameter name="value" size="3" tupleSize="3">
-                          <number_parameter name="i0" value="0.18"/>
-                          <number_parameter name="i1" value="0.18"/>
-                          <number_parameter name="i2" value="0.18"/>
-                        </numberarray_parameter>
-                        <string_parameter name="type" value="FloatAttr"/>
-                    </group_parameter> 
-                    <group_parameter name="specularRoughness">
-                        <number_parameter name="enable" value="0"/>
-                        <number_parameter name="value" value="0.2"/>
-                        <string_parameter name="type" value="FloatAttr"/>
-                    </group_parameter>
-                </group_parameter>
-            </group_parameter>
-        </node>
-        """
-        test_checker = """
-        <node baseType="PrmanShadingNode" name="PxrChecker" ns_fromContext="networkMaterial" ns_viewState="2" selected="true" type="PrmanShadingNode" x="-1257.93" y="-480.358">
-            <group_parameter name="PxrChecker">
-                <string_parameter name="name" value="PxrChecker"/>
-                <string_parameter name="nodeType" value="PxrChecker"/>
-                <string_parameter name="__lastValue" value="jbuclgyjarjrbxo64bar4tasxeclhi3mqbh7jk43cvmfalneu6zqFalse"/>
-                <string_parameter name="__showHiddenParams" value="False"/>
-                <group_parameter name="parameters">
-                  <group_parameter name="colorA">
-                    <number_parameter name="enable" value="0"/>
-                    <numberarray_parameter name="value" size="3" tupleSize="3">
-                      <number_parameter name="i0" value="1"/>
-                      <number_parameter name="i1" value="1"/>
-                      <number_parameter name="i2" value="1"/>
-                    </numberarray_parameter>
-                    <string_parameter name="type" value="FloatAttr"/>
-                  </group_parameter>
-                </group_parameter>
-            </group_parameter>
-        </node>
-        """
-        # Parse directly from string
-        global _XML_CACHE
-        _XML_CACHE['PxrSurface'] = ET.ElementTree(ET.fromstring(test_template))
-        _XML_CACHE['PxrChecker'] = ET.ElementTree(ET.fromstring(test_checker))
-
-
     def tearDown(self):
         if self.endNode.exists():
             self.endNode.delete()
@@ -86,7 +35,7 @@ class TEST_RFM2RFK_M2K_BASE(unittest.TestCase):
 
         if self.shadingEngine.exists():
             self.shadingEngine.delete()
-        _XML_CACHE.clear()
+
 
 class TEST_RFM2RFK_CONVERSION(TEST_RFM2RFK_M2K_BASE):
 
@@ -94,6 +43,14 @@ class TEST_RFM2RFK_CONVERSION(TEST_RFM2RFK_M2K_BASE):
         list = m2k.getAllNodes([self.endNodeName])
         self.assertEqual(len(list), 2)
 
+    def test_getAllNodes_one_query_per_level(self):
+        with mock.patch.object(m2k.cmds, "listConnections", wraps=cmds.listConnections) as listConnections:
+            nodes = m2k.getAllNodes([self.endNodeName, self.endNodeName])
+
+        self.assertEqual(nodes, [self.endNodeName, self.upstreamNodeName])
+        # one query for the shader, one for the checker feeding it
+        self.assertEqual(listConnections.call_count, 2)
+
     def test_generateNode(self):
         dict = m2k.generateNode(self.endNode.fullPath)
         self.assertEqual(dict["name"], self.endNodeName)
@@ -124,5 +81,46 @@ class TEST_RFM2RFK_CONVERSION(TEST_RFM2RFK_M2K_BASE):
         xml_str= ET.tostring(xml_tree.getroot())
         print(f"Gnerated xml: {xml_str}")
 
+    def test_copy_workflow_snapshot(self):
+        snapshot = utils.takeConnectionSnapshot([self.endNodeName])
+        nodes_dict = {name: m2k.generateNode(name, snapshot) for name in snapshot.nodes}
+
+        # once the snapshot is taken, building the network asks maya nothing
+        with mock.patch.object(utils, "cmds") as utils_cmds, mock.patch.object(m2k, "cmds") as m2k_cmds:
+            tree = m2k.buildTree(nodes_dict, snapshot)
+            xml_tree = m2k.buildXML(tree, snapshot)
+        self.assertFalse(utils_cmds.mock_calls)
+        self.assertFalse(m2k_cmds.mock_calls)
+
+        self.assertEqual(tree["terminal_nodes"], [self.endNodeName])
+        port = xml_tree.getroot().find(f".//node[@name='{self.endNodeName}']/port[@name='diffuseColor']")
+        self.assertEqual(port.get("source"), self.upstreamNode.a.resultRGB.path)
+
+    def test_copy_patch(self):
+        cmds.select(self.endNode.fullPath)
+        with tempfile.TemporaryDirectory() as directory:
+            previous = os.path.join(directory, "network.json")
+            path = os.path.join(directory, "network.xml")
+            m2k.copy(path, previous=previous)
+            full = ET.parse(path).getroot()
+
+            self.endNode.a.specularRoughness.set(0.75)
+            m2k.copy(path, previous=previous)
+            patch = ET.parse(path).getroot()
+
+        self.assertEqual(full.tag, "katana")
+        self.assertEqual(patch.tag, "katana_patch")
+        self.assertEqual([(element.tag, element.get("name")) for element in patch], [("update", self.endNodeName)])
+
+    def test_copy_package_arguments(self):
+        cache = m2k.export_cache.ExportCache()
+        with mock.patch.object(m2k, "copy") as copy, mock.patch.object(m2k, "copyAsync") as copyAsync:
+            Rfm2Rfk.copy("network.xml", cache=cache, previous="network.json")
+            Rfm2Rfk.copyAsync(cache=cache)
+
+        copy.assert_called_once_with("network.xml", cache=cache, previous="network.json")
+        copyAsync.assert_called_once_with(cache=cache)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,402 @@
+from Rfm2Rfk import ET, compare, graph, mapping, templates
+from Rfm2Rfk import snapshot as connection_snapshot
+from Rfm2Rfk.snapshot import ConnectionSnapshot
+from Rfm2Rfk.templates import TemplateIndex
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+def networkSnapshot(nodes):
+    """Connection snapshot of node dicts, as taken from maya for a copy."""
+    inputs = {name: dict(node["connections"]) for name, node in nodes.items()}
+    outputs = {name: [] for name in nodes}
+    for name, node in nodes.items():
+        for connection in node["connections"].values():
+            outputs.setdefault(connection.split(".")[0], []).append(name)
+    return ConnectionSnapshot(list(nodes), inputs, {}, outputs)
+
+
+def executedLines(modules, function, *args):
+    """Number of lines of some modules run by a call, a measure of work that does not depend on the machine."""
+    files = {module.__file__ for module in modules}
+    count = [0]
+
+    def traceLines(frame, event, arg):
+        if event == "line":
+            count[0] += 1
+        return traceLines
+
+    def traceCalls(frame, event, arg):
+        return traceLines if frame.f_code.co_filename in files else None
+
+    sys.settrace(traceCalls)
+    try:
+        function(*args)
+    finally:
+        sys.settrace(None)
+    return count[0]
+
+
+class TEST_RFM2RFK_TEMPLATE_PARSES(unittest.TestCase):
+
+    def test_template_parses_per_copy(self):
+        # every PxrSurface attribute differs from its default, so every parameter is compared and written
+        index = templates.getTemplateIndex("PxrSurface")
+        # a template read from the disk cache is parsed once, on its first use
+        index.root
+        attributes = {}
+        for name, spec in index.parameters.items():
+            if isinstance(spec.default, tuple):
+                attributes[name] = [value + 1.0 for value in spec.default]
+            elif isinstance(spec.default, float):
+                attributes[name] = spec.default + 1.0
+
+        node_count = 10
+        nodes = [{"name": f"surface{i}", "type": "PxrSurface", "attributes": attributes,
+                  "connections": {}, "X": 0, "Y": 0} for i in range(node_count)]
+
+        original_clone = TemplateIndex.clone
+        # identical nodes would share a single clone, see TEST_RFM2RFK_FRAGMENT_CACHE
+        with mock.patch.object(ET, "fromstring", wraps=ET.fromstring) as parses, \
+                mock.patch.object(TemplateIndex, "clone", autospec=True, side_effect=original_clone) as clones, \
+                mock.patch.object(mapping, "FRAGMENT_CACHE_SIZE", 0):
+            for node in nodes:
+                mapping.iterateMapping(node)
+
+        self.assertEqual(parses.call_count, 0)
+        self.assertEqual(clones.call_count, node_count)
+
+
+def syntheticNetwork(node_count):
+    """Binary fan-in network, node i is fed by nodes 2i+1 and 2i+2, node 0 is the shader."""
+    nodes = {}
+    for i in range(node_count):
+        connections = {}
+        for port, child in (("inputA", 2 * i + 1), ("inputB", 2 * i + 2)):
+            if child < node_count:
+                connections[port] = f"node{child}.resultRGB"
+        nodes[f"node{i}"] = {"name": f"node{i}", "type": "PxrChecker", "attributes": {},
+                             "connections": connections, "fullPath": f"node{i}"}
+    return nodes
+
+
+class TEST_RFM2RFK_TREE_SCALING(unittest.TestCase):
+
+    def test_buildTree_scaling(self):
+        lines = {}
+        for node_count in [10, 100, 1000, 10000]:
+            nodes = syntheticNetwork(node_count)
+            nodes_snapshot = networkSnapshot(nodes)
+            trees = []
+            lines[node_count] = executedLines([mapping, graph, connection_snapshot],
+                                              lambda: trees.append(mapping.buildTree(nodes, nodes_snapshot)))
+
+            self.assertEqual(trees[0]["terminal_nodes"], ["node0"])
+            self.assertEqual(len(trees[0]["children"]), node_count)
+
+        # 10 nodes are dominated by fixed costs, linear growth is ~10x per step, quadratic would be ~100x
+        self.assertLess(lines[1000], lines[100] * 20)
+        self.assertLess(lines[10000], lines[1000] * 20)
+
+
+class TEST_RFM2RFK_LAYOUT(unittest.TestCase):
+
+    def test_buildTree_shared_nodes(self):
+        # 30 stacked diamonds, a tree of copies would hold 2^30 paths to the last node
+        nodes = {"node0": {"name": "node0", "type": "PxrChecker", "attributes": {}, "connections": {}}}
+        for i in range(1, 31):
+            nodes[f"left{i}"] = {"name": f"left{i}", "type": "PxrChecker", "attributes": {},
+                                 "connections": {"inputA": f"node{i - 1}.resultRGB"}}
+            nodes[f"node{i}"] = {"name": f"node{i}", "type": "PxrChecker", "attributes": {},
+                                 "connections": {"inputA": f"left{i}.resultRGB",
+                                                 "inputB": f"node{i - 1}.resultRGB"}}
+
+        tree = mapping.buildTree(nodes, networkSnapshot(nodes))
+
+        placed = {node["name"]: node for node in tree["children"]}
+        self.assertEqual(len(tree["children"]), len(nodes))
+        self.assertEqual(placed["node30"]["level"], 60)
+        self.assertEqual(placed["node30"]["X"], 60 * (mapping.KATANA_NODE_WIDTH + mapping.KATANA_SPACE_WIDTH))
+        self.assertEqual(tree["terminal_nodes"], ["node30"])
+
+    def test_buildTree_materials(self):
+        # one texture and one normal map shared by five surfaces, each surface also has its own texture
+        nodes = {
+            "sharedTexture": {"name": "sharedTexture", "type": "PxrTexture", "attributes": {}, "connections": {}},
+            "sharedNormal": {"name": "sharedNormal", "type": "PxrNormalMap", "attributes": {},
+                             "connections": {"inputRGB": "sharedTexture.resultRGB"}},
+        }
+        roots = []
+        for i in range(5):
+            nodes[f"texture{i}"] = {"name": f"texture{i}", "type": "PxrTexture", "attributes": {}, "connections": {}}
+            nodes[f"surface{i}"] = {"name": f"surface{i}", "type": "PxrSurface", "attributes": {},
+                                    "connections": {"diffuseColor": f"texture{i}.resultRGB",
+                                                    "specularFaceColor": "sharedTexture.resultRGB",
+                                                    "bumpNormal": "sharedNormal.resultN"}}
+            roots.append(f"surface{i}")
+        snapshot = networkSnapshot(nodes)
+
+        tree = mapping.buildTree(nodes, snapshot, roots + ["sharedTexture"])
+        xml_tree = mapping.buildXML(tree, snapshot)
+
+        emitted = [node.get("name") for node in xml_tree.getroot()[0]]
+        self.assertEqual(sorted(emitted), sorted(nodes))
+        self.assertEqual(list(tree["materials"]), roots)
+        for i in range(5):
+            self.assertEqual(set(tree["materials"][f"surface{i}"]),
+                             {f"surface{i}", f"texture{i}", "sharedTexture", "sharedNormal"})
+
+        # every material keeps its own band of rows, shared nodes sit in the band of the first one
+        rows = {node["name"]: node["Y"] // (mapping.KATANA_ROW_HEIGHT + mapping.KATANA_SPACE_WIDTH)
+                for node in tree["children"]}
+        self.assertEqual({rows["sharedTexture"], rows["texture0"]}, {0, 1})
+        for i in range(1, 5):
+            self.assertEqual(rows[f"surface{i}"], rows[f"texture{i}"])
+            self.assertGreater(rows[f"surface{i}"], rows[f"surface{i - 1}"])
+
+        surface = xml_tree.getroot()[0][emitted.index("surface3")]
+        sources = {port.get("name"): port.get("source") for port in surface.iter("port")}
+        self.assertEqual(sources["diffuseColor"], "texture3.resultRGB")
+        self.assertEqual(sources["bumpNormal"], "sharedNormal.resultN")
+
+    def test_buildTree_single_material(self):
+        nodes = layeredStack(6)
+        snapshot = networkSnapshot(nodes)
+        unrooted = mapping.buildTree(layeredStack(6), snapshot)
+        rooted = mapping.buildTree(nodes, snapshot, ["surface", "layer2"])
+
+        self.assertEqual(rooted["children"], unrooted["children"])
+        self.assertEqual(list(rooted["materials"]), ["surface"])
+
+
+def layeredStack(depth):
+    """Layer stack, layer i mixes texture i over layer i-1 and the last layer feeds a PxrSurface."""
+    nodes = {}
+    for i in range(depth):
+        connections = {"colorA": f"texture{i}.resultRGB"}
+        if i:
+            connections["colorB"] = f"layer{i - 1}.resultRGB"
+        nodes[f"layer{i}"] = {"name": f"layer{i}", "type": "PxrChecker", "attributes": {},
+                              "connections": connections}
+        nodes[f"texture{i}"] = {"name": f"texture{i}", "type": "PxrTexture", "attributes": {},
+                                "connections": {}}
+    nodes["surface"] = {"name": "surface", "type": "PxrSurface", "attributes": {},
+                        "connections": {"diffuseColor": f"layer{depth - 1}.resultRGB"}}
+    return nodes
+
+
+class TEST_RFM2RFK_XML_ORDER(unittest.TestCase):
+
+    def test_buildXML_layered_stack_order(self):
+        nodes = layeredStack(6)
+        snapshot = networkSnapshot(nodes)
+        xml_tree = mapping.buildXML(mapping.buildTree(nodes, snapshot), snapshot)
+
+        emitted = [(node.get("name"), node.get("x"), node.get("y")) for node in xml_tree.getroot()[0]]
+        expected = [("texture0", "0", "0"), ("texture1", "0", "160"), ("texture2", "0", "320"),
+                    ("texture3", "0", "480"), ("texture4", "0", "640"), ("texture5", "0", "800"),
+                    ("layer0", "260", "0"), ("layer1", "520", "0"), ("layer2", "780", "0"),
+                    ("layer3", "1040", "0"), ("layer4", "1300", "0"), ("layer5", "1560", "0"),
+                    ("surface", "1820", "0")]
+        self.assertEqual(emitted, expected)
+
+    def test_iterXML_matches_buildXML(self):
+        nodes = layeredStack(4)
+        snapshot = networkSnapshot(nodes)
+        tree = mapping.buildTree(nodes, snapshot)
+        xml_str = ET.tostring(mapping.buildXML(tree, snapshot).getroot(), encoding='unicode')
+        chunks = list(mapping.iterXML(tree, snapshot))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "network.xml")
+            mapping.writeXML(tree, path, snapshot)
+            with open(path, encoding="utf-8") as xml_file:
+                file_str = xml_file.read()
+
+        # one chunk per node plus the enclosing group
+        self.assertEqual(len(chunks), 4 * 2 + 1 + 2)
+        self.assertEqual("".join(chunks), xml_str)
+        self.assertEqual(file_str, xml_str)
+
+
+class TEST_RFM2RFK_DEFAULT_COMPARISON(unittest.TestCase):
+
+    def test_networkMasks_matches_compareParameter(self):
+        nodes = layeredStack(3)
+        nodes["surface"]["attributes"] = {"diffuseColor": [0.18, 0.5, 0.18], "diffuseGain": 1.00001,
+                                          "specularRoughness": 0.5, "diffuseExponent": [1.0]}
+        masks = compare.networkMasks(list(nodes.values()))
+
+        for name, node in nodes.items():
+            for attr, differ in masks[name].items():
+                self.assertEqual(differ, mapping.compareParameter(attr, node) is not None)
+        self.assertEqual(masks["surface"], {"diffuseColor": True, "diffuseGain": False, "specularRoughness": True})
+
+    @unittest.skipIf(compare.numpy is None, "NumPy is not available")
+    def test_networkMasks_benchmark(self):
+        # every numeric PxrSurface parameter, a quarter of the colors edited
+        index = templates.getTemplateIndex("PxrSurface")
+        nodes = []
+        for i in range(1000):
+            attributes = {}
+            for name, spec in index.parameters.items():
+                if isinstance(spec.default, tuple):
+                    attributes[name] = [value + (i % 4 == 0) for value in spec.default]
+                elif isinstance(spec.default, float):
+                    attributes[name] = spec.default
+            nodes.append({"name": f"surface{i}", "type": "PxrSurface", "attributes": attributes})
+
+        with mock.patch.object(mapping, "compareParameter", wraps=mapping.compareParameter) as compared:
+            per_attribute = {node["name"]: {attr: mapping.compareParameter(attr, node) is not None
+                                            for attr in node["attributes"]} for node in nodes}
+        self.assertEqual(compared.call_count, len(nodes) * len(nodes[0]["attributes"]))
+
+        with mock.patch.object(mapping, "compareParameter", wraps=mapping.compareParameter) as compared, \
+                mock.patch.object(compare._Columns, "differs", autospec=True,
+                                  side_effect=compare._Columns.differs) as differs, \
+                mock.patch.object(compare, "_compareNumpy", wraps=compare._compareNumpy) as batches:
+            masks = compare.networkMasks(nodes)
+
+        self.assertEqual(masks, per_attribute)
+        # no value compared one by one, one NumPy operation per column group whatever the number of nodes
+        self.assertEqual(compared.call_count, 0)
+        self.assertEqual(differs.call_count, 0)
+        self.assertEqual(batches.call_count, len(compare._layout(index, tuple(nodes[0]["attributes"]))))
+
+
+class TEST_RFM2RFK_PATCH(unittest.TestCase):
+
+    def test_buildPatch_layered_stack(self):
+        previous = layeredStack(4)
+        current = layeredStack(4)
+        current["surface"]["attributes"] = {"specularRoughness": 0.75}
+        current["layer3"]["connections"]["colorA"] = "texture4.resultRGB"
+        current["texture4"] = {"name": "texture4", "type": "PxrTexture", "attributes": {}, "connections": {}}
+        del current["texture3"]
+
+        snapshot = networkSnapshot(current)
+        with mock.patch.object(mapping, "iterateMapping", wraps=mapping.iterateMapping) as mapped:
+            patch = mapping.buildPatch(mapping.buildTree(current, snapshot), previous, snapshot).getroot()
+
+        self.assertEqual(mapped.call_count, 3)
+        self.assertEqual([(element.tag, element.get("name")) for element in patch],
+                         [("remove", "texture3"), ("add", None), ("update", "layer3"), ("update", "surface")])
+        self.assertEqual(patch[1][0].get("name"), "texture4")
+        self.assertEqual(patch[2][0].get("source"), "texture4.resultRGB")
+        value = patch[3].find("group_parameter[@name='specularRoughness']/number_parameter[@name='value']")
+        self.assertEqual(value.get("value"), "0.75")
+
+
+def textureLibrary(material_count):
+    """Materials made of a texture, a normal map and a surface, every tenth material uses a different roughness."""
+    nodes = {}
+    for i in range(material_count):
+        nodes[f"texture{i}"] = {"name": f"texture{i}", "type": "PxrTexture", "attributes": {"filename": "a.tex"},
+                                "connections": {}}
+        nodes[f"normal{i}"] = {"name": f"normal{i}", "type": "PxrNormalMap", "attributes": {},
+                               "connections": {"inputRGB": f"texture{i}.resultRGB"}}
+        nodes[f"surface{i}"] = {"name": f"surface{i}", "type": "PxrSurface",
+                                "attributes": {"specularRoughness": 0.1 * (i % 10), "diffuseColor": [0.5, 0.5, 0.5]},
+                                "connections": {"diffuseColor": f"texture{i}.resultRGB",
+                                                "bumpNormal": f"normal{i}.resultN"}}
+    return nodes
+
+
+class TEST_RFM2RFK_FRAGMENT_CACHE(unittest.TestCase):
+
+    def setUp(self):
+        mapping.clearFragmentCache()
+
+    def tearDown(self):
+        mapping.clearFragmentCache()
+
+    def export(self, nodes):
+        snapshot = networkSnapshot(nodes)
+        return "".join(mapping.iterXML(mapping.buildTree(nodes, snapshot), snapshot))
+
+    def test_fragment_cache_same_document(self):
+        with mock.patch.object(mapping, "FRAGMENT_CACHE_SIZE", 0):
+            expected = self.export(textureLibrary(30))
+
+        original_clone = TemplateIndex.clone
+        with mock.patch.object(TemplateIndex, "clone", autospec=True, side_effect=original_clone) as clones:
+            self.assertEqual(self.export(textureLibrary(30)), expected)
+            self.assertEqual(self.export(textureLibrary(30)), expected)
+
+        # one texture, one normal map and ten surfaces
+        self.assertEqual(clones.call_count, 12)
+
+    def test_fragment_cache_shared_elements_untouched(self):
+        nodes = textureLibrary(2)
+        for node in nodes.values():
+            node.update({"X": 0, "Y": 0})
+        snapshot = networkSnapshot(nodes)
+        first = mapping.iterateMapping(nodes["normal0"], snapshot).getroot()
+        second = mapping.iterateMapping(nodes["normal1"], snapshot).getroot()
+
+        self.assertEqual(first.get("name"), "normal0")
+        self.assertEqual(second.get("name"), "normal1")
+        self.assertEqual(first.find(".//port[@source]").get("source"), "texture0.resultRGB")
+        self.assertEqual(second.find(".//port[@source]").get("source"), "texture1.resultRGB")
+
+    def test_fragment_cache_independent_tree(self):
+        nodes = textureLibrary(2)
+        for node in nodes.values():
+            node.update({"X": 0, "Y": 0})
+        snapshot = networkSnapshot(nodes)
+        first = mapping.iterateMapping(nodes["surface0"], snapshot).getroot()
+        expected = ET.tostring(mapping.iterateMapping(nodes["surface0"], snapshot).getroot(), encoding="unicode")
+
+        for element in first.iter():
+            element.set("edited", "1")
+            element.text = "edited"
+        first[0].clear()
+
+        self.assertEqual(ET.tostring(mapping.iterateMapping(nodes["surface0"], snapshot).getroot(),
+                                     encoding="unicode"), expected)
+
+    def test_fragment_cache_serialized_text(self):
+        nodes = textureLibrary(3)
+        nodes["texture1"]["name"] = 'tex<&>"\t\n\r'
+        nodes["normal1"]["connections"]["inputRGB"] = 'tex<&>"\t\n\r.resultRGB'
+        snapshot = networkSnapshot(nodes)
+        tree = mapping.buildTree(nodes, snapshot)
+        expected = [ET.tostring(element, encoding="unicode") for element in mapping.buildXML(tree, snapshot).getroot()[0]]
+
+        # filled from the shared serialized text
+        self.assertEqual(list(mapping.iterXML(tree, snapshot))[1:-1], expected)
+
+    def test_fragment_cache_lru(self):
+        nodes = textureLibrary(3)
+        for node in nodes.values():
+            node.update({"X": 0, "Y": 0})
+        snapshot = networkSnapshot(nodes)
+        with mock.patch.object(mapping, "FRAGMENT_CACHE_SIZE", 2):
+            for name in ("surface0", "surface1", "surface0", "surface2"):
+                mapping.iterateMapping(nodes[name], snapshot)
+
+            # surface1 was used least recently, the default roughness(0.2) of surface2 is not part of its key
+            kept = {dict(key[1]).get("specularRoughness") for key in mapping._FRAGMENTS}
+        self.assertEqual(kept, {0.0, None})
+
+    def test_fragment_cache_library_serializations(self):
+        nodes = textureLibrary(300)
+        with mock.patch.object(mapping, "FRAGMENT_CACHE_SIZE", 0), \
+                mock.patch.object(ET, "tostring", wraps=ET.tostring) as uncached:
+            expected = self.export(nodes)
+
+        with mock.patch.object(ET, "tostring", wraps=ET.tostring) as cached:
+            self.assertEqual(self.export(textureLibrary(300)), expected)
+
+        # every node serialized, against one texture, one normal map and ten surfaces
+        self.assertGreaterEqual(uncached.call_count, len(nodes))
+        self.assertEqual(cached.call_count, 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+from Rfm2Rfk.snapshot import ConnectionSnapshot
+
+import unittest
+
+
+class TEST_RFM2RFK_SNAPSHOT(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = ConnectionSnapshot(
+            nodes=["PxrSurface1", "PxrTexture1", "PxrTexture2"],
+            inputs={
+                "PxrSurface1": {"diffuseColor": "PxrTexture1.resultRGB", "presence": "PxrTexture1.resultRGBR"},
+                "PxrTexture1": {},
+                "PxrTexture2": {},
+            },
+            childInputs={"PxrSurface1": {"presence"}},
+            outputs={
+                "PxrSurface1": ["PxrSurface1SG", "defaultShaderList1"],
+                "PxrTexture1": ["PxrSurface1", "PxrSurface1"],
+                "PxrTexture2": ["defaultTextureList1"],
+            },
+        )
+
+    def test_snapshot_inputConnections(self):
+        connections = self.snapshot.inputConnections("PxrSurface1")
+        self.assertEqual(connections["diffuseColor"], "PxrTexture1.resultRGB")
+        connections.clear()
+        self.assertEqual(len(self.snapshot.inputConnections("PxrSurface1")), 2)
+        self.assertEqual(self.snapshot.inputConnections("missing"), {})
+
+    def test_snapshot_sourceIsChild(self):
+        self.assertTrue(self.snapshot.sourceIsChild("PxrSurface1", "presence"))
+        self.assertFalse(self.snapshot.sourceIsChild("PxrSurface1", "diffuseColor"))
+
+    def test_snapshot_downstreamNodes(self):
+        self.assertEqual(self.snapshot.downstreamNodes("PxrTexture1"), {"PxrSurface1"})
+
+    def test_snapshot_isOrphaned(self):
+        self.assertTrue(self.snapshot.isOrphaned("PxrTexture2"))
+        self.assertFalse(self.snapshot.isOrphaned("PxrTexture1"))
+        self.assertFalse(self.snapshot.isOrphaned("PxrSurface1"))
+
+if __name__ == "__main__":
+    unittest.main()
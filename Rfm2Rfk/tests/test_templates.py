@@ -0,0 +1,245 @@
+from Rfm2Rfk import ET, templates
+from Rfm2Rfk.templates import TemplateIndex
+from Rfm2Rfk.tests import setUpModule, tearDownModule
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+TEST_TEMPLATE = """
+<node baseType="PrmanShadingNode" name="PxrSurface" selected="true" ns_fromContext="networkMaterial" type="PrmanShadingNode">
+    <port color="0.2627 0.5686 0.3176" name="diffuseColor" type="in"/>
+    <port color="0.2627 0.5686 0.3176" name="outColor" type="out"/>
+    <group_parameter name="PxrSurface">
+        <string_parameter name="name" value="PxrSurface"/>
+        <string_parameter name="nodeType" value="PxrSurface"/>
+        <group_parameter name="parameters">
+            <group_parameter name="diffuseColor">
+                <number_parameter name="enable" value="0"/>
+                <numberarray_parameter name="value" size="3" tupleSize="3">
+                  <number_parameter name="i0" value="0.18"/>
+                  <number_parameter name="i1" value="0.18"/>
+                  <number_parameter name="i2" value="0.18"/>
+                </numberarray_parameter>
+                <string_parameter name="type" value="FloatAttr"/>
+            </group_parameter>
+            <group_parameter name="specularRoughness">
+                <number_parameter name="enable" value="0"/>
+                <number_parameter name="value" value="0.2"/>
+                <string_parameter name="type" value="FloatAttr"/>
+            </group_parameter>
+            <group_parameter name="__unused"/>
+        </group_parameter>
+    </group_parameter>
+</node>
+"""
+
+
+class TEST_RFM2RFK_TEMPLATES(unittest.TestCase):
+
+    def setUp(self):
+        self.root = ET.fromstring(TEST_TEMPLATE)
+        self.index = TemplateIndex(ET.ElementTree(self.root))
+
+    def test_templates_parameters(self):
+        self.assertEqual(self.index.nodeType, "PxrSurface")
+        self.assertEqual(set(self.index.parameters), {"diffuseColor", "specularRoughness"})
+        self.assertEqual(self.index.parameters["diffuseColor"].default, (0.18, 0.18, 0.18))
+        self.assertEqual(self.index.parameters["diffuseColor"].tupleSize, 3)
+        self.assertEqual(self.index.parameters["specularRoughness"].default, 0.2)
+        self.assertEqual(self.index.parameters["specularRoughness"].tupleSize, 0)
+
+    def test_templates_element_paths(self):
+        spec = self.index.parameters["specularRoughness"]
+        self.assertEqual(self.index.element(self.root, spec.valuePath).get("value"), "0.2")
+        self.assertEqual(self.index.element(self.root, spec.enablePath).get("name"), "enable")
+        self.assertEqual(self.index.element(self.root, self.index.namePath).get("value"), "PxrSurface")
+        self.assertEqual(self.index.element(self.root, self.index.ports["outColor"]).get("type"), "out")
+
+    def test_templates_missing_group(self):
+        with self.assertRaises(ValueError):
+            TemplateIndex(ET.fromstring('<node name="PxrSurface"><group_parameter name="Other"/></node>'))
+
+
+class TEST_RFM2RFK_TEMPLATE_LOADING(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_patch = mock.patch.object(templates, "TEMPLATE_CACHE", Path(self.temp_dir)/"templates.cache")
+        self.cache_patch.start()
+        templates.clearDiskCache()
+        templates.getTemplateIndex.cache_clear()
+
+    def tearDown(self):
+        templates.getTemplateIndex.cache_clear()
+        templates.clearDiskCache()
+        self.cache_patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_templates_listTemplates(self):
+        self.assertIn("PxrSurface", templates.listTemplates())
+
+    def test_templates_loaded_on_first_use(self):
+        with mock.patch.object(ET, "parse", wraps=ET.parse) as parse:
+            index = templates.getTemplateIndex("PxrTexture")
+            self.assertIs(templates.getTemplateIndex("PxrTexture"), index)
+
+        self.assertEqual(index.nodeType, "PxrTexture")
+        self.assertEqual(parse.call_count, 1)
+
+    def test_templates_unknown_type(self):
+        with self.assertRaises(KeyError):
+            templates.getTemplateIndex("PxrUnknownPattern")
+
+    def test_templates_setCacheSize(self):
+        size = templates.TEMPLATE_CACHE_SIZE
+        try:
+            templates.setCacheSize(1)
+            self.assertEqual(templates.getTemplateIndex.cache_info().maxsize, 1)
+            texture = templates.getTemplateIndex("PxrTexture")
+            templates.getTemplateIndex("PxrSurface")
+            self.assertIsNot(templates.getTemplateIndex("PxrTexture"), texture)
+        finally:
+            templates.setCacheSize(size)
+        self.assertEqual(templates.getTemplateIndex.cache_info().maxsize, size)
+
+
+class TEST_RFM2RFK_TEMPLATE_DISK_CACHE(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.template_dir = self.temp_dir/"node"
+        shutil.copytree(templates.TEMPLATE_DIR, self.template_dir)
+        self.patches = [
+            mock.patch.object(templates, "TEMPLATE_DIR", self.template_dir),
+            mock.patch.object(templates, "TEMPLATE_CACHE", self.temp_dir/"templates.cache"),
+            mock.patch.object(templates, "GENERATED_TEMPLATE_DIR", self.temp_dir/"generated"),
+        ]
+        for patch in self.patches:
+            patch.start()
+        templates.clearDiskCache()
+
+    def tearDown(self):
+        templates.clearDiskCache()
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def newSession(self):
+        # the previous session writes its cache when it ends, the new one forgets everything read so far
+        templates.flushDiskCache()
+        templates._DISK_CACHE = None
+
+    def test_disk_cache_hit_skips_parsing(self):
+        parsed = templates.loadTemplate("PxrSurface")
+        self.newSession()
+
+        with mock.patch.object(ET, "parse", wraps=ET.parse) as parse:
+            cached = templates.loadTemplate("PxrSurface")
+
+        self.assertEqual(parse.call_count, 0)
+        self.assertIsNot(cached, parsed)
+        self.assertEqual({name: spec.default for name, spec in cached.parameters.items()},
+                         {name: spec.default for name, spec in parsed.parameters.items()})
+        self.assertEqual(cached.ports, parsed.ports)
+        self.assertEqual(ET.tostring(cached.clone()), ET.tostring(parsed.clone()))
+
+    def test_disk_cache_rebuilt_on_change(self):
+        templates.loadTemplate("PxrSurface")
+        file = self.template_dir/"PxrSurface.xml"
+        gain = '<group_parameter name="diffuseGain">\n        <number_parameter name="enable" value="0"/>\n        <number_parameter name="value" value="'
+        file.write_text(file.read_text().replace(gain + '1"', gain + '0.5"'))
+        self.newSession()
+
+        with mock.patch.object(ET, "parse", wraps=ET.parse) as parse:
+            templates.loadTemplate("PxrSurface")
+            self.newSession()
+            index = templates.loadTemplate("PxrSurface")
+
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(index.parameters["diffuseGain"].default, 0.5)
+
+    def test_disk_cache_touched_template_not_parsed(self):
+        templates.loadTemplate("PxrSurface")
+        file = self.template_dir/"PxrSurface.xml"
+        stat = file.stat()
+        os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.newSession()
+
+        with mock.patch.object(ET, "parse", wraps=ET.parse) as parse:
+            templates.loadTemplate("PxrSurface")
+
+        self.assertEqual(parse.call_count, 0)
+
+    def test_disk_cache_written_once(self):
+        with mock.patch.object(templates.json, "dump", wraps=templates.json.dump) as writes:
+            for node_type in templates.listTemplates():
+                templates.loadTemplate(node_type)
+            self.assertFalse(self.temp_dir.joinpath("templates.cache").exists())
+            templates.flushDiskCache()
+            templates.flushDiskCache()
+
+        self.assertEqual(writes.call_count, 1)
+
+    def test_disk_cache_not_written_at_exit(self):
+        # a process only loading templates (e.g. the offline converter) leaves the cache file alone
+        cache = self.temp_dir/"other.cache"
+        environment = dict(os.environ, RFM2RFK_TEMPLATE_CACHE=str(cache),
+                           PYTHONPATH=os.pathsep.join(filter(None, [str(Path(templates.__file__).parents[1]),
+                                                                    os.environ.get("PYTHONPATH")])))
+        process = subprocess.run([sys.executable, "-c",
+                                  "from Rfm2Rfk import templates; templates.loadTemplate('PxrSurface')"],
+                                 env=environment, capture_output=True, text=True)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertFalse(cache.exists())
+
+    def test_disk_cache_holds_no_index(self):
+        templates.loadTemplate("PxrSurface")
+        self.newSession()
+        templates.loadTemplate("PxrSurface")
+
+        # indices are only referenced by their callers and the bounded getTemplateIndex cache
+        for entry in templates._DISK_CACHE.values():
+            self.assertIsInstance(entry[3], str)
+
+    def test_disk_cache_outdated_version(self):
+        templates.loadTemplate("PxrSurface")
+        self.newSession()
+
+        with mock.patch.object(templates, "TEMPLATE_CACHE_VERSION", -1):
+            with mock.patch.object(ET, "parse", wraps=ET.parse) as parse:
+                templates.loadTemplate("PxrSurface")
+
+        self.assertEqual(parse.call_count, 1)
+
+    def test_disk_cache_startup(self):
+        node_types = templates.listTemplates()
+
+        def startup():
+            self.newSession()
+            with mock.patch.object(ET, "parse", wraps=ET.parse) as parse:
+                indices = [templates.loadTemplate(node_type) for node_type in node_types]
+            return indices, parse.call_count
+
+        with mock.patch.object(templates, "TEMPLATE_CACHE", None):
+            self.assertEqual(startup()[1], len(node_types))
+        startup()
+        indices, parses = startup()
+        self.assertEqual(parses, 0)
+
+        # the tree of a cached template is still parsed, once, when the first node of its type is copied
+        with mock.patch.object(ET, "fromstring", wraps=ET.fromstring) as fromstring:
+            for index in indices:
+                index.clone()
+                index.clone()
+        self.assertEqual(fromstring.call_count, len(node_types))
+
+
+if __name__ == "__main__":
+    unittest.main()
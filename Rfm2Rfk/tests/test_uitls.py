@@ -1,10 +1,13 @@
 from MayaBase.modules.nodel import Dag_Node as Dag
 
+from MayaBase.modules.nodel.base import attribute_base, dep_node
+
 from Rfm2Rfk import utils
 
 import maya.cmds as cmds
 
 import unittest
+from unittest import mock
 
 
 class TEST_RFM2RFK_UTILS_BASE(unittest.TestCase):
@@ -41,6 +44,23 @@ class TEST_RFM2RFK_UTILS(TEST_RFM2RFK_UTILS_BASE):
         self.assertIn('specularRoughness', end_attrs_dict)
         self.assertIsInstance(end_attrs_dict['specularFaceColor'], list)
 
+    def test_m2k_utils_getNodeAttributesFromPlugs(self):
+        end_attrs_dict = utils.getNodeAttributesFromPlugs(self.endNode.fullPath)
+        self.assertEqual(end_attrs_dict, utils.getNodeAttributes(self.endNode.fullPath))
+
+    def test_m2k_utils_getNodeAttributes_command_count(self):
+        counts = {}
+        for reader in [utils.getNodeAttributes, utils.getNodeAttributesFromPlugs]:
+            counting_cmds = mock.MagicMock(wraps=cmds)
+            with mock.patch.object(utils, "cmds", counting_cmds), \
+                    mock.patch.object(attribute_base, "cmds", counting_cmds), \
+                    mock.patch.object(dep_node, "cmds", counting_cmds):
+                reader(self.endNode.fullPath)
+            counts[reader.__name__] = len(counting_cmds.mock_calls)
+
+        self.assertEqual(counts["getNodeAttributesFromPlugs"], 0)
+        self.assertGreater(counts["getNodeAttributes"], counts["getNodeAttributesFromPlugs"])
+
     def test_m2k_utils_getInputConnctions(self):
         connections = utils.getInputConnctions(self.endNode)
 
@@ -57,6 +77,15 @@ class TEST_RFM2RFK_UTILS(TEST_RFM2RFK_UTILS_BASE):
         self.assertTrue(utils.checkIfParent(self.endNode.fullPath))
         self.assertFalse(utils.checkIfParent(self.upstreamNode.fullPath))
 
+    def test_m2k_utils_takeConnectionSnapshot(self):
+        snapshot = utils.takeConnectionSnapshot([self.endNodeName])
+
+        self.assertEqual(snapshot.nodes, [self.endNodeName, self.upstreamNodeName])
+        self.assertEqual(snapshot.inputConnections(self.endNodeName), utils.getInputConnctions(self.endNodeName))
+        self.assertFalse(snapshot.sourceIsChild(self.endNodeName, "diffuseColor"))
+        self.assertIn(self.shadingEngineName, snapshot.downstreamNodes(self.endNodeName))
+        self.assertFalse(snapshot.isOrphaned(self.endNodeName))
+
     def test_m2k_utils_checkOrphaned(self):
         cmds.shadingNode("PxrTexture", name='test_texture', asShader=True)
         self.assertTrue(utils.checkOrphaned("test_texture"))
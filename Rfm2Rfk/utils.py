@@ -8,10 +8,25 @@ Common Utility functions needed for tool
 import logging
 
 import maya.cmds as cmds
-from MayaBase.modules.nodel import Dag_Node as Dag
+import maya.OpenMaya as om
+from Rfm2Rfk import export_session, instrumentation
+from Rfm2Rfk.export_node import internName
+from Rfm2Rfk.snapshot import ConnectionSnapshot
 
 log = logging.getLogger("clip")
 
+# shadingEngine inputs holding the surface and displacement networks
+SHADING_ENGINE_INPUTS = ["rman__surface", "surfaceShader", "rman__displacement", "displacementShader"]
+
+# maya attribute types (as returned by getAttr -type) for each numeric unit type
+_NUMERIC_TYPES = {
+    om.MFnNumericData.kFloat : "float",
+    om.MFnNumericData.kDouble : "double",
+    om.MFnNumericData.kBoolean : "bool",
+    om.MFnNumericData.k3Float : "float3",
+    om.MFnNumericData.k3Double : "double3",
+}
+
 
 def getNodeAttributes(node):
     """
@@ -37,28 +52,34 @@ def getNodeAttributes(node):
     """
 
     attributes_list = cmds.listAttr(node, visible=True, settable=True) or []
-    exported_node = Dag(node)
+    exported_node = export_session.getNode(node)
+    exported_attrs = exported_node.a
     attr_dict = {}
     for attr in attributes_list:
-        if attr.startswith('__') or exported_node.a[attr].isChild:
+        if attr.startswith('__'):
             continue
 
-        type = exported_node.a[attr].get(type=True)
+        # one Attribute per attr, node existence is checked once by exported_node.a above
+        attribute = exported_attrs[attr]
+        if attribute.isChild:
+            continue
+
+        type = attribute.get(type=True)
 
         try:
             if type in ["float", "double", "int"]:
-                val = exported_node.a[attr].get()
+                val = attribute.get()
             elif type == "bool":
-                val = int(exported_node.a[attr].get())
+                val = int(attribute.get())
             elif type in ["float3", "double3"]:
-                val = list(exported_node.a[attr].get()[0])
+                val = list(attribute.get()[0])
             elif type == "enum":
-                val = int(exported_node.a[attr].get())
+                val = int(attribute.get())
             elif type == "string":
-                val = exported_node.a[attr].get()
+                val = attribute.get()
             else:
                 continue
-            attr_dict[attr] = val
+            attr_dict[internName(attr)] = val
 
         except RuntimeError:
             continue
@@ -69,6 +90,71 @@ def getNodeAttributes(node):
 
 
 
+def getNodeAttributesFromPlugs(node):
+    """
+    Retrieves all exportable attributes from a Maya node in a single pass over its plugs.
+
+    Same result as getNodeAttributes, but reads the values through the node's
+    MFnDependencyNode instead of issuing listAttr/attributeQuery/getAttr commands
+    for every attribute.
+
+    Args:
+        node (str): maya individual node fullpath
+
+    Returns:
+        dict: dict contains node's all needed attributes and their values
+
+    Examples:
+        >>> dict = getNodeAttributesFromPlugs('PxrSurface1')
+        >>> print(dict)
+        {
+        "diffuseColor" : [0, 0, 0],
+        "specularRoughness": 0.3,
+        ...
+        }
+    """
+
+    dep = export_session.getDependencyNode(node)
+    attr_dict = {}
+    for i in range(dep.attributeCount()):
+        attr_obj = dep.attribute(i)
+        fn_attr = om.MFnAttribute(attr_obj)
+        attr = fn_attr.name()
+
+        # same filter as listAttr(visible=True, settable=True)
+        if attr.startswith('__') or fn_attr.isHidden() or not fn_attr.isWritable():
+            continue
+
+        plug = dep.findPlug(attr_obj, False)
+        if plug.isChild() or plug.isArray():
+            continue
+
+        try:
+            if attr_obj.hasFn(om.MFn.kNumericAttribute):
+                type = _NUMERIC_TYPES.get(om.MFnNumericAttribute(attr_obj).unitType())
+                if type in ["float", "double"]:
+                    val = plug.asDouble()
+                elif type == "bool":
+                    val = int(plug.asBool())
+                elif type in ["float3", "double3"]:
+                    val = [plug.child(index).asDouble() for index in range(plug.numChildren())]
+                else:
+                    continue
+            elif attr_obj.hasFn(om.MFn.kEnumAttribute):
+                val = plug.asInt()
+            elif attr_obj.hasFn(om.MFn.kTypedAttribute) and \
+                    om.MFnTypedAttribute(attr_obj).attrType() == om.MFnData.kString:
+                val = plug.asString()
+            else:
+                continue
+            attr_dict[internName(attr)] = val
+
+        except RuntimeError:
+            continue
+
+    return attr_dict
+
+
 def getInputConnctions(node):
     """
     Retrieves all input connections for a Maya node.
@@ -88,12 +174,13 @@ def getInputConnctions(node):
     connections = {}
 
     node_connections = cmds.listConnections(node, source=True, destination=False, connections=True, plugs=True) or []
+    instrumentation.count("maya.listConnections")
     if node_connections:
         for i in range(len(node_connections) // 2):
             dest_attr = node_connections[i * 2]
             dest_attr = dest_attr[dest_attr.find(".") + 1 :]
             src_fullPath = node_connections[i * 2 + 1]
-            connections[dest_attr] = src_fullPath
+            connections[internName(dest_attr)] = src_fullPath
 
     return connections
 
@@ -130,7 +217,7 @@ def connectionInputIsChild(node_path, attribute):
        Returns:
            bool: True if the connection input is a child attribute
     """
-    node = Dag(node_path)
+    node = export_session.getNode(node_path)
     if node.a[attribute].connectionInput.isChild:
         return True
 
@@ -150,9 +237,9 @@ def checkIfParent(node_name):
             bool: True if node is terminal (only connects to shadingEngine)
     """
     down_list = cmds.listConnections(node_name, source=False, destination=True) or []
-    print(down_list)
+    instrumentation.count("maya.listConnections")
     for node in down_list:
-        if Dag(node).type == "shadingEngine":
+        if export_session.getNode(node).type == "shadingEngine":
             return True
 
     return False
@@ -170,6 +257,7 @@ def checkOrphaned(node_name):
     """
 
     connection = cmds.listConnections(node_name)
+    instrumentation.count("maya.listConnections")
 
     if len(connection) == 1 and 'default' in connection[0]:
         return True
@@ -177,6 +265,120 @@ def checkOrphaned(node_name):
     return None
 
 
+def plugIsChild(plug):
+    """
+    Checks if a plug is a child attribute (e.g. "PxrTexture1.resultRGBR").
+
+    Args:
+        plug (str): node.attribute plug path
+
+    Returns:
+        bool: True if the plug is a child of a compound attribute
+    """
+    selection = om.MSelectionList()
+    selection.add(plug)
+    mplug = om.MPlug()
+    selection.getPlug(0, mplug)
+    instrumentation.count("maya.MPlug")
+    return mplug.isChild()
+
+
+def getMaterialRoots(shading_engine):
+    """
+    Get the surface and displacement shaders of a shadingEngine
+
+    Args:
+        shading_engine (str): shadingEngine node name
+
+    Returns:
+        list: shader node names, RenderMan inputs first
+    """
+    roots = []
+    for attr in SHADING_ENGINE_INPUTS:
+        plug = f"{shading_engine}.{attr}"
+        if not cmds.objExists(plug):
+            continue
+        instrumentation.count("maya.listConnections")
+        for node in cmds.listConnections(plug, source=True, destination=False) or []:
+            if node not in roots:
+                roots.append(node)
+    return roots
+
+
+def getExportRoots(nodes):
+    """
+    Get the terminal nodes of every material of a selection, shading groups are replaced by their shaders
+
+    Args:
+        nodes (list): selected node names, terminal nodes or shading groups
+
+    Returns:
+        list: root node names, in selection order without duplicates
+    """
+    shading_engines = set(cmds.ls(nodes, type="shadingEngine") or []) if nodes else set()
+    instrumentation.count("maya.ls")
 
+    roots = []
+    for node in nodes:
+        roots.extend(getMaterialRoots(node) if node in shading_engines else [node])
+    return list(dict.fromkeys(roots))
 
 
+def takeConnectionSnapshot(nodes):
+    """
+    Collects a network and every connection it needs in a few batched queries.
+
+    Walks upstream from the given nodes like m2k.getAllNodes, but records the
+    plug level edges of every frontier query, then asks for the downstream
+    connections of the whole network at once.
+
+    Args:
+        nodes (list): selected node names
+
+    Returns:
+        ConnectionSnapshot: snapshot of the network
+    """
+    result_nodes = []
+    inputs = {}
+    processed = set()
+    frontier = list(dict.fromkeys(nodes))
+    while frontier:
+        result_nodes.extend(frontier)
+        processed.update(frontier)
+        for node in frontier:
+            inputs[node] = {}
+
+        node_connections = cmds.listConnections(frontier, source=True, destination=False,
+                                                connections=True, plugs=True) or []
+        instrumentation.count("maya.listConnections")
+        sources = []
+        for i in range(len(node_connections) // 2):
+            dest_plug = node_connections[i * 2]
+            src_plug = node_connections[i * 2 + 1]
+            dest_node, dest_attr = dest_plug.split(".", 1)
+            # attribute names repeat across nodes of a type, every node shares them
+            inputs.setdefault(dest_node, {})[internName(dest_attr)] = src_plug
+            sources.append(src_plug.split(".")[0])
+
+        frontier = [n for n in dict.fromkeys(sources) if n not in processed]
+
+    child_inputs = {}
+    child_plugs = {}
+    for node, connections in inputs.items():
+        for dest_attr, src_plug in connections.items():
+            if src_plug not in child_plugs:
+                child_plugs[src_plug] = plugIsChild(src_plug)
+            if child_plugs[src_plug]:
+                child_inputs.setdefault(node, set()).add(dest_attr)
+
+    outputs = {node: [] for node in result_nodes}
+    node_connections = []
+    if result_nodes:
+        node_connections = cmds.listConnections(result_nodes, source=False, destination=True,
+                                                connections=True) or []
+        instrumentation.count("maya.listConnections")
+    for i in range(len(node_connections) // 2):
+        own_plug = node_connections[i * 2]
+        outputs.setdefault(own_plug.split(".")[0], []).append(node_connections[i * 2 + 1])
+
+    return ConnectionSnapshot(result_nodes, inputs, child_inputs, outputs)
@@ -12,3 +12,7 @@ import maya.cmds as cmds
 
 if not cmds.commandPort(":4434", query=True):
     cmds.commandPort(name=":4434")
+
+# cached node and attribute paths are invalidated from these callbacks
+from MayaBase.modules.utils import scene_generation
+scene_generation.install()